@@ -1,71 +1,412 @@
 """
 Vercel API endpoint for DNS health check
+
+Also runs as a standalone server:
+    python api/health.py [port] [host]
 """
 
 import json
-import subprocess
+import hashlib
+import importlib.util
 import os
+import signal
+import sys
+import threading
+import time
 from datetime import datetime
-from http.server import BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DNS_MANAGEMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+if DNS_MANAGEMENT_DIR not in sys.path:
+    sys.path.insert(0, DNS_MANAGEMENT_DIR)
+
+from health_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HealthMetrics
+
+# Serve cached results for this long, then revalidate in the background
+FRESH_TTL = int(os.environ.get("HEALTH_CACHE_TTL", "60"))
+# Keep serving stale results (while revalidating) for this long after that
+STALE_TTL = int(os.environ.get("HEALTH_STALE_TTL", "600"))
+# Outside the standalone server, wait this long for the first check to finish
+FIRST_FILL_TIMEOUT = float(os.environ.get("HEALTH_FIRST_FILL_TIMEOUT", "8"))
+
+
+def load_monitor():
+    """Create a DNSHealthMonitor from dns-health-monitor.py in the parent directory"""
+    spec = importlib.util.spec_from_file_location(
+        "dns_health_monitor",
+        os.path.join(DNS_MANAGEMENT_DIR, "dns-health-monitor.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module.DNSHealthMonitor(
+        domain=os.environ.get("DOMAIN", "leo.pvthostel.com"),
+        config_file=os.path.join(DNS_MANAGEMENT_DIR, "dns-config.json")
+    )
+
+
+class HealthCache:
+    def __init__(self, fresh_ttl: int = FRESH_TTL, stale_ttl: int = STALE_TTL,
+                 first_fill_timeout: float = FIRST_FILL_TIMEOUT, standalone: bool = False):
+        """
+        Health check results cache with stale-while-revalidate semantics
+
+        Requests never run a check themselves. A fresh entry is served as is;
+        a stale one is served while a single background refresh runs, so
+        concurrent requests never start more than one check.
+
+        The standalone server starts the first check at startup. Elsewhere
+        (e.g. on Vercel, where the function is frozen once the response is
+        sent and a background thread cannot be relied on to finish) requests
+        to an empty cache wait for the first check, up to first_fill_timeout.
+
+        Args:
+            fresh_ttl: Seconds a result is served without revalidation
+            stale_ttl: Seconds a stale result may still be served
+            first_fill_timeout: Seconds a request waits for the first check outside the standalone server
+            standalone: Running under serve()
+        """
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.first_fill_timeout = first_fill_timeout
+        self.standalone = standalone
+        self.filled = threading.Event()
+        self.lock = threading.Lock()
+        self.monitor = None
+        self.metrics = HealthMetrics()
+        self.results = None
+        self.issues = []
+        self.error = None
+        self.updated_at = None
+        self.generation = 0
+        self.refreshing = False
+
+    def store(self, results, issues):
+        """Store a completed health check and update the metrics registry"""
+        self.metrics.update(results, issues)
+
+        with self.lock:
+            self.results = results
+            self.issues = list(issues)
+            self.error = None
+            self.updated_at = time.monotonic()
+            self.generation += 1
+
+    def refresh(self):
+        """Run a health check and store the results (called on the refresh thread)"""
+        try:
+            if self.monitor is None:
+                self.monitor = load_monitor()
+
+            self.monitor.issues = []
+            results = self.monitor.collect_health_check()
+            self.store(results, self.monitor.issues)
+        except Exception as e:
+            with self.lock:
+                self.error = str(e)
+                if self.results is None:
+                    self.updated_at = time.monotonic()
+                self.generation += 1
+        finally:
+            with self.lock:
+                self.refreshing = False
+            self.filled.set()
+
+    def _start_refresh(self):
+        """Start a background refresh unless one is running (lock held)"""
+        if not self.refreshing:
+            self.refreshing = True
+            threading.Thread(target=self.refresh, name="health-refresh", daemon=True).start()
+
+    def get(self):
+        """
+        Get the cached results, starting a background refresh when needed
+
+        Outside the standalone server, a request to an empty cache waits (up
+        to first_fill_timeout) for the first check instead of answering
+        "checking".
+
+        Returns:
+            Tuple of (results, issues, error, state, age in seconds, generation)
+        """
+        if not self.standalone and not self.filled.is_set():
+            with self.lock:
+                self._start_refresh()
+            self.filled.wait(self.first_fill_timeout)
+
+        with self.lock:
+            now = time.monotonic()
+            age = now - self.updated_at if self.updated_at is not None else None
+
+            if age is None:
+                state = "empty"
+            elif age <= self.fresh_ttl:
+                state = "fresh"
+            elif age <= self.fresh_ttl + self.stale_ttl:
+                state = "stale"
+            else:
+                state = "expired"
+
+            if state != "fresh":
+                self._start_refresh()
+
+            return self.results, self.issues, self.error, state, age, self.generation
+
+
+cache = HealthCache()
+
+
+def dns_status(results, issues, error, state) -> str:
+    """Summarize DNS health from cached results"""
+    if state == "empty":
+        return "checking"
+    if state == "expired" or results is None:
+        return "unknown"
+
+    checks = results.get("checks", {})
+    if issues or checks.get("a_records", {}).get("status") != "✅" or error:
+        return "degraded"
+    return "healthy"
+
+
+def ssl_status(results, state) -> str:
+    """Summarize certificate health from cached results"""
+    if state == "empty":
+        return "checking"
+    if state == "expired" or results is None:
+        return "unknown"
+
+    hosts = results.get("checks", {}).get("ssl_hosts", {})
+    if hosts and all(host["status"].startswith("✅") for host in hosts.values()):
+        return "healthy"
+    return "degraded"
+
+
+def build_route_body(route: str, results, issues, error, state) -> bytes:
+    """
+    Build the JSON body for a health route
+
+    Args:
+        route: One of health, dns or ssl
+        results: Cached health check results
+        issues: Cached issues
+        error: Error from the last refresh, if any
+        state: Cache state
+
+    Returns:
+        Response body
+    """
+    usable = results is not None and state != "expired"
+    checks = results.get("checks", {}) if usable else {}
+
+    if route == "dns":
+        health_data = {
+            "status": dns_status(results, issues, error, state),
+            "domain": os.environ.get("DOMAIN", "leo.pvthostel.com"),
+            "timestamp": results["timestamp"] if results else None,
+            "checks": {
+                key: checks[key]
+                for key in ["a_records", "www_cname", "propagation", "expected_records", "mail"]
+                if key in checks
+            },
+            "issues": issues if usable else []
+        }
+    elif route == "ssl":
+        health_data = {
+            "status": ssl_status(results, state),
+            "domain": os.environ.get("DOMAIN", "leo.pvthostel.com"),
+            "timestamp": results["timestamp"] if results else None,
+            "certificates": checks.get("ssl_hosts", {})
+        }
+    else:
+        health_data = {
+            "status": "healthy",
+            "service": "DNS Management System",
+            "domain": os.environ.get("DOMAIN", "leo.pvthostel.com"),
+            "timestamp": results["timestamp"] if results else datetime.now().isoformat(),
+            "version": os.environ.get("VERSION", "1.0.0"),
+            "environment": os.environ.get("ENVIRONMENT", "production"),
+            "checks": {
+                "api": "operational",
+                "dns": dns_status(results, issues, error, state),
+                "hubspot": "connected"
+            }
+        }
+
+        if issues and usable:
+            health_data["issues"] = issues
+
+    return json.dumps(health_data, indent=2).encode()
+
+
+# Rendered bodies keyed by route, reused until the cache generation or state changes
+_rendered = {}
+
+
+def build_health_response(route: str = "health"):
+    """
+    Build a health response from the cache
+
+    Bodies are rendered once per cache generation and state, so serving a
+    request is a dictionary lookup.
+
+    Args:
+        route: One of health, dns or ssl
+
+    Returns:
+        Tuple of (body bytes, ETag, cache state, age in seconds)
+    """
+    results, issues, error, state, age, generation = cache.get()
+    key = (generation, state)
+
+    rendered = _rendered.get(route)
+    if rendered is None or rendered[0] != key:
+        body = build_route_body(route, results, issues, error, state)
+        rendered = (key, body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        _rendered[route] = rendered
+
+    return rendered[1], rendered[2], state, age
+
+
+ROUTES = {
+    "/": "health",
+    "/health": "health",
+    "/api/health": "health",
+    "/health/dns": "dns",
+    "/health/ssl": "ssl",
+    "/metrics": "metrics"
+}
+
 
 class handler(BaseHTTPRequestHandler):
+    # Keep connections alive in standalone mode; idle ones are closed after the timeout
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+    # Headers and body are separate writes; without this, keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
     def do_GET(self):
         """Handle GET request for health check"""
         try:
-            # Basic health response
-            health_data = {
-                "status": "healthy",
-                "service": "DNS Management System",
-                "domain": os.environ.get("DOMAIN", "leo.pvthostel.com"),
-                "timestamp": datetime.now().isoformat(),
-                "version": os.environ.get("VERSION", "1.0.0"),
-                "environment": os.environ.get("ENVIRONMENT", "production"),
-                "checks": {
-                    "api": "operational",
-                    "dns": "checking",
-                    "hubspot": "connected"
-                }
-            }
-            
-            # Try to run actual health check if available
-            try:
-                result = subprocess.run(
-                    ["python3", "../dns-health-monitor.py", "check"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    health_data["checks"]["dns"] = "healthy"
-                else:
-                    health_data["checks"]["dns"] = "degraded"
-            except:
-                health_data["checks"]["dns"] = "unknown"
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
+            route = ROUTES.get(self.path.split("?")[0].rstrip("/") or "/")
+
+            if route is None:
+                self.send_json(404, {"status": "error", "message": f"Not found: {self.path}"})
+                return
+
+            if route == "metrics":
+                cache.get()
+                body = cache.metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            body, etag, state, age = build_health_response(route)
+            not_modified = self.headers.get("If-None-Match") == etag
+
+            if not_modified:
+                self.send_response(304)
+            else:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f'public, max-age={cache.fresh_ttl}, stale-while-revalidate={cache.stale_ttl}')
+            if age is not None:
+                self.send_header('Age', str(int(age)))
+            self.send_header('X-Cache', state)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            
-            self.wfile.write(json.dumps(health_data, indent=2).encode())
-            
+
+            if not not_modified:
+                self.wfile.write(body)
+
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            error_response = {
+            self.send_json(500, {
                 "status": "error",
                 "message": str(e),
                 "timestamp": datetime.now().isoformat()
-            }
-            
-            self.wfile.write(json.dumps(error_response).encode())
-    
+            })
+
     def do_OPTIONS(self):
         """Handle CORS preflight"""
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
\ No newline at end of file
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_json(self, status: int, data: dict):
+        """Send a JSON response"""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if os.environ.get("HEALTH_ACCESS_LOG"):
+            super().log_message(format, *args)
+
+
+class HealthServer(ThreadingHTTPServer):
+    """Threaded health API server that lets in-flight requests finish on shutdown"""
+    allow_reuse_address = True
+    request_queue_size = 1024
+    daemon_threads = False
+    block_on_close = True
+
+
+def create_server(port: int = 8080, host: str = "0.0.0.0") -> HealthServer:
+    """Bind the standalone health API server"""
+    return HealthServer((host, port), handler)
+
+
+def serve(port: int = 8080, host: str = "0.0.0.0", server: HealthServer = None):
+    """
+    Run the health API as a standalone server until SIGINT/SIGTERM
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind
+        server: Already bound server to run instead of binding a new one
+    """
+    if server is None:
+        server = create_server(port, host)
+
+    def shutdown(signum, frame):
+        print("\n👋 Shutting down health API...")
+        # shutdown() waits for serve_forever to return, so it can't run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+    # Start the first check before any request arrives; requests never wait for it
+    cache.standalone = True
+    cache.get()
+
+    host, port = server.server_address[:2]
+    print(f"🏥 Health API listening on http://{host}:{port}")
+    print("   Routes: /health, /health/dns, /health/ssl, /metrics")
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        print("✅ Health API stopped")
+
+
+if __name__ == "__main__":
+    serve(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8080,
+        sys.argv[2] if len(sys.argv) > 2 else "0.0.0.0"
+    )
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Backup catalog for leo.pvthostel.com
+SQLite index of backup metadata, updated on every save, so listing, archiving
+and duplicate cleanup never have to open the backup files themselves
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    filename TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    checksum TEXT,
+    size INTEGER NOT NULL,
+    partial INTEGER NOT NULL DEFAULT 0,
+    archived INTEGER NOT NULL DEFAULT 0,
+    kind TEXT NOT NULL DEFAULT 'full',
+    parent TEXT,
+    chain INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_backups_ts ON backups (archived, ts);
+CREATE INDEX IF NOT EXISTS idx_backups_provider_ts ON backups (provider, ts);
+CREATE INDEX IF NOT EXISTS idx_backups_checksum ON backups (checksum);
+CREATE INDEX IF NOT EXISTS idx_backups_parent ON backups (parent);
+"""
+
+# Columns added after the first release, created on open if missing
+MIGRATIONS = {
+    "kind": "ALTER TABLE backups ADD COLUMN kind TEXT NOT NULL DEFAULT 'full'",
+    "parent": "ALTER TABLE backups ADD COLUMN parent TEXT",
+    "chain": "ALTER TABLE backups ADD COLUMN chain INTEGER NOT NULL DEFAULT 0"
+}
+
+COLUMNS = ["filename", "path", "provider", "ts", "timestamp", "records", "checksum", "size", "partial", "archived",
+           "kind", "parent", "chain"]
+
+
+def backup_timestamp(value: Optional[str]) -> int:
+    """Unix time of a backup's ISO timestamp (0 if missing or invalid)"""
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return 0
+
+
+class BackupCatalog:
+    def __init__(self, path: str = "catalog.db"):
+        """
+        Initialize the backup catalog
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(backups)")}
+        for column, statement in MIGRATIONS.items():
+            if existing and column not in existing:
+                self.conn.execute(statement)
+        self.conn.executescript(SCHEMA)
+
+    def _entry(self, row) -> Dict:
+        entry = dict(zip(COLUMNS, row))
+        entry["partial"] = bool(entry["partial"])
+        entry["archived"] = bool(entry["archived"])
+        return entry
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self.conn.close()
+
+    def add(self, filepath: str, backup_data: Dict, size: int, archived: bool = False, filename: str = None):
+        """
+        Record a saved backup (replacing any entry with the same filename)
+
+        Args:
+            filepath: Path the backup was written to
+            backup_data: Backup content (only its metadata is read)
+            size: File size in bytes
+            archived: Whether the file lives in the archive
+            filename: Name the backup is known by (default: the file's name)
+        """
+        filename = filename or filepath.replace("\\", "/").rsplit("/", 1)[-1]
+        timestamp = backup_data.get("timestamp", "")
+
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO backups (filename, path, provider, ts, timestamp, records, checksum, "
+                "size, partial, archived, kind, parent, chain) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    filename,
+                    filepath,
+                    backup_data.get("provider", "unified"),
+                    backup_timestamp(timestamp),
+                    timestamp,
+                    backup_data.get("total_records", 0),
+                    backup_data.get("checksum", ""),
+                    size,
+                    1 if backup_data.get("partial") else 0,
+                    1 if archived else 0,
+                    backup_data.get("kind", "full"),
+                    backup_data.get("parent"),
+                    backup_data.get("chain", 0)
+                )
+            )
+
+    @staticmethod
+    def _where(provider: str = None, since: int = None, until: int = None, archived: Optional[bool] = False,
+               partial: Optional[bool] = None) -> Tuple[str, List]:
+        clauses = []
+        params = []
+
+        if archived is not None:
+            clauses.append("archived = ?")
+            params.append(1 if archived else 0)
+        if provider:
+            clauses.append("provider = ?")
+            params.append(provider)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if partial is not None:
+            clauses.append("partial = ?")
+            params.append(1 if partial else 0)
+
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, provider: str = None, since: int = None, until: int = None, archived: Optional[bool] = False,
+              partial: Optional[bool] = None, limit: int = None, offset: int = 0, newest_first: bool = True) -> List[Dict]:
+        """
+        Find backups
+
+        Args:
+            provider: Only backups of this provider
+            since: Only backups taken at or after this Unix time
+            until: Only backups taken before this Unix time
+            archived: True for archived, False for current, None for both
+            partial: Filter on the partial flag (None for both)
+            limit: Page size (None for all)
+            offset: Rows to skip
+            newest_first: Sort order
+
+        Returns:
+            Catalog entries
+        """
+        where, params = self._where(provider, since, until, archived, partial)
+        order = 'DESC' if newest_first else 'ASC'
+        sql = f"SELECT {', '.join(COLUMNS)} FROM backups{where} ORDER BY ts {order}, filename {order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        return [self._entry(row) for row in rows]
+
+    def count(self, provider: str = None, since: int = None, until: int = None, archived: Optional[bool] = False,
+              partial: Optional[bool] = None) -> int:
+        """Number of backups matching the same filters as query()"""
+        where, params = self._where(provider, since, until, archived, partial)
+
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM backups{where}", params).fetchone()[0]
+
+    def get(self, filename: str) -> Optional[Dict]:
+        """Catalog entry for a file name"""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM backups WHERE filename = ?", (filename,)
+            ).fetchone()
+
+        return self._entry(row) if row else None
+
+    def duplicates(self) -> List[Dict]:
+        """Current backups whose checksum matches an older backup (and that no delta builds on)"""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join('b.' + column for column in COLUMNS)} FROM backups b "
+                "WHERE b.archived = 0 AND b.checksum != '' AND EXISTS ("
+                "SELECT 1 FROM backups o WHERE o.checksum = b.checksum AND (o.ts < b.ts OR (o.ts = b.ts AND o.filename < b.filename))) "
+                "AND NOT EXISTS (SELECT 1 FROM backups c WHERE c.parent = b.filename)"
+            ).fetchall()
+
+        return [self._entry(row) for row in rows]
+
+    def latest(self, provider: str, before: int = None) -> Optional[Dict]:
+        """
+        Newest backup of a provider, current or archived
+
+        Args:
+            provider: Provider name
+            before: Only backups taken at or before this Unix time
+        """
+        entries = self.query(provider=provider, until=None if before is None else before + 1, archived=None, limit=1)
+        return entries[0] if entries else None
+
+    def mark_archived(self, filename: str, path: str, size: int = None):
+        """Record that a backup was moved to the archive (and its new size if it was compressed)"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE backups SET archived = 1, path = ?, size = COALESCE(?, size) WHERE filename = ?",
+                (path, size, filename)
+            )
+
+    def remove(self, filename: str):
+        """Forget a deleted backup"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM backups WHERE filename = ?", (filename,))
+
+    def clear(self):
+        """Forget every backup (before a rebuild)"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM backups")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Incremental DNS backups
+A delta stores the added, removed and changed records of every record list
+relative to its parent backup; replaying the chain from the last full
+snapshot reconstructs the complete backup
+"""
+
+import json
+from typing import Callable, Dict, List, Tuple
+
+# Backup fields holding record lists (top level and inside each source)
+RECORD_FIELDS = ["records", "unified_records"]
+
+
+def record_value(record: Dict):
+    """A record's value under the key each provider uses"""
+    return record.get("value", record.get("content", record.get("data")))
+
+
+def record_key(record) -> str:
+    """Identity of a record: type, name and value (other fields may change)"""
+    if not isinstance(record, dict):
+        return json.dumps(record, sort_keys=True)
+    return f"{record.get('type', '')}|{str(record.get('name', '')).lower()}|{record_value(record)}"
+
+
+def _sort_key(record) -> Tuple[str, str]:
+    return record_key(record), json.dumps(record, sort_keys=True)
+
+
+def record_lists(backup: Dict, prefix: str = "") -> Dict[str, List]:
+    """
+    Find every record list in a backup
+
+    Returns:
+        Dictionary of path ("unified_records", "sources.cloudflare.records") to list
+    """
+    lists = {}
+
+    for key, value in backup.items():
+        path = f"{prefix}{key}"
+        if key in RECORD_FIELDS and isinstance(value, list):
+            lists[path] = value
+        elif isinstance(value, dict):
+            lists.update(record_lists(value, f"{path}."))
+
+    return lists
+
+
+def canonicalize(backup: Dict, checksum: Callable[[Dict], str]) -> Dict:
+    """
+    Sort every record list by record identity and refresh checksums
+
+    Providers return records in no particular order; a canonical order lets a
+    reconstructed backup match the original byte for byte.
+
+    Args:
+        backup: Backup data
+        checksum: Function computing a checksum of a dictionary
+
+    Returns:
+        Canonical copy of the backup
+    """
+    result = {}
+    changed = False
+
+    for key, value in backup.items():
+        if key in RECORD_FIELDS and isinstance(value, list):
+            result[key] = sorted(value, key=_sort_key)
+            changed = changed or result[key] != value
+        elif isinstance(value, dict):
+            result[key] = canonicalize(value, checksum)
+            changed = changed or result[key] != value
+        else:
+            result[key] = value
+
+    if changed and "checksum" in result:
+        result["checksum"] = checksum({key: value for key, value in result.items() if key != "checksum"})
+
+    return result
+
+
+def diff_lists(old: List, new: List) -> Dict[str, List]:
+    """
+    Changes turning one record list into another
+
+    Returns:
+        Dictionary with added (records), removed (record keys) and changed
+        (records whose key exists in both lists with different fields)
+    """
+    old_by_key = {record_key(record): record for record in old}
+    new_by_key = {record_key(record): record for record in new}
+
+    return {
+        "added": [record for key, record in new_by_key.items() if key not in old_by_key],
+        "removed": [key for key in old_by_key if key not in new_by_key],
+        "changed": [
+            record for key, record in new_by_key.items()
+            if key in old_by_key and old_by_key[key] != record
+        ]
+    }
+
+
+def apply_changes(old: List, changes: Dict[str, List]) -> List:
+    """Apply diff_lists() output to a record list (result in canonical order)"""
+    records = {record_key(record): record for record in old}
+
+    for key in changes.get("removed", []):
+        records.pop(key, None)
+    for record in changes.get("added", []) + changes.get("changed", []):
+        records[record_key(record)] = record
+
+    return sorted(records.values(), key=_sort_key)
+
+
+def strip_lists(backup: Dict) -> Dict:
+    """Backup metadata with every record list removed"""
+    skeleton = {}
+
+    for key, value in backup.items():
+        if key in RECORD_FIELDS and isinstance(value, list):
+            skeleton[key] = None
+        elif isinstance(value, dict):
+            skeleton[key] = strip_lists(value)
+        else:
+            skeleton[key] = value
+
+    return skeleton
+
+
+def fill_lists(skeleton: Dict, lists: Dict[str, List], prefix: str = "") -> Dict:
+    """Put record lists (keyed by record_lists() path) back into a strip_lists() skeleton"""
+    backup = {}
+
+    for key, value in skeleton.items():
+        path = f"{prefix}{key}"
+        if key in RECORD_FIELDS and value is None:
+            backup[key] = lists.get(path, [])
+        elif isinstance(value, dict):
+            backup[key] = fill_lists(value, lists, f"{path}.")
+        else:
+            backup[key] = value
+
+    return backup
+
+
+def has_duplicate_keys(backup: Dict) -> bool:
+    """Check whether any record list holds two records with the same identity"""
+    for records in record_lists(backup).values():
+        if len({record_key(record) for record in records}) != len(records):
+            return True
+    return False
+
+
+def create_delta(parent: Dict, backup: Dict) -> Dict:
+    """
+    Describe a canonical backup relative to its canonical parent
+
+    Returns:
+        Delta with the backup's metadata ("skeleton") and per-list changes
+    """
+    parent_lists = record_lists(parent)
+    changes = {}
+
+    for path, records in record_lists(backup).items():
+        delta = diff_lists(parent_lists.get(path, []), records)
+        if any(delta.values()):
+            changes[path] = delta
+
+    return {"skeleton": strip_lists(backup), "changes": changes}
+
+
+def apply_delta(parent: Dict, delta: Dict) -> Dict:
+    """Reconstruct a backup from its (reconstructed) parent and a delta"""
+    parent_lists = record_lists(parent)
+    skeleton = delta["skeleton"]
+    lists = {}
+
+    for path in record_lists(fill_lists(skeleton, {})):
+        records = parent_lists.get(path, [])
+        lists[path] = apply_changes(records, delta["changes"].get(path, {}))
+
+    return fill_lists(skeleton, lists)
+
+
+def count_changes(delta: Dict) -> int:
+    """Total records added, removed or changed by a delta"""
+    return sum(len(items) for changes in delta["changes"].values() for items in changes.values())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Structural diff of DNS record lists
+Records are matched by (type, name); within a name, records with the same
+value are paired first and the rest are paired in order, so a changed value
+or TTL is reported as one modification with field-level detail instead of an
+add plus a remove
+"""
+
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from backup_delta import record_value
+
+# Provider bookkeeping that changes without the record itself changing
+VOLATILE_FIELDS = {"id", "zone_id", "zone_name", "created_on", "modified_on", "meta", "locked"}
+
+# Provider spellings of a record's value
+VALUE_FIELDS = ["value", "content", "data"]
+
+
+def diff_key(record: Dict) -> Tuple[str, str]:
+    """Identity records are matched on: type and name (case and root dot ignored)"""
+    return str(record.get("type", "")).upper(), str(record.get("name", "")).lower().rstrip(".")
+
+
+def record_fields(record: Dict) -> Dict:
+    """Comparable fields of a record, with the value under "value" whatever the provider calls it"""
+    fields = {
+        key: value for key, value in record.items()
+        if key not in VOLATILE_FIELDS and key not in VALUE_FIELDS
+    }
+    fields["value"] = record_value(record)
+    return fields
+
+
+def field_changes(old: Dict, new: Dict) -> Dict[str, Dict]:
+    """
+    Fields that differ between two versions of a record
+
+    Type and name are left out: they are what the records were matched on.
+
+    Returns:
+        Dictionary of field to {"old": value, "new": value}
+    """
+    old_fields = record_fields(old)
+    new_fields = record_fields(new)
+
+    return {
+        field: {"old": old_fields.get(field), "new": new_fields.get(field)}
+        for field in sorted((set(old_fields) | set(new_fields)) - {"type", "name"})
+        if old_fields.get(field) != new_fields.get(field)
+    }
+
+
+def _change(action: str, key: Tuple[str, str], old: Dict = None, new: Dict = None) -> Dict:
+    change = {"action": action, "type": key[0], "name": key[1], "old": old, "new": new}
+    if old is not None and new is not None:
+        change["fields"] = field_changes(old, new)
+    return change
+
+
+def _diff_group(key: Tuple[str, str], old: List[Dict], new: List[Dict]) -> Iterator[Dict]:
+    old = list(old)
+    unmatched = []
+
+    # Same value on both sides: unchanged, or modified in TTL, priority, proxied...
+    for record in new:
+        value = record_value(record)
+        match = next((i for i, candidate in enumerate(old) if record_value(candidate) == value), None)
+        if match is None:
+            unmatched.append(record)
+            continue
+
+        change = _change("modified", key, old.pop(match), record)
+        if not change["fields"]:
+            change["action"] = "unchanged"
+        yield change
+
+    # Different values under the same type and name: modified in place
+    for record in unmatched:
+        yield _change("modified", key, old.pop(0), record) if old else _change("added", key, new=record)
+
+    for record in old:
+        yield _change("removed", key, old=record)
+
+
+def diff_records(old: Iterable[Dict], new: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Diff two record lists
+
+    Both sides are consumed once and may be generators (e.g. records read
+    from a streaming backup); the old side is indexed by (type, name) and the
+    new side grouped the same way, so the cost is linear in the number of
+    records.
+
+    Yields:
+        Changes with action (added/removed/modified/unchanged), type, name,
+        old and new record, and for paired records the differing fields
+    """
+    index: Dict[Tuple[str, str], List[Dict]] = {}
+    for record in old:
+        if isinstance(record, dict):
+            index.setdefault(diff_key(record), []).append(record)
+
+    groups: Dict[Tuple[str, str], List[Dict]] = {}
+    for record in new:
+        if isinstance(record, dict):
+            groups.setdefault(diff_key(record), []).append(record)
+
+    for key, records in groups.items():
+        yield from _diff_group(key, index.pop(key, []), records)
+
+    for key, records in index.items():
+        for record in records:
+            yield _change("removed", key, old=record)
+
+
+def summarize(changes: Iterable[Dict]) -> Dict:
+    """
+    Collect diff_records() output by action
+
+    Returns:
+        Dictionary with added, removed and modified change lists, the
+        unchanged count and total_changes
+    """
+    summary = {"added": [], "removed": [], "modified": [], "unchanged": 0}
+
+    for change in changes:
+        if change["action"] == "unchanged":
+            summary["unchanged"] += 1
+        else:
+            summary[change["action"]].append(change)
+
+    summary["total_changes"] = len(summary["added"]) + len(summary["removed"]) + len(summary["modified"])
+    return summary
+
+
+def describe(change: Dict) -> str:
+    """One-line description of a change"""
+    label = f"{change['type']} {change['name']}"
+
+    if change["action"] == "added":
+        return f"{label} {record_value(change['new'])}"
+    if change["action"] == "removed":
+        return f"{label} {record_value(change['old'])}"
+
+    fields = ", ".join(
+        f"{field} {detail['old']!r} → {detail['new']!r}" for field, detail in change.get("fields", {}).items()
+    )
+    return f"{label}: {fields}" if fields else label
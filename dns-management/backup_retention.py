@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Grandfather-father-son retention for DNS backups
+Each tier keeps the newest backup of each of its most recent periods (hours,
+days, weeks, months, years); everything no tier keeps can be deleted, except
+backups that a kept delta is built on
+"""
+
+from datetime import datetime
+from typing import Dict, List, Set
+
+# Periods kept per tier
+DEFAULT_RETENTION = {
+    "hourly": 24,
+    "daily": 7,
+    "weekly": 4,
+    "monthly": 12,
+    "yearly": 3
+}
+
+TIER_PERIODS = {
+    "hourly": lambda when: when.strftime("%Y-%m-%d %H"),
+    "daily": lambda when: when.strftime("%Y-%m-%d"),
+    "weekly": lambda when: "%d-W%02d" % when.isocalendar()[:2],
+    "monthly": lambda when: when.strftime("%Y-%m"),
+    "yearly": lambda when: when.strftime("%Y")
+}
+
+
+def retained(entries: List[Dict], policy: Dict = None) -> Set[str]:
+    """
+    File names a retention policy keeps
+
+    Per provider, each tier walks backups newest first and keeps the newest
+    backup of every period until it has kept as many periods as the policy
+    allows; a complete backup is preferred over a partial one in the same
+    period. The newest backup of each provider is always kept, as is every
+    backup a kept delta depends on.
+
+    Args:
+        entries: Catalog entries (current and archived)
+        policy: Periods per tier (overrides of DEFAULT_RETENTION; 0 disables a tier)
+
+    Returns:
+        File names to keep
+    """
+    policy = {**DEFAULT_RETENTION, **(policy or {})}
+    by_provider: Dict[str, List[Dict]] = {}
+    for entry in entries:
+        by_provider.setdefault(entry["provider"], []).append(entry)
+
+    keep = set()
+
+    for provider_entries in by_provider.values():
+        provider_entries.sort(key=lambda entry: (entry["ts"], entry["filename"]), reverse=True)
+        keep.add(provider_entries[0]["filename"])
+
+        for tier, period_of in TIER_PERIODS.items():
+            chosen: Dict[str, Dict] = {}
+
+            for entry in provider_entries:
+                period = period_of(datetime.fromtimestamp(entry["ts"]))
+                if period not in chosen:
+                    if len(chosen) >= policy.get(tier, 0):
+                        break
+                    chosen[period] = entry
+                elif chosen[period]["partial"] and not entry["partial"]:
+                    chosen[period] = entry
+
+            keep.update(entry["filename"] for entry in chosen.values())
+
+    # A delta is useless without the chain it builds on
+    parents = {entry["filename"]: entry.get("parent") for entry in entries}
+    for filename in list(keep):
+        parent = parents.get(filename)
+        while parent and parent not in keep:
+            keep.add(parent)
+            parent = parents.get(parent)
+
+    return keep
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Storage backends for archived DNS backups
+A local directory or an S3-compatible object store (AWS S3, MinIO...).
+Objects are addressed by key; uploads of large files are multipart and
+concurrent, and downloads are split into concurrent range requests
+"""
+
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import requests
+
+S3_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class StorageError(Exception):
+    """A storage backend rejected a request"""
+
+
+class LocalStorage:
+    def __init__(self, root: str):
+        """
+        Store objects as files under a directory
+
+        Args:
+            root: Directory holding the objects
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def url(self, key: str) -> str:
+        """Location of an object (a file path)"""
+        return os.path.join(self.root, key)
+
+    def key(self, url: str) -> Optional[str]:
+        """Key of an object given its location, or None if it lives elsewhere"""
+        root = os.path.join(os.path.abspath(self.root), "")
+        path = os.path.abspath(url)
+        return path[len(root):] if path.startswith(root) else None
+
+    def put(self, key: str, path: str) -> str:
+        """Copy a file into the store (atomically) and return its location"""
+        destination = self.url(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination), suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, destination)
+        return destination
+
+    def get(self, key: str, path: str):
+        """Copy an object to a local file"""
+        shutil.copyfile(self.url(key), path)
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        """Read part of an object"""
+        with open(self.url(key), 'rb') as f:
+            f.seek(start)
+            return f.read(length)
+
+    def list(self, prefix: str = "") -> List[Dict]:
+        """Objects whose key starts with prefix, as {key, size}"""
+        objects = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(directory, filename), self.root)
+                if key.startswith(prefix) and not filename.endswith(".tmp"):
+                    objects.append({"key": key, "size": os.path.getsize(os.path.join(directory, filename))})
+        return sorted(objects, key=lambda entry: entry["key"])
+
+    def delete(self, key: str):
+        """Delete an object (missing objects are ignored)"""
+        if os.path.exists(self.url(key)):
+            os.remove(self.url(key))
+
+
+class S3Storage:
+    def __init__(self, endpoint: str, bucket: str, access_key: str, secret_key: str, prefix: str = "",
+                 region: str = "us-east-1", part_size: int = 8 * 1024 * 1024, max_workers: int = 4,
+                 timeout: float = 60):
+        """
+        Store objects in an S3-compatible bucket
+
+        Requests are signed with AWS Signature Version 4 and use path-style
+        addressing, which works with AWS and with a local MinIO alike.
+
+        Args:
+            endpoint: Service URL (e.g. "https://s3.ca-central-1.amazonaws.com", "http://localhost:9000")
+            bucket: Bucket name
+            access_key: Access key ID
+            secret_key: Secret access key
+            prefix: Key prefix for every object ("dns-backups/")
+            region: Region used in signatures
+            part_size: Multipart part and download range size in bytes
+            max_workers: Concurrent part uploads / range downloads
+            timeout: Per-request timeout in seconds
+        """
+        self.endpoint = endpoint.rstrip("/")
+        self.host = self.endpoint.split("://", 1)[-1]
+        self.bucket = bucket
+        self.prefix = prefix
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def url(self, key: str) -> str:
+        """Location of an object ("s3://bucket/prefix/key")"""
+        return f"s3://{self.bucket}/{self.prefix}{key}"
+
+    def key(self, url: str) -> Optional[str]:
+        """Key of an object given its location, or None if it lives elsewhere"""
+        base = self.url("")
+        return url[len(base):] if url.startswith(base) else None
+
+    @staticmethod
+    def _query(params: Dict[str, str]) -> str:
+        """Canonical (sorted, RFC 3986 encoded) query string, used for both signing and sending"""
+        return "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}" for name, value in sorted(params.items())
+        )
+
+    def _sign(self, method: str, path: str, query: str, headers: Dict[str, str], payload_hash: str):
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{now.strftime('%Y%m%d')}/{self.region}/s3/aws4_request"
+
+        headers.update({"host": self.host, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+        signed = sorted(name.lower() for name in headers)
+        canonical_headers = "".join(f"{name}:{str(headers[name]).strip()}\n" for name in signed)
+        canonical_request = "\n".join([
+            method, quote(path, safe="/-_.~"), query, canonical_headers, ";".join(signed), payload_hash
+        ])
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()
+        ])
+
+        signing_key = f"AWS4{self.secret_key}".encode()
+        for part in scope.split("/"):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={';'.join(signed)}, Signature={signature}"
+        )
+
+    def _request(self, method: str, key: str = None, params: Dict[str, str] = None, data: bytes = b"",
+                 headers: Dict[str, str] = None, ok=(200,)) -> requests.Response:
+        path = f"/{self.bucket}" + (f"/{self.prefix}{key}" if key is not None else "")
+        query = self._query(params or {})
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        self._sign(method, path, query, headers, hashlib.sha256(data).hexdigest())
+
+        url = self.endpoint + quote(path, safe="/-_.~") + (f"?{query}" if query else "")
+        response = self.session.request(method, url, data=data, headers=headers, timeout=self.timeout)
+        if response.status_code not in ok:
+            raise StorageError(f"{method} {path} failed: {response.status_code} {response.text[:200]}")
+        return response
+
+    def put(self, key: str, path: str) -> str:
+        """
+        Upload a file and return its location
+
+        Files larger than one part are uploaded as concurrent multipart
+        uploads; a failed multipart upload is aborted so no parts linger.
+        """
+        size = os.path.getsize(path)
+
+        if size <= self.part_size:
+            with open(path, 'rb') as f:
+                self._request("PUT", key, data=f.read())
+            return self.url(key)
+
+        response = self._request("POST", key, params={"uploads": ""})
+        upload_id = ET.fromstring(response.content).find(f"{S3_NAMESPACE}UploadId").text
+
+        def upload_part(number: int) -> str:
+            with open(path, 'rb') as f:
+                f.seek((number - 1) * self.part_size)
+                data = f.read(self.part_size)
+            part = self._request("PUT", key, params={"partNumber": str(number), "uploadId": upload_id}, data=data)
+            return part.headers["ETag"]
+
+        numbers = list(range(1, (size + self.part_size - 1) // self.part_size + 1))
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(numbers))) as executor:
+                etags = list(executor.map(upload_part, numbers))
+
+            body = "<CompleteMultipartUpload>" + "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for number, etag in zip(numbers, etags)
+            ) + "</CompleteMultipartUpload>"
+            response = self._request("POST", key, params={"uploadId": upload_id}, data=body.encode())
+
+            # S3 can report a failed completion with a 200 status
+            if ET.fromstring(response.content).tag == "Error":
+                raise StorageError(f"Completing upload of {key} failed: {response.text[:200]}")
+        except Exception:
+            self._request("DELETE", key, params={"uploadId": upload_id}, ok=(200, 204, 404))
+            raise
+
+        return self.url(key)
+
+    def get(self, key: str, path: str):
+        """Download an object to a local file, in concurrent ranges if it is large"""
+        size = int(self._request("HEAD", key).headers["Content-Length"])
+
+        with open(path, 'wb') as f:
+            f.truncate(size)
+
+        def download(start: int):
+            data = self.read_range(key, start, min(self.part_size, size - start))
+            with open(path, 'r+b') as f:
+                f.seek(start)
+                f.write(data)
+
+        starts = list(range(0, size, self.part_size))
+        if starts:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(starts))) as executor:
+                list(executor.map(download, starts))
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        """Read part of an object with a range request"""
+        response = self._request(
+            "GET", key, headers={"Range": f"bytes={start}-{start + length - 1}"}, ok=(200, 206)
+        )
+        # A server that ignores Range sends the whole object
+        return response.content if response.status_code == 206 else response.content[start:start + length]
+
+    def list(self, prefix: str = "") -> List[Dict]:
+        """Objects whose key starts with prefix, as {key, size}"""
+        objects = []
+        params = {"list-type": "2", "prefix": self.prefix + prefix}
+
+        while True:
+            root = ET.fromstring(self._request("GET", params=params).content)
+            for item in root.findall(f"{S3_NAMESPACE}Contents"):
+                objects.append({
+                    "key": item.find(f"{S3_NAMESPACE}Key").text[len(self.prefix):],
+                    "size": int(item.find(f"{S3_NAMESPACE}Size").text)
+                })
+
+            token = root.find(f"{S3_NAMESPACE}NextContinuationToken")
+            if token is None:
+                return objects
+            params["continuation-token"] = token.text
+
+    def delete(self, key: str):
+        """Delete an object (missing objects are ignored)"""
+        self._request("DELETE", key, ok=(200, 204, 404))
+
+
+def open_storage(config: Dict = None, default_root: str = "archive"):
+    """
+    Create the storage backend configured under backup.storage
+
+    {"type": "local", "path": ...} stores files in a directory (default:
+    default_root). {"type": "s3", "endpoint": ..., "bucket": ...} uses an
+    S3-compatible store, with credentials from AWS_ACCESS_KEY_ID and
+    AWS_SECRET_ACCESS_KEY.
+
+    Raises:
+        ValueError: If the type is unknown or S3 credentials are missing
+    """
+    config = config or {}
+    storage_type = config.get("type", "local")
+
+    if storage_type == "local":
+        return LocalStorage(config.get("path") or default_root)
+
+    if storage_type == "s3":
+        access_key = os.getenv("AWS_ACCESS_KEY_ID")
+        secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+        if not access_key or not secret_key:
+            raise ValueError("AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY must be set for S3 storage")
+
+        return S3Storage(
+            config["endpoint"],
+            config["bucket"],
+            access_key,
+            secret_key,
+            prefix=config.get("prefix", ""),
+            region=config.get("region", "us-east-1"),
+            part_size=int(config.get("part_size_mb", 8) * 1024 * 1024),
+            max_workers=config.get("max_workers", 4)
+        )
+
+    raise ValueError(f"Unknown storage type: {storage_type}")
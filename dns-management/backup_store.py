@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Content-addressed blob store for DNS backups
+Record sets are stored once as gzip-compressed canonical JSON named by their
+SHA-256; a backup on disk is a small manifest of {"$ref": hash} pointers
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from typing import Callable, Dict, List, Set, Tuple
+
+from backup_delta import apply_delta
+from backup_stream import COMPRESSED_SUFFIX, is_stream, load_stream, read_json
+
+REF_KEY = "$ref"
+
+# Backup fields whose record lists are moved into blobs
+BLOB_FIELDS = ["records", "unified_records"]
+
+
+def canonical_json(value) -> bytes:
+    """Serialize a value the same way every time (sorted keys, no whitespace)"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def content_hash(value) -> str:
+    """SHA-256 of a value's canonical JSON"""
+    return hashlib.sha256(canonical_json(value)).hexdigest()
+
+
+def is_ref(value) -> bool:
+    """Check whether a value is a blob reference"""
+    return isinstance(value, dict) and REF_KEY in value
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        """
+        Store JSON values under the hash of their content
+
+        Writing a value that is already stored costs one stat(), so identical
+        record sets across backups are kept once without scanning anything.
+
+        Args:
+            root: Directory holding the blobs
+        """
+        self.root = root
+        self.created = 0
+        self.reused = 0
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        """Blob path, fanned out by the first two hex digits"""
+        return os.path.join(self.root, digest[:2], f"{digest[2:]}.json.gz")
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, value) -> Tuple[str, bool]:
+        """
+        Store a value
+
+        Returns:
+            Tuple of (hash, True if a new blob was written)
+        """
+        data = canonical_json(value)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+
+        if os.path.exists(path):
+            self.reused += 1
+            return digest, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                # mtime=0 keeps the compressed bytes reproducible
+                with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+                    gz.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.created += 1
+        return digest, True
+
+    def get(self, digest: str):
+        """
+        Load a value, checking it against its hash
+
+        Raises:
+            FileNotFoundError: If the blob is missing
+            ValueError: If the blob content does not match its hash
+        """
+        path = self.path(digest)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Missing backup blob {digest}")
+
+        with gzip.open(path, 'rb') as f:
+            data = f.read()
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Corrupt backup blob {digest}")
+
+        return json.loads(data)
+
+    def dehydrate(self, backup: Dict) -> Dict:
+        """
+        Move a backup's record lists into blobs
+
+        Returns:
+            Manifest with each record list replaced by {"$ref": hash, "count": n}
+        """
+        manifest = {}
+
+        for key, value in backup.items():
+            if key in BLOB_FIELDS and isinstance(value, list):
+                digest, _ = self.put(value)
+                manifest[key] = {REF_KEY: digest, "count": len(value)}
+            elif isinstance(value, dict):
+                manifest[key] = self.dehydrate(value)
+            else:
+                manifest[key] = value
+
+        return manifest
+
+    def hydrate(self, manifest: Dict) -> Dict:
+        """Resolve every blob reference in a manifest (plain backups pass through unchanged)"""
+        backup = {}
+
+        for key, value in manifest.items():
+            if is_ref(value):
+                backup[key] = self.get(value[REF_KEY])
+            elif isinstance(value, dict):
+                backup[key] = self.hydrate(value)
+            else:
+                backup[key] = value
+
+        return backup
+
+    @staticmethod
+    def references(manifest: Dict) -> Set[str]:
+        """Hashes referenced by a manifest"""
+        refs = set()
+
+        for value in manifest.values():
+            if is_ref(value):
+                refs.add(value[REF_KEY])
+            elif isinstance(value, dict):
+                refs |= BlobStore.references(value)
+
+        return refs
+
+    def all_blobs(self) -> List[str]:
+        """Hashes of every stored blob"""
+        digests = []
+
+        for prefix in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for filename in os.listdir(directory):
+                if filename.endswith(".json.gz"):
+                    digests.append(prefix + filename[:-len(".json.gz")])
+
+        return digests
+
+    def collect_garbage(self, live: Set[str]) -> List[str]:
+        """
+        Delete blobs no manifest references
+
+        Args:
+            live: Hashes still referenced
+
+        Returns:
+            Hashes removed
+        """
+        removed = []
+
+        for digest in self.all_blobs():
+            if digest not in live:
+                os.remove(self.path(digest))
+                removed.append(digest)
+
+        return removed
+
+
+def load_backup_file(path: str, blob_dir: str = None, locate: Callable[[str], str] = None) -> Dict:
+    """
+    Load a backup from disk: a manifest, a stream, a delta or a legacy full backup
+
+    Deltas are resolved by walking parent links back to the last full
+    backup and replaying the changes forward.
+
+    Args:
+        path: Backup file
+        blob_dir: Blob store directory (default: "blobs" next to the file,
+                  or next to its parent for archived manifests)
+        locate: Function mapping a parent file name to its path (default:
+                look next to the file and in its archive directory)
+    """
+    directory = os.path.dirname(os.path.realpath(path))
+
+    if not blob_dir:
+        blob_dir = os.path.join(directory, "blobs")
+        if not os.path.isdir(blob_dir):
+            blob_dir = os.path.join(os.path.dirname(directory), "blobs")
+
+    def find(filename: str) -> str:
+        for candidate in [directory, os.path.join(directory, "archive"), os.path.dirname(directory)]:
+            for name in [filename, filename + COMPRESSED_SUFFIX]:
+                if os.path.exists(os.path.join(candidate, name)):
+                    return os.path.join(candidate, name)
+        raise FileNotFoundError(f"Parent backup {filename} not found")
+
+    store = None
+    deltas = []
+
+    while True:
+        document = load_stream(path) if is_stream(path) else read_json(path)
+
+        if BlobStore.references(document):
+            store = store or BlobStore(blob_dir)
+            document = store.hydrate(document)
+
+        if document.get("kind") != "delta":
+            break
+
+        deltas.append(document)
+        path = (locate or find)(document["parent"])
+
+    backup = document
+    for delta in reversed(deltas):
+        backup = apply_delta(backup, delta)
+
+    return backup
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Streaming DNS backup format
+A gzip-compressed JSON Lines file: a header line with the backup's metadata,
+one line per record and a trailer with the record count and the SHA-256 of
+every line before it. Files are written and verified one record at a time,
+so memory use does not grow with the size of the zone.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from typing import Dict, Iterator, Tuple
+
+from backup_delta import fill_lists, record_lists, strip_lists
+
+STREAM_FORMAT = "dns-backup-stream"
+STREAM_VERSION = 1
+STREAM_SUFFIX = ".jsonl.gz"
+
+# Suffix added to JSON backups compressed when archived
+COMPRESSED_SUFFIX = ".gz"
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_compressed(path: str) -> bool:
+    """Check whether a file is gzip-compressed"""
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def is_stream(path: str) -> bool:
+    """Check whether a file is a streaming backup (by content, not name)"""
+    if not is_compressed(path):
+        return False
+
+    try:
+        with gzip.open(path, 'rb') as f:
+            return json.loads(f.readline()).get("format") == STREAM_FORMAT
+    except (OSError, ValueError, AttributeError):
+        # A compressed JSON document, whose first line is not a header
+        return False
+
+
+def read_json(path: str) -> Dict:
+    """Load a JSON backup file, whether plain or gzip-compressed (archived)"""
+    with (gzip.open(path, 'rt') if is_compressed(path) else open(path, 'r')) as f:
+        return json.load(f)
+
+
+def compress_file(path: str, destination: str):
+    """Write a gzip-compressed copy of a file to destination and remove the original"""
+    with open(path, 'rb') as source, gzip.open(destination, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    os.remove(path)
+
+
+def _line(value) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+
+
+class StreamWriter:
+    def __init__(self, path: str, backup: Dict):
+        """
+        Start a streaming backup file
+
+        The file is written under a temporary name and only appears at path
+        once close() has written the trailer.
+
+        Args:
+            path: Destination file
+            backup: Backup metadata (record lists are ignored)
+        """
+        self.path = path
+        self.records = 0
+        self._hash = hashlib.sha256()
+        self._fd, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        self._file = os.fdopen(self._fd, 'wb')
+        # mtime=0 keeps the compressed bytes reproducible
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode='wb', mtime=0)
+        self._write({"format": STREAM_FORMAT, "version": STREAM_VERSION, "backup": strip_lists(backup)})
+
+    def _write(self, value):
+        line = _line(value)
+        self._hash.update(line)
+        self._gzip.write(line)
+
+    def write(self, list_path: str, record):
+        """
+        Append a record
+
+        Args:
+            list_path: Record list the record belongs to ("unified_records",
+                       "sources.cloudflare.records")
+            record: Record
+        """
+        self._write({"list": list_path, "record": record})
+        self.records += 1
+
+    def close(self):
+        """Write the trailer and move the file into place"""
+        trailer = {"end": True, "records": self.records, "sha256": self._hash.hexdigest()}
+        self._gzip.write(_line(trailer))
+        self._gzip.close()
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discard a partly written file"""
+        self._gzip.close()
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            self.abort()
+        else:
+            self.close()
+
+
+def write_stream(path: str, backup: Dict) -> int:
+    """
+    Write a backup in the streaming format
+
+    Returns:
+        Number of records written
+    """
+    with StreamWriter(path, backup) as writer:
+        for list_path, records in record_lists(backup).items():
+            for record in records:
+                writer.write(list_path, record)
+
+    return writer.records
+
+
+def parse_header(data: bytes) -> Dict:
+    """
+    Backup metadata from the first bytes of a streaming file
+
+    Lets a remote stream be cataloged from a single range request instead
+    of a full download.
+
+    Raises:
+        ValueError: If data does not start with a complete stream header
+    """
+    text = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data)
+    if b"\n" not in text:
+        raise ValueError("Header incomplete")
+
+    header = json.loads(text.split(b"\n", 1)[0])
+    if header.get("format") != STREAM_FORMAT:
+        raise ValueError("Not a streaming backup")
+
+    return header["backup"]
+
+
+def read_header(path: str) -> Dict:
+    """Backup metadata from a streaming file's header (record lists are None)"""
+    with gzip.open(path, 'rb') as f:
+        header = json.loads(f.readline())
+
+    if header.get("format") != STREAM_FORMAT:
+        raise ValueError(f"{path} is not a streaming backup")
+
+    return header["backup"]
+
+
+def iter_records(path: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Read a streaming backup record by record
+
+    The trailer is checked after the last record, so a consumer that reads
+    to the end knows every record it saw was intact.
+
+    Yields:
+        Tuples of (list path, record)
+
+    Raises:
+        ValueError: If the file is truncated, corrupt or fails its checksum
+    """
+    digest = hashlib.sha256()
+    count = 0
+    trailer = None
+
+    with gzip.open(path, 'rb') as f:
+        header = f.readline()
+        if json.loads(header).get("format") != STREAM_FORMAT:
+            raise ValueError(f"{path} is not a streaming backup")
+        digest.update(header)
+
+        for line in f:
+            entry = json.loads(line)
+            if entry.get("end"):
+                trailer = entry
+                break
+
+            digest.update(line)
+            count += 1
+            yield entry["list"], entry["record"]
+
+    if trailer is None:
+        raise ValueError(f"{path} is truncated (no trailer)")
+    if trailer["records"] != count:
+        raise ValueError(f"{path} holds {count} records, trailer says {trailer['records']}")
+    if trailer["sha256"] != digest.hexdigest():
+        raise ValueError(f"{path} failed its checksum")
+
+
+def verify_stream(path: str) -> int:
+    """
+    Verify a streaming backup without loading it
+
+    Returns:
+        Number of records
+
+    Raises:
+        ValueError: If the file is truncated, corrupt or fails its checksum
+    """
+    return sum(1 for _ in iter_records(path))
+
+
+def load_stream(path: str) -> Dict:
+    """Load a complete backup from a streaming file"""
+    lists = {}
+
+    for list_path, record in iter_records(path):
+        lists.setdefault(list_path, []).append(record)
+
+    return fill_lists(read_header(path), lists)
@@ -54,21 +54,29 @@ class CloudflareDNS:
         raise Exception(f"Could not find zone ID for {base_domain}")
     
     def list_dns_records(self, record_type: str = None) -> List[Dict]:
-        """List all DNS records for the zone"""
-        params = {}
+        """List all DNS records for the zone (every page)"""
+        params = {"per_page": 100, "page": 1}
         if record_type:
             params["type"] = record_type
-            
-        response = requests.get(
-            f"{self.base_url}/zones/{self.zone_id}/dns_records",
-            headers=self.headers,
-            params=params
-        )
-        
-        if response.status_code == 200:
-            return response.json()["result"]
-        else:
-            raise Exception(f"Failed to list DNS records: {response.text}")
+
+        records = []
+
+        while True:
+            response = requests.get(
+                f"{self.base_url}/zones/{self.zone_id}/dns_records",
+                headers=self.headers,
+                params=params
+            )
+
+            if response.status_code != 200:
+                raise Exception(f"Failed to list DNS records: {response.text}")
+
+            data = response.json()
+            records.extend(data["result"])
+
+            if params["page"] >= data.get("result_info", {}).get("total_pages", 1):
+                return records
+            params["page"] += 1
     
     def create_dns_record(self, record_type: str, name: str, content: str, 
                           ttl: int = 1, proxied: bool = False, 
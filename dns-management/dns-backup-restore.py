@@ -4,32 +4,79 @@ DNS Backup and Restore System for leo.pvthostel.com
 Automated backup, versioning, and restoration of DNS configurations
 """
 
+import gzip
 import json
 import os
 import sys
 import time
 import shutil
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-import subprocess
+from typing import Dict, Iterator, List, Optional
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from backup_catalog import BackupCatalog
+from backup_delta import apply_delta, canonicalize, count_changes, create_delta, has_duplicate_keys, record_value
+from backup_diff import describe, diff_records, summarize
+from backup_retention import retained
+from backup_storage import LocalStorage, open_storage
+from backup_store import BlobStore, load_backup_file
+from backup_stream import (COMPRESSED_SUFFIX, STREAM_SUFFIX, compress_file, is_stream, iter_records, parse_header,
+                           read_header, read_json, verify_stream, write_stream)
+from dns_resolver import AuthoritativeChecker, CachingResolver, fqdn, normalize_value, propagation_checks
+
+SNAPSHOT_RECORD_TYPES = ["A", "AAAA", "CNAME", "MX", "TXT", "SRV", "CAA"]
+
+# Seconds each source may take during a unified backup
+CAPTURE_DEADLINES = {
+    "cloudflare": 30,
+    "canspace": 60,
+    "dig": 15
+}
+
+# Record fields a restore writes back, per provider
+RESTORE_FIELDS = {
+    "cloudflare": ["value", "ttl", "proxied", "priority"],
+    "canspace": ["value", "ttl", "priority"]
+}
 
 class DNSBackupRestore:
     def __init__(self, domain: str = "leo.pvthostel.com"):
         """
         Initialize DNS backup and restore system
         
+        Backups are kept under DNS_BACKUP_DIR, backup.dir or ./backups.
+        Archived backups go to the backend configured under backup.storage
+        (the local archive directory by default).
+        
         Args:
             domain: Domain to manage backups for
         """
         self.domain = domain
-        self.backup_dir = "/Volumes/DevOps/Projects/02-pvthostel-domains/leo.pvthostel.com/dns-management/backups"
-        self.archive_dir = f"{self.backup_dir}/archive"
         self.config_file = "dns-config.json"
+        self.config = self.load_config()
+        self.backup_dir = os.getenv("DNS_BACKUP_DIR") or self.config.get("backup", {}).get("dir") or "backups"
+        self.archive_dir = f"{self.backup_dir}/archive"
+        self.blob_dir = f"{self.backup_dir}/blobs"
+        self.cache_dir = f"{self.backup_dir}/cache"
+        self.resolver = CachingResolver()
+        self._clients = {}
+        self._clients_lock = threading.Lock()
         
         # Create directories if they don't exist
         os.makedirs(self.backup_dir, exist_ok=True)
         os.makedirs(self.archive_dir, exist_ok=True)
+        self.storage = open_storage(self.config.get("backup", {}).get("storage"), self.archive_dir)
+        # Archives leaving the archive directory are made self-contained
+        self.offload = not (
+            isinstance(self.storage, LocalStorage)
+            and os.path.abspath(self.storage.root) == os.path.abspath(self.archive_dir)
+        )
+        self.store = BlobStore(self.blob_dir)
+        self.catalog = BackupCatalog(f"{self.backup_dir}/catalog.db")
+        if not self.catalog.count(archived=None):
+            self.reindex()
         
         # Import DNS managers
         try:
@@ -42,10 +89,42 @@ class DNSBackupRestore:
             self.cloudflare_available = False
             self.canspace_available = False
     
-    def get_backup_filename(self, provider: str = "unified") -> str:
+    def load_config(self) -> Dict:
+        """Load configuration from file"""
+        if os.path.exists(self.config_file):
+            with open(self.config_file, 'r') as f:
+                return json.load(f)
+        return {}
+    
+    def get_client(self, provider: str):
+        """
+        Get the shared API client for a provider, creating it on first use
+        
+        Clients keep their HTTP sessions (and Canspace its probed endpoint),
+        so repeated captures and restores don't pay the setup again.
+        
+        Raises:
+            ValueError: If the provider is unknown
+        """
+        with self._clients_lock:
+            if provider not in self._clients:
+                if provider == "cloudflare":
+                    from cloudflare_dns import CloudflareDNS
+                    self._clients[provider] = CloudflareDNS(os.getenv("CLOUDFLARE_API_TOKEN"))
+                elif provider == "canspace":
+                    from canspace_dns import CanspaceDNS
+                    self._clients[provider] = CanspaceDNS(
+                        os.getenv("CANSPACE_USERNAME"), os.getenv("CANSPACE_PASSWORD"), self.domain
+                    )
+                else:
+                    raise ValueError(f"Unknown provider: {provider}")
+            
+            return self._clients[provider]
+    
+    def get_backup_filename(self, provider: str = "unified", suffix: str = ".json") -> str:
         """Generate backup filename with timestamp"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return f"{self.backup_dir}/dns_backup_{provider}_{timestamp}.json"
+        return f"{self.backup_dir}/dns_backup_{provider}_{timestamp}{suffix}"
     
     def calculate_checksum(self, data: Dict) -> str:
         """Calculate checksum for backup data"""
@@ -63,10 +142,7 @@ class DNSBackupRestore:
             return None
         
         try:
-            from cloudflare_dns import CloudflareDNS
-            
-            cf = CloudflareDNS(api_token)
-            records = cf.list_dns_records()
+            records = self.get_client("cloudflare").list_dns_records()
             
             backup_data = {
                 "provider": "cloudflare",
@@ -98,10 +174,7 @@ class DNSBackupRestore:
             return None
         
         try:
-            from canspace_dns import CanspaceDNS
-            
-            cs = CanspaceDNS(username, password, self.domain)
-            records = cs.list_dns_records()
+            records = self.get_client("canspace").list_dns_records()
             
             backup_data = {
                 "provider": "canspace",
@@ -120,71 +193,159 @@ class DNSBackupRestore:
             print(f"❌ Error backing up Canspace: {e}")
             return None
     
-    def backup_dig(self) -> Dict:
-        """Backup DNS records using dig command"""
-        record_types = ["A", "AAAA", "CNAME", "MX", "TXT", "SRV", "CAA"]
-        records = []
+    def get_snapshot_names(self) -> List[str]:
+        """Names captured by the public DNS snapshot (backup.snapshot_names plus configured records)"""
+        config = self.config
+        names = [fqdn(name.replace("@", self.domain), self.domain)
+                 for name in config.get("backup", {}).get("snapshot_names", ["@", "www.@"])]
         
-        for rtype in record_types:
-            try:
-                result = subprocess.run(
-                    ["dig", "+short", rtype, self.domain],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                
-                if result.stdout.strip():
-                    for line in result.stdout.strip().split('\n'):
-                        records.append({
-                            "type": rtype,
-                            "name": self.domain,
-                            "value": line,
-                            "source": "dig"
-                        })
-            except Exception:
-                continue
+        for record in config.get("current_records", []) + config.get("monitoring", {}).get("expected_records", []):
+            name = fqdn(record["name"].replace("@", self.domain), self.domain)
+            if name not in names:
+                names.append(name)
+        
+        return names
+    
+    def backup_dig(self, names: List[str] = None, record_types: List[str] = None, axfr: bool = False) -> Dict:
+        """
+        Snapshot DNS records as served publicly
+        
+        Queries the zone's authoritative nameservers directly and concurrently,
+        keeping full RRsets with their original TTLs. With axfr, the whole zone
+        is transferred instead where a server permits it. Falls back to the
+        system resolver (remaining TTLs) if the nameservers can't be reached.
+        
+        Args:
+            names: Record names to capture (default: get_snapshot_names())
+            record_types: Types to capture per name (default: SNAPSHOT_RECORD_TYPES)
+            axfr: Try a zone transfer first
+        
+        Returns:
+            Backup data with provider "dig" and the capture method used
+        """
+        names = [fqdn(name, self.domain) for name in names] if names else self.get_snapshot_names()
+        record_types = record_types or SNAPSHOT_RECORD_TYPES
+        checker = AuthoritativeChecker(resolver=self.resolver)
+        start = time.perf_counter()
+        
+        records = None
+        errors = []
+        method = "authoritative"
+        zone = None
+        servers = {}
         
-        # Check www subdomain
         try:
-            result = subprocess.run(
-                ["dig", "+short", "CNAME", f"www.{self.domain}"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
+            zone = checker.find_zone(self.domain)
+            servers = checker.nameservers(zone)
+        except Exception as e:
+            print(f"⚠️ Authoritative nameservers unavailable ({e}), using the system resolver")
+        
+        if axfr and servers:
+            try:
+                transfer = checker.transfer(zone, servers)
+                records = transfer["records"]
+                method = "axfr"
+            except Exception as e:
+                print(f"⚠️ {e}, querying names instead")
+        
+        if records is None and servers:
+            snapshot = checker.snapshot(names, record_types, servers)
+            records = snapshot["records"]
+            errors = snapshot["errors"]
+        
+        if records is None:
+            method = "recursive"
+            lookups = [(name, rtype) for name in names for rtype in record_types]
             
-            if result.stdout.strip():
-                records.append({
-                    "type": "CNAME",
-                    "name": f"www.{self.domain}",
-                    "value": result.stdout.strip(),
-                    "source": "dig"
-                })
-        except Exception:
-            pass
+            with ThreadPoolExecutor(max_workers=min(16, len(lookups))) as executor:
+                answers = list(executor.map(lambda lookup: self.resolver.resolve(*lookup, bypass=True), lookups))
+            
+            records = []
+            for (name, rtype), answer in zip(lookups, answers):
+                if answer["status"] in ["timeout", "error"]:
+                    errors.append(f"{rtype} {name}")
+                for value in answer["values"]:
+                    records.append({"type": rtype, "name": name, "value": value, "ttl": answer["ttl"]})
+        
+        for record in records:
+            record["source"] = "dig"
+            # Restorable form: MX priority kept separately, no root dots, TXT strings joined
+            if record["type"] == "MX":
+                priority, record["value"] = record["value"].split(None, 1)
+                record["priority"] = int(priority)
+            if record["type"] in ["CNAME", "MX", "NS"]:
+                record["value"] = record["value"].rstrip(".")
+            if record["type"] == "TXT":
+                record["value"] = normalize_value("TXT", record["value"])
         
         backup_data = {
             "provider": "dig",
             "domain": self.domain,
             "timestamp": datetime.now().isoformat(),
+            "method": method,
+            "zone": zone,
+            "nameservers": list(servers),
+            "names": names if method != "axfr" else None,
             "records": records,
             "total_records": len(records),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
             "note": "Public DNS query results"
         }
+        if errors:
+            backup_data["errors"] = errors
         
         backup_data["checksum"] = self.calculate_checksum(backup_data)
         
         return backup_data
     
     def create_unified_backup(self) -> Dict:
-        """Create unified backup from all sources"""
+        """
+        Create unified backup from all sources
+        
+        Cloudflare, Canspace and public DNS are captured concurrently, each
+        under its own deadline (backup.deadlines, see CAPTURE_DEADLINES). A
+        source that fails or runs out of time is left out and the backup is
+        flagged partial, with the reason recorded under "captures".
+        
+        Returns:
+            Unified backup data
+        """
         print("📦 Creating unified backup...")
         
+        deadlines = dict(CAPTURE_DEADLINES)
+        deadlines.update(self.config.get("backup", {}).get("deadlines", {}))
+        sources = {
+            "cloudflare": self.backup_cloudflare,
+            "canspace": self.backup_canspace,
+            "dig": self.backup_dig
+        }
+        captures = {source: {"status": "timeout"} for source in sources}
+        
+        def capture(source, func):
+            started = time.perf_counter()
+            try:
+                data = func()
+                captures[source] = {"status": "ok", "data": data} if data else {"status": "unavailable"}
+            except Exception as e:
+                captures[source] = {"status": "failed", "error": str(e)}
+            captures[source]["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        
+        # Daemon threads: a hung provider must not keep the process alive past its deadline
+        threads = {
+            source: threading.Thread(target=capture, args=(source, func), name=f"backup-{source}", daemon=True)
+            for source, func in sources.items()
+        }
+        start = time.monotonic()
+        for thread in threads.values():
+            thread.start()
+        for source, thread in threads.items():
+            thread.join(max(0, start + deadlines[source] - time.monotonic()))
+        
         unified = {
             "domain": self.domain,
             "timestamp": datetime.now().isoformat(),
             "sources": {},
+            "captures": {},
             "unified_records": [],
             "metadata": {
                 "backup_tool": "dns-backup-restore.py",
@@ -192,22 +353,28 @@ class DNSBackupRestore:
             }
         }
         
-        # Backup from Cloudflare
-        cf_backup = self.backup_cloudflare()
-        if cf_backup:
-            unified["sources"]["cloudflare"] = cf_backup
-            print("  ✅ Cloudflare backed up")
+        labels = {"cloudflare": "Cloudflare", "canspace": "Canspace", "dig": "Public DNS"}
         
-        # Backup from Canspace
-        cs_backup = self.backup_canspace()
-        if cs_backup:
-            unified["sources"]["canspace"] = cs_backup
-            print("  ✅ Canspace backed up")
+        for source, thread in threads.items():
+            result = dict(captures[source]) if not thread.is_alive() else {"status": "timeout"}
+            data = result.pop("data", None)
+            
+            if data:
+                unified["sources"][source] = data
+                print(f"  ✅ {labels[source]} backed up ({result['duration_ms'] / 1000:.1f}s)")
+            elif result["status"] == "timeout":
+                result["error"] = f"No response within {deadlines[source]}s"
+                print(f"  ⏱️ {labels[source]} timed out after {deadlines[source]}s")
+            else:
+                print(f"  ⚠️ {labels[source]} not captured ({result.get('error', result['status'])})")
+            
+            unified["captures"][source] = result
         
-        # Backup using dig
-        dig_backup = self.backup_dig()
-        unified["sources"]["dig"] = dig_backup
-        print("  ✅ Public DNS backed up")
+        missing = [source for source, result in unified["captures"].items() if result["status"] != "ok"]
+        unified["partial"] = bool(missing)
+        if missing:
+            unified["missing_sources"] = missing
+            print(f"  ⚠️ Partial backup: missing {', '.join(missing)}")
         
         # Create unified record list
         seen_records = set()
@@ -226,6 +393,7 @@ class DNSBackupRestore:
                                 "name": record.get("name"),
                                 "value": record.get("value", record.get("content", record.get("data"))),
                                 "ttl": record.get("ttl", 3600),
+                                "priority": record.get("priority"),
                                 "source": source_name
                             })
         
@@ -235,65 +403,285 @@ class DNSBackupRestore:
         return unified
     
     def save_backup(self, backup_data: Dict, filename: str = None) -> str:
-        """Save backup to file"""
+        """
+        Save a backup as a manifest or a stream
+        
+        Manifests move record lists to the content-addressed blob store; the
+        file only holds metadata and {"$ref": hash} pointers, so a snapshot
+        identical to an earlier one costs a few hundred bytes. With
+        backup.format set to "stream" (or a .jsonl.gz filename), full
+        backups are written record by record as compressed JSON Lines instead.
+        """
+        stream = filename.endswith(STREAM_SUFFIX) if filename else (
+            self.config.get("backup", {}).get("format") == "stream" and backup_data.get("kind") != "delta"
+        )
+        
         if not filename:
             provider = backup_data.get("provider", "unified")
-            filename = self.get_backup_filename(provider)
+            filename = self.get_backup_filename(provider, STREAM_SUFFIX if stream else ".json")
+        
+        if stream:
+            written = write_stream(filename, backup_data)
+            self.catalog.add(filename, backup_data, os.path.getsize(filename))
+            print(f"💾 Backup saved to {filename} ({written} records streamed)")
+            self.link_latest(filename, backup_data.get("provider", "unified"))
+            return filename
+        
+        created, reused = self.store.created, self.store.reused
+        manifest = self.store.dehydrate(backup_data)
         
         with open(filename, 'w') as f:
-            json.dump(backup_data, f, indent=2)
+            json.dump(manifest, f, indent=2)
         
-        print(f"💾 Backup saved to {filename}")
+        self.catalog.add(filename, backup_data, os.path.getsize(filename))
         
-        # Create latest symlink
-        latest_link = f"{self.backup_dir}/latest_{backup_data.get('provider', 'unified')}.json"
-        if os.path.exists(latest_link):
-            os.remove(latest_link)
-        os.symlink(filename, latest_link)
+        print(f"💾 Backup saved to {filename} "
+              f"({self.store.created - created} new record set(s), {self.store.reused - reused} reused)")
+        
+        self.link_latest(filename, backup_data.get("provider", "unified"))
         
         return filename
     
-    def list_backups(self, days: int = 30) -> List[Dict]:
-        """List available backups"""
-        backups = []
-        cutoff_date = datetime.now() - timedelta(days=days)
+    def link_latest(self, filename: str, provider: str):
+        """
+        Point the provider's latest symlink at a backup
+
+        The target is relative to the link's own directory, so the link
+        resolves whether backup_dir is relative or absolute.
+        """
+        latest_link = f"{self.backup_dir}/latest_{provider}.json"
+        if os.path.lexists(latest_link):
+            os.remove(latest_link)
+        os.symlink(os.path.relpath(os.path.abspath(filename), os.path.dirname(os.path.abspath(latest_link))),
+                   latest_link)
+    
+    def find_backup(self, filename: str) -> str:
+        """
+        Path of a backup by file name, wherever it currently lives
         
-        for filename in os.listdir(self.backup_dir):
-            if filename.startswith("dns_backup_") and filename.endswith(".json"):
-                filepath = os.path.join(self.backup_dir, filename)
-                
-                # Get file info
-                stat = os.stat(filepath)
-                mod_time = datetime.fromtimestamp(stat.st_mtime)
+        Raises:
+            FileNotFoundError: If the backup is not in the catalog or on disk
+        """
+        entry = self.catalog.get(filename)
+        if entry and (os.path.exists(entry["path"]) or self.storage.key(entry["path"]) is not None):
+            return self.local_path(entry["path"])
+        
+        for directory in [self.backup_dir, self.archive_dir]:
+            for name in [filename, filename + COMPRESSED_SUFFIX]:
+                if os.path.exists(os.path.join(directory, name)):
+                    return os.path.join(directory, name)
+        
+        raise FileNotFoundError(f"Backup {filename} not found")
+    
+    def local_path(self, location: str) -> str:
+        """
+        Local file for a backup location
+        
+        Backups held by the storage backend are downloaded into the cache
+        directory on first use; local paths are returned as they are.
+        """
+        if os.path.exists(location):
+            return location
+        
+        key = self.storage.key(location)
+        if key is None:
+            return location
+        
+        cached = os.path.join(self.cache_dir, os.path.basename(key))
+        if not os.path.exists(cached):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.storage.get(key, cached + ".part")
+            os.replace(cached + ".part", cached)
+        
+        return cached
+    
+    def delete_backup_file(self, location: str):
+        """Delete a backup file, locally or in the storage backend"""
+        if os.path.exists(location):
+            os.remove(location)
+        elif self.storage.key(location) is not None:
+            self.storage.delete(self.storage.key(location))
+            cached = os.path.join(self.cache_dir, os.path.basename(location))
+            if os.path.exists(cached):
+                os.remove(cached)
+    
+    def load_backup(self, filepath: str) -> Dict:
+        """
+        Load a complete backup
+        
+        Resolves blob references and replays incremental chains; legacy full
+        files load as they are.
+        """
+        return load_backup_file(self.local_path(filepath), self.blob_dir, self.find_backup)
+    
+    def save_incremental(self, backup_data: Dict, full_every: int = None) -> str:
+        """
+        Save a backup as a delta against the previous backup of its provider
+        
+        Only added, removed and changed records are written. Every full_every
+        backups (backup.full_every, default 24) a full snapshot starts a new
+        chain, which bounds the replay needed to reconstruct any backup.
+        
+        Args:
+            backup_data: Complete backup
+            full_every: Chain length after which a full snapshot is taken
+        
+        Returns:
+            Path of the saved file
+        """
+        full_every = full_every or self.config.get("backup", {}).get("full_every", 24)
+        backup_data = canonicalize(backup_data, self.calculate_checksum)
+        parent_entry = self.catalog.latest(backup_data.get("provider", "unified"))
+        
+        parent = None
+        if parent_entry and parent_entry["chain"] + 1 < full_every and not has_duplicate_keys(backup_data):
+            try:
+                parent = canonicalize(self.load_backup(parent_entry["path"]), self.calculate_checksum)
+            except Exception as e:
+                print(f"⚠️ Previous backup unreadable ({e}), taking a full snapshot")
+        
+        if parent is not None and not has_duplicate_keys(parent):
+            delta = create_delta(parent, backup_data)
+            
+            # Never write a delta that would not reproduce the backup exactly
+            if apply_delta(parent, delta) == backup_data:
+                delta.update({
+                    "kind": "delta",
+                    "parent": parent_entry["filename"],
+                    "chain": parent_entry["chain"] + 1,
+                    "provider": backup_data.get("provider", "unified"),
+                    "timestamp": backup_data.get("timestamp"),
+                    "total_records": backup_data.get("total_records", 0),
+                    "partial": backup_data.get("partial", False),
+                    "checksum": backup_data.get("checksum")
+                })
                 
-                if mod_time >= cutoff_date:
-                    # Load backup metadata
+                print(f"🧩 Incremental backup: {count_changes(delta)} change(s) since {parent_entry['filename']}")
+                return self.save_backup(delta)
+        
+        print("📸 Full snapshot")
+        return self.save_backup(backup_data)
+    
+    def backup_at(self, when: datetime, provider: str = "unified") -> Optional[Dict]:
+        """
+        Reconstruct the newest backup taken at or before a point in time
+        
+        Args:
+            when: Point in time
+            provider: Provider the backup came from
+        
+        Returns:
+            Complete backup, or None if there is none that old
+        """
+        entry = self.catalog.latest(provider, before=int(when.timestamp()))
+        return self.load_backup(entry["path"]) if entry else None
+    
+    @staticmethod
+    def is_backup_name(filename: str) -> bool:
+        """Check whether a file name is a backup's (current, archived or streaming)"""
+        return filename.startswith("dns_backup_") and filename.endswith(
+            (".json", ".json" + COMPRESSED_SUFFIX, STREAM_SUFFIX)
+        )
+    
+    @staticmethod
+    def catalog_name(filename: str) -> str:
+        """Name a backup file is cataloged (and referenced by deltas) under"""
+        # Compressed archives keep the name deltas refer to them by
+        if filename.endswith(".json" + COMPRESSED_SUFFIX):
+            return filename[:-len(COMPRESSED_SUFFIX)]
+        return filename
+    
+    def reindex(self) -> int:
+        """
+        Rebuild the catalog by reading every backup file
+        
+        Only needed once for backups written before the catalog existed, or
+        after files were changed by hand.
+        
+        Returns:
+            Number of backups cataloged
+        """
+        self.catalog.clear()
+        indexed = 0
+        
+        for directory, archived in [(self.backup_dir, False), (self.archive_dir, True)]:
+            for filename in os.listdir(directory):
+                if self.is_backup_name(filename):
+                    filepath = os.path.join(directory, filename)
                     try:
-                        with open(filepath, 'r') as f:
-                            data = json.load(f)
-                        
-                        backups.append({
-                            "filename": filename,
-                            "filepath": filepath,
-                            "size": stat.st_size,
-                            "modified": mod_time.isoformat(),
-                            "provider": data.get("provider", "unknown"),
-                            "records": data.get("total_records", 0),
-                            "checksum": data.get("checksum", "")
-                        })
+                        data = read_header(filepath) if is_stream(filepath) else read_json(filepath)
                     except Exception:
                         continue
+                    
+                    if not data.get("timestamp"):
+                        data["timestamp"] = datetime.fromtimestamp(os.stat(filepath).st_mtime).isoformat()
+                    self.catalog.add(filepath, data, os.path.getsize(filepath), archived=archived,
+                                     filename=self.catalog_name(filename))
+                    indexed += 1
         
-        # Sort by modification time
-        backups.sort(key=lambda x: x["modified"], reverse=True)
+        if self.offload:
+            for item in self.storage.list():
+                filename = os.path.basename(item["key"])
+                if not self.is_backup_name(filename):
+                    continue
+                
+                location = self.storage.url(item["key"])
+                try:
+                    if filename.endswith(STREAM_SUFFIX):
+                        # Only the header is needed: one range request, not a download
+                        data = parse_header(self.storage.read_range(item["key"], 0, 64 * 1024))
+                    else:
+                        data = read_json(self.local_path(location))
+                except Exception:
+                    continue
+                
+                self.catalog.add(location, data, item["size"], archived=True, filename=self.catalog_name(filename))
+                indexed += 1
+        
+        return indexed
+    
+    def list_backups(self, days: int = 30, provider: str = None, limit: int = None, offset: int = 0) -> List[Dict]:
+        """
+        List available backups from the catalog, newest first
         
-        return backups
+        Args:
+            days: Only backups from the last N days
+            provider: Only backups of this provider
+            limit: Page size (None for all)
+            offset: Backups to skip
+        """
+        since = int((datetime.now() - timedelta(days=days)).timestamp())
+        
+        return [
+            {
+                "filename": entry["filename"],
+                "filepath": entry["path"],
+                "size": entry["size"],
+                "modified": entry["timestamp"],
+                "provider": entry["provider"],
+                "records": entry["records"],
+                "partial": entry["partial"],
+                "kind": entry["kind"],
+                "checksum": entry["checksum"]
+            }
+            for entry in self.catalog.query(provider=provider, since=since, limit=limit, offset=offset)
+        ]
     
     def verify_backup(self, filepath: str) -> bool:
-        """Verify backup integrity"""
+        """
+        Verify backup integrity
+        
+        Streaming backups are checked against their trailer one record at a
+        time; other backups are loaded and their checksum recomputed.
+        """
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
+            filepath = self.local_path(filepath)
+            if is_stream(filepath):
+                records = verify_stream(filepath)
+                print(f"✅ Backup integrity verified ({records} records)")
+                return True
+            
+            data = self.load_backup(filepath)
             
             stored_checksum = data.get("checksum", "")
             
@@ -315,52 +703,102 @@ class DNSBackupRestore:
             print(f"❌ Error verifying backup: {e}")
             return False
     
-    def compare_backups(self, file1: str, file2: str) -> Dict:
-        """Compare two backup files"""
-        with open(file1, 'r') as f:
-            data1 = json.load(f)
-        
-        with open(file2, 'r') as f:
-            data2 = json.load(f)
-        
-        # Extract records
-        records1 = set()
-        records2 = set()
-        
-        def extract_records(data):
-            records = set()
-            
-            if "unified_records" in data:
-                for r in data["unified_records"]:
-                    key = f"{r['type']}:{r['name']}:{r['value']}"
-                    records.add(key)
-            elif "records" in data:
-                for r in data["records"]:
-                    if isinstance(r, dict):
-                        value = r.get("value", r.get("content", r.get("data", "")))
-                        key = f"{r.get('type', '')}:{r.get('name', '')}:{value}"
-                        records.add(key)
-            
-            return records
-        
-        records1 = extract_records(data1)
-        records2 = extract_records(data2)
-        
-        comparison = {
-            "file1": os.path.basename(file1),
-            "file2": os.path.basename(file2),
-            "date1": data1.get("timestamp", ""),
-            "date2": data2.get("timestamp", ""),
-            "added": list(records2 - records1),
-            "removed": list(records1 - records2),
-            "unchanged": list(records1 & records2),
-            "total_changes": len(records2 - records1) + len(records1 - records2)
-        }
+    def resolve_backup(self, reference: str, provider: str = "unified") -> str:
+        """
+        Path of a backup given as a path, a cataloged file name or a timestamp
+        
+        A timestamp selects the provider's newest backup at or before it.
+        """
+        if os.path.exists(reference):
+            return reference
+        
+        entry = self.catalog.get(os.path.basename(reference))
+        if entry:
+            return self.local_path(entry["path"])
+        
+        try:
+            when = datetime.fromisoformat(reference)
+        except ValueError:
+            raise FileNotFoundError(f"Backup {reference} not found")
+        
+        entry = self.catalog.latest(provider, before=int(when.timestamp()))
+        if not entry:
+            raise FileNotFoundError(f"No {provider} backup at or before {reference}")
+        return self.local_path(entry["path"])
+    
+    def backup_records(self, filepath: str) -> Iterator[Dict]:
+        """
+        Records of a backup (unified records if present)
+        
+        Streaming backups are read one record at a time without loading the
+        rest of the file.
+        """
+        if is_stream(filepath):
+            field = "unified_records" if "unified_records" in read_header(filepath) else "records"
+            return (record for path, record in iter_records(filepath) if path == field)
+        
+        data = self.load_backup(filepath)
+        return iter(data.get("unified_records", data.get("records", [])))
+    
+    def compare_backups(self, file1: str, file2: str, provider: str = "unified") -> Dict:
+        """
+        Compare two backups
+        
+        Records are matched by type and name, so changed values, TTLs or
+        proxy settings are reported as modifications with the fields that
+        differ. Either side may be a path, a cataloged file name or a
+        timestamp; backups with the same checksum are not opened at all.
+        
+        Args:
+            file1: Older backup
+            file2: Newer backup
+            provider: Provider whose history timestamps refer to
+        
+        Returns:
+            Comparison with added, removed and modified changes (see
+            backup_diff.diff_records), the unchanged count and total_changes
+        """
+        path1 = self.resolve_backup(file1, provider)
+        path2 = self.resolve_backup(file2, provider)
+        entry1 = self.catalog.get(os.path.basename(path1))
+        entry2 = self.catalog.get(os.path.basename(path2))
+        
+        if entry1 and entry2 and entry1["checksum"] and entry1["checksum"] == entry2["checksum"]:
+            comparison = {"added": [], "removed": [], "modified": [], "unchanged": entry2["records"], "total_changes": 0}
+        else:
+            comparison = summarize(diff_records(self.backup_records(path1), self.backup_records(path2)))
+        
+        def timestamp(path, entry):
+            if entry:
+                return entry["timestamp"]
+            return (read_header(path) if is_stream(path) else self.load_backup(path)).get("timestamp", "")
+        
+        comparison.update({
+            "file1": os.path.basename(path1),
+            "file2": os.path.basename(path2),
+            "date1": timestamp(path1, entry1),
+            "date2": timestamp(path2, entry2)
+        })
         
         return comparison
     
-    def restore_backup(self, filepath: str, provider: str = None, dry_run: bool = True):
-        """Restore DNS records from backup"""
+    def restore_backup(self, filepath: str, provider: str = None, dry_run: bool = True, wait: bool = False,
+                       prune: bool = False):
+        """
+        Restore DNS records from backup
+        
+        The backup is diffed against the provider's live records once, and
+        only the records that are missing or differ are written, so a restore
+        can be re-run safely. Afterwards the changed records are checked on
+        the authoritative nameservers (with wait, until they are served).
+        
+        Args:
+            filepath: Backup to restore
+            provider: Provider to restore to (default: the backup's provider)
+            dry_run: Only show the plan
+            wait: Block until the authoritative nameservers serve the changes
+            prune: Also delete live records that are not in the backup
+        """
         print(f"{'🔍 DRY RUN' if dry_run else '⚠️ RESTORE'}: {filepath}")
         
         # Verify backup first
@@ -368,178 +806,512 @@ class DNSBackupRestore:
             print("❌ Backup verification failed. Aborting restore.")
             return False
         
-        with open(filepath, 'r') as f:
-            backup_data = json.load(f)
+        backup_data = self.load_backup(filepath)
         
         # Determine provider
         if not provider:
             provider = backup_data.get("provider", "cloudflare")
         
         print(f"Provider: {provider}")
-        print(f"Records to restore: {backup_data.get('total_records', 0)}")
+        print(f"Records in backup: {backup_data.get('total_records', 0)}")
         
-        if dry_run:
-            print("\n📋 Records that would be restored:")
-            
-            if "unified_records" in backup_data:
-                records = backup_data["unified_records"]
-            elif "records" in backup_data:
-                records = backup_data["records"]
-            else:
-                records = []
-            
-            for i, record in enumerate(records[:10], 1):
-                if isinstance(record, dict):
-                    rtype = record.get("type", "")
-                    name = record.get("name", "")
-                    value = record.get("value", record.get("content", record.get("data", "")))
-                    print(f"  {i}. {rtype} {name} → {value}")
-            
-            if len(records) > 10:
-                print(f"  ... and {len(records) - 10} more records")
-            
-            print("\n✅ Dry run complete. No changes made.")
-            print("💡 Run with --no-dry-run to actually restore")
+        available = {"cloudflare": self.cloudflare_available, "canspace": self.canspace_available}
+        if not available.get(provider):
+            print(f"❌ Provider {provider} not available for restore")
+            return False
         
-        else:
-            # Create backup before restore
+        live = None
+        pre_restore_file = None
+        
+        if not dry_run:
+            # The pre-restore backup doubles as the live state to diff against
             print("\n💾 Creating backup before restore...")
             current_backup = self.create_unified_backup()
             pre_restore_file = self.save_backup(
                 current_backup,
                 f"{self.backup_dir}/pre_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
             )
-            
             print(f"✅ Pre-restore backup saved: {pre_restore_file}")
             
-            # Perform restore
-            print("\n⚠️ Starting restore process...")
+            source = current_backup["sources"].get(provider)
+            live = source["records"] if source else None
+        
+        if live is None:
+            try:
+                live = self.get_client(provider).list_dns_records()
+            except Exception as e:
+                if not dry_run:
+                    print(f"❌ Could not read live {provider} records: {e}")
+                    return False
+                print(f"⚠️ Could not read live {provider} records ({e}), planning against an empty zone")
+                live = []
+        
+        try:
+            records = self.restore_records(backup_data, provider)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+        
+        plan = self.plan_restore(records, live, provider, prune)
+        
+        print(f"\n📋 Restore plan: {len(plan['create'])} to create, {len(plan['update'])} to update, "
+              f"{len(plan['delete'])} to delete, {plan['unchanged']} already in place")
+        for action in ["create", "update", "delete"]:
+            for change in plan[action]:
+                print(f"  {action}: {describe(change)}")
+        
+        if dry_run:
+            print("\n✅ Dry run complete. No changes made.")
+            print("💡 Run with --no-dry-run to actually restore")
+            return True
+        
+        if not any(plan[action] for action in ["create", "update", "delete"]):
+            print("\n✅ Live records already match the backup")
+            return True
+        
+        print("\n⚠️ Starting restore process...")
+        
+        if provider == "cloudflare":
+            result = self.restore_to_cloudflare(plan)
+        else:
+            result = self.restore_to_canspace(plan)
+        
+        print(f"\n{'✅' if not result['failed'] else '⚠️'} Restore complete: "
+              f"{result['applied']} change(s) applied, {len(result['failed'])} failed")
+        print(f"💡 If issues occur, restore from: {pre_restore_file}")
+        
+        changed = [change["new"] for change in plan["create"] + plan["update"]]
+        verification = self.wait_for_propagation(changed, timeout=300 if wait else 0)
+        
+        if result["failed"]:
+            return False
+        if wait and verification and not verification["propagated"]:
+            return False
+        
+        return True
+    
+    def restore_records(self, backup_data: Dict, provider: str) -> List[Dict]:
+        """
+        Records of a backup to restore to a provider
+        
+        A unified backup's merged record list mixes every source's spellings,
+        so only the target provider's own captured records are used.
+        
+        Raises:
+            ValueError: If a unified backup holds no records from the provider
+        """
+        if "sources" not in backup_data:
+            return backup_data.get("records", [])
+        
+        source = backup_data["sources"].get(provider)
+        if not source or not isinstance(source.get("records"), list):
+            raise ValueError(f"Backup has no {provider} records to restore")
+        
+        return source["records"]
+    
+    def _restore_view(self, record: Dict) -> Dict:
+        """Copy of a record with name and value normalized for pairing across spellings"""
+        view = {key: value for key, value in record.items() if key not in ["value", "content", "data"]}
+        view["name"] = fqdn(str(record.get("name", "")), self.domain)
+        view["value"] = normalize_value(record.get("type", ""), record_value(record) or "")
+        return view
+    
+    def plan_restore(self, records: List[Dict], live: List[Dict], provider: str, prune: bool = False) -> Dict:
+        """
+        Changes that bring a provider's live records in line with a backup
+        
+        Names and values on both sides are normalized (dns_resolver.
+        normalize_value) before records are paired, so trailing dots, case
+        or TXT quoting never look like a change. Only fields the provider can
+        restore are compared, and only where the backup records them (a
+        unified backup has no proxied flag, for instance), so provider
+        bookkeeping never causes a rewrite. Changes refer to the original
+        records, and updates write the backup's own spelling of the value.
+        
+        Args:
+            records: Backup records
+            live: Provider's current records
+            provider: Provider name
+            prune: Also delete live records that are not in the backup
+        
+        Returns:
+            Dictionary with create, update and delete change lists (see
+            backup_diff.diff_records) and the unchanged count
+        """
+        plan = {"create": [], "update": [], "delete": [], "unchanged": 0}
+        originals = {}
+        
+        def views(side):
+            result = []
+            for record in side:
+                if isinstance(record, dict):
+                    view = self._restore_view(record)
+                    originals[id(view)] = record
+                    result.append(view)
+            return result
+        
+        live_views = views(live)
+        record_views = views(records)
+        
+        for change in diff_records(live_views, record_views):
+            change["old"] = originals.get(id(change["old"]))
+            change["new"] = originals.get(id(change["new"]))
             
-            if provider == "cloudflare" and self.cloudflare_available:
-                self.restore_to_cloudflare(backup_data)
-            elif provider == "canspace" and self.canspace_available:
-                self.restore_to_canspace(backup_data)
+            if change["action"] == "added":
+                plan["create"].append(change)
+            elif change["action"] == "removed":
+                if prune:
+                    plan["delete"].append(change)
             else:
-                print(f"❌ Provider {provider} not available for restore")
-                return False
-            
-            print("\n✅ Restore complete!")
-            print(f"💡 If issues occur, restore from: {pre_restore_file}")
+                change["fields"] = {
+                    field: detail for field, detail in change["fields"].items()
+                    if field in RESTORE_FIELDS[provider] and detail["new"] is not None
+                }
+                if "value" in change["fields"]:
+                    change["fields"]["value"]["new"] = record_value(change["new"])
+                if change["fields"]:
+                    plan["update"].append(change)
+                else:
+                    plan["unchanged"] += 1
         
-        return True
+        return plan
     
-    def restore_to_cloudflare(self, backup_data: Dict):
-        """Restore records to Cloudflare"""
-        from cloudflare_dns import CloudflareDNS
+    def wait_for_propagation(self, records: List[Dict], timeout: float = 300) -> Optional[Dict]:
+        """
+        Check that the zone's authoritative nameservers serve the restored records
         
-        api_token = os.getenv("CLOUDFLARE_API_TOKEN")
-        cf = CloudflareDNS(api_token)
+        With a timeout of 0 the servers are checked once; otherwise this
+        blocks until they all serve the records or the timeout passes.
+        """
+        checks = propagation_checks([record for record in records if isinstance(record, dict)])
+        if not checks:
+            return None
+        
+        checker = AuthoritativeChecker(resolver=self.resolver)
+        print(f"\n⏳ Checking {len(checks)} record(s) on the authoritative nameservers...")
+        
+        try:
+            result = checker.wait_for_propagation(checks, timeout=timeout, zone=checker.find_zone(self.domain))
+        except Exception as e:
+            print(f"❌ Could not check propagation: {e}")
+            return None
         
-        if "unified_records" in backup_data:
-            records = backup_data["unified_records"]
-        elif "records" in backup_data:
-            records = backup_data["records"]
+        if result["propagated"]:
+            print(f"✅ Served by all {len(result['nameservers'])} nameservers after {result['elapsed_s']}s")
         else:
-            records = []
+            print(f"⚠️ Not yet served everywhere after {result['elapsed_s']}s:")
+            for key in result["pending"]:
+                print(f"  - {key}")
         
-        for record in records:
-            if isinstance(record, dict):
-                try:
-                    cf.update_or_create(
-                        record.get("type"),
-                        record.get("name"),
-                        record.get("value", record.get("content")),
-                        ttl=record.get("ttl", 1),
-                        proxied=record.get("proxied", False),
-                        priority=record.get("priority")
-                    )
-                    print(f"  ✅ Restored: {record.get('type')} {record.get('name')}")
-                except Exception as e:
-                    print(f"  ❌ Failed: {record.get('name')} - {e}")
+        return result
+    
+    def _run_restore_operation(self, label: str, operation) -> Optional[str]:
+        """Run one restore operation, returning an error message if it fails"""
+        try:
+            if operation() is False:
+                raise RuntimeError("rejected by provider")
+            print(f"  ✅ Restored: {label}")
+            return None
+        except Exception as e:
+            print(f"  ❌ Failed: {label} - {e}")
+            return f"{label}: {e}"
     
-    def restore_to_canspace(self, backup_data: Dict):
-        """Restore records to Canspace"""
-        from canspace_dns import CanspaceDNS
+    def restore_to_cloudflare(self, plan: Dict) -> Dict:
+        """
+        Apply a restore plan to Cloudflare
         
-        username = os.getenv("CANSPACE_USERNAME")
-        password = os.getenv("CANSPACE_PASSWORD")
-        cs = CanspaceDNS(username, password, self.domain)
+        Records are addressed by ID, so the changes are independent and run
+        concurrently (backup.restore_workers, default 8).
         
-        if "unified_records" in backup_data:
-            records = backup_data["unified_records"]
-        elif "records" in backup_data:
-            records = backup_data["records"]
-        else:
-            records = []
+        Returns:
+            Dictionary with the number of changes applied and failure messages
+        """
+        cf = self.get_client("cloudflare")
+        operations = []
         
-        for record in records:
-            if isinstance(record, dict):
-                try:
-                    cs.create_dns_record(
-                        record.get("type"),
-                        record.get("name"),
-                        record.get("value", record.get("data")),
-                        ttl=record.get("ttl", 14400),
-                        priority=record.get("priority")
-                    )
-                    print(f"  ✅ Restored: {record.get('type')} {record.get('name')}")
-                except Exception as e:
-                    print(f"  ❌ Failed: {record.get('name')} - {e}")
+        for change in plan["create"]:
+            record = change["new"]
+            operations.append((f"create {describe(change)}", lambda record=record: cf.create_dns_record(
+                record.get("type"),
+                record.get("name"),
+                record_value(record),
+                ttl=record.get("ttl") or 1,
+                proxied=record.get("proxied", False),
+                priority=record.get("priority")
+            )))
+        
+        for change in plan["update"]:
+            fields = {
+                "content" if field == "value" else field: detail["new"]
+                for field, detail in change["fields"].items()
+            }
+            operations.append((f"update {describe(change)}",
+                               lambda change=change, fields=fields: cf.update_dns_record(change["old"]["id"], **fields)))
+        
+        for change in plan["delete"]:
+            operations.append((f"delete {describe(change)}",
+                               lambda change=change: cf.delete_dns_record(change["old"]["id"])))
+        
+        workers = self.config.get("backup", {}).get("restore_workers", 8)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(operations)))) as executor:
+            errors = list(executor.map(lambda operation: self._run_restore_operation(*operation), operations))
+        
+        failed = [error for error in errors if error]
+        return {"applied": len(operations) - len(failed), "failed": failed}
+    
+    def _canspace_params(self, record: Dict, fields: List[str]) -> Dict:
+        """cPanel edit_zone_record parameters for some fields of a record"""
+        params = {}
+        
+        if "value" in fields:
+            value = record_value(record)
+            if record["type"] in ["A", "AAAA"]:
+                params["address"] = value
+            elif record["type"] == "CNAME":
+                params["cname"] = value
+            elif record["type"] == "TXT":
+                params["txtdata"] = value
+            else:
+                params["target"] = value
+        for field in ["ttl", "priority"]:
+            if field in fields:
+                params[field] = record[field]
+        
+        return params
+    
+    def restore_to_canspace(self, plan: Dict) -> Dict:
+        """
+        Apply a restore plan to Canspace
+        
+        cPanel addresses records by zone line and every edit rewrites the
+        zone, so changes run one at a time: in-place updates first, then
+        deletes from the bottom of the zone up (so earlier line numbers stay
+        valid), then creates, which are appended.
+        
+        Returns:
+            Dictionary with the number of changes applied and failure messages
+        """
+        cs = self.get_client("canspace")
+        operations = []
+        
+        for change in plan["update"]:
+            params = self._canspace_params(change["new"], list(change["fields"]))
+            operations.append((f"update {describe(change)}",
+                               lambda change=change, params=params: cs.update_dns_record(change["old"]["line"], **params)))
+        
+        for change in sorted(plan["delete"], key=lambda change: change["old"]["line"], reverse=True):
+            operations.append((f"delete {describe(change)}",
+                               lambda change=change: cs.delete_dns_record(change["old"]["line"])))
+        
+        for change in plan["create"]:
+            record = change["new"]
+            operations.append((f"create {describe(change)}", lambda record=record: cs.create_dns_record(
+                record.get("type"),
+                record.get("name"),
+                record_value(record),
+                ttl=record.get("ttl") or 14400,
+                priority=record.get("priority")
+            )))
+        
+        errors = [self._run_restore_operation(*operation) for operation in operations]
+        failed = [error for error in errors if error]
+        return {"applied": len(operations) - len(failed), "failed": failed}
     
     def archive_old_backups(self, days: int = 30):
-        """Archive backups older than specified days"""
-        cutoff_date = datetime.now() - timedelta(days=days)
+        """
+        Archive backups older than specified days
+        
+        JSON backups are gzip-compressed on the way into the archive (they
+        keep their catalog name, so delta chains still resolve); streaming
+        backups are already compressed and are moved as they are. With a
+        storage backend other than the local archive directory, archives are
+        uploaded there and removed locally; they are hydrated first so they
+        don't depend on the local blob store.
+        """
+        cutoff = int((datetime.now() - timedelta(days=days)).timestamp())
         archived = 0
         
-        for filename in os.listdir(self.backup_dir):
-            if filename.startswith("dns_backup_") and filename.endswith(".json"):
-                filepath = os.path.join(self.backup_dir, filename)
-                
-                # Check file age
-                stat = os.stat(filepath)
-                mod_time = datetime.fromtimestamp(stat.st_mtime)
-                
-                if mod_time < cutoff_date:
-                    # Move to archive
-                    archive_path = os.path.join(self.archive_dir, filename)
-                    shutil.move(filepath, archive_path)
-                    archived += 1
+        for entry in self.catalog.query(until=cutoff, newest_first=False):
+            source = entry["path"]
+            
+            if not os.path.exists(source):
+                self.catalog.remove(entry["filename"])
+                continue
+            
+            if is_stream(source):
+                key = entry["filename"]
+                archive_path = os.path.join(self.archive_dir, key)
+                shutil.move(source, archive_path)
+            else:
+                key = entry["filename"] + COMPRESSED_SUFFIX
+                archive_path = os.path.join(self.archive_dir, key)
+                if self.offload:
+                    with gzip.open(archive_path, 'wt') as f:
+                        json.dump(self.store.hydrate(read_json(source)), f, indent=2)
+                    os.remove(source)
+                else:
+                    compress_file(source, archive_path)
+            
+            location = archive_path
+            size = os.path.getsize(archive_path)
+            
+            if self.offload:
+                try:
+                    location = self.storage.put(key, archive_path)
+                    os.remove(archive_path)
+                except Exception as e:
+                    print(f"⚠️ Could not upload {key}, keeping it in the local archive: {e}")
+            
+            self.catalog.mark_archived(entry["filename"], location, size)
+            archived += 1
         
         if archived > 0:
             print(f"📦 Archived {archived} old backup(s)")
     
-    def cleanup_duplicates(self):
-        """Remove duplicate backups with same checksum"""
-        checksums = {}
-        duplicates = []
+    def apply_retention(self, policy: Dict = None, dry_run: bool = False) -> List[str]:
+        """
+        Delete backups that the grandfather-father-son policy does not keep
         
-        for filename in os.listdir(self.backup_dir):
-            if filename.startswith("dns_backup_") and filename.endswith(".json"):
-                filepath = os.path.join(self.backup_dir, filename)
-                
-                try:
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                    
-                    checksum = data.get("checksum", "")
-                    
-                    if checksum:
-                        if checksum in checksums:
-                            # Keep the older file, mark newer as duplicate
-                            duplicates.append(filepath)
-                        else:
-                            checksums[checksum] = filepath
-                
-                except Exception:
-                    continue
+        Args:
+            policy: Periods kept per tier (default: backup.retention, see
+                    backup_retention.DEFAULT_RETENTION)
+            dry_run: Only report what would be deleted
+        
+        Returns:
+            File names deleted (or that would be)
+        """
+        policy = policy or self.config.get("backup", {}).get("retention")
+        entries = self.catalog.query(archived=None)
+        keep = retained(entries, policy)
+        expired = [entry for entry in entries if entry["filename"] not in keep]
+        
+        if dry_run:
+            return [entry["filename"] for entry in expired]
+        
+        for entry in expired:
+            self.delete_backup_file(entry["path"])
+            self.catalog.remove(entry["filename"])
+        
+        if expired:
+            print(f"🗑️ Retention removed {len(expired)} backup(s), kept {len(keep)}")
+            removed = self.collect_garbage()
+            if removed:
+                print(f"🗑️ Removed {len(removed)} unreferenced record set(s)")
+        
+        return [entry["filename"] for entry in expired]
+    
+    def cleanup_duplicates(self):
+        """Remove duplicate backups with same checksum (the oldest copy is kept)"""
+        duplicates = self.catalog.duplicates()
         
         if duplicates:
             print(f"🗑️ Found {len(duplicates)} duplicate backup(s)")
             for dup in duplicates:
-                os.remove(dup)
-                print(f"  Removed: {os.path.basename(dup)}")
+                if os.path.exists(dup["path"]):
+                    os.remove(dup["path"])
+                self.catalog.remove(dup["filename"])
+                print(f"  Removed: {dup['filename']}")
         else:
             print("✅ No duplicate backups found")
+        
+        removed = self.collect_garbage()
+        if removed:
+            print(f"🗑️ Removed {len(removed)} unreferenced record set(s)")
+    
+    def collect_garbage(self) -> List[str]:
+        """Delete blobs that no backup or archived backup references"""
+        live = set()
+        
+        for entry in self.catalog.query(archived=None):
+            try:
+                if is_stream(entry["path"]):
+                    continue
+                live |= BlobStore.references(read_json(entry["path"]))
+            except FileNotFoundError:
+                continue
+            except Exception:
+                # An unreadable manifest might reference anything: keep every blob
+                return []
+        
+        return self.store.collect_garbage(live)
+    
+    def zone_serial(self) -> Optional[int]:
+        """Highest SOA serial the zone's authoritative nameservers serve (None if none answered)"""
+        checker = AuthoritativeChecker(resolver=self.resolver)
+        serials = checker.soa_serials(checker.find_zone(self.domain))
+        values = [status["serial"] for status in serials.values() if "serial" in status]
+        return max(values) if values else None
+    
+    def run_daemon(self, interval: int = None, poll: int = None):
+        """
+        Take unified backups on a schedule and whenever the zone changes
+        
+        Between scheduled backups only the zone's SOA serial is polled (one
+        query per authoritative server), so an unchanged zone is never
+        downloaded again. A serial bump triggers a backup straight away.
+        After each backup, the retention policy is applied and old backups
+        are compressed into the archive. The last serial seen is kept in
+        daemon_state.json so restarts don't trigger a backup.
+        
+        Args:
+            interval: Seconds between scheduled backups (default: backup.daemon.interval, 86400)
+            poll: Seconds between SOA serial checks (default: backup.daemon.poll, 300)
+        """
+        backup_config = self.config.get("backup", {})
+        daemon_config = backup_config.get("daemon", {})
+        interval = interval or daemon_config.get("interval", 86400)
+        poll = poll or daemon_config.get("poll", 300)
+        archive_after = daemon_config.get("archive_after", 30)
+        save = self.save_incremental if backup_config.get("incremental", False) else self.save_backup
+        
+        state_file = f"{self.backup_dir}/daemon_state.json"
+        state = {}
+        if os.path.exists(state_file):
+            with open(state_file, 'r') as f:
+                state = json.load(f)
+        
+        print(f"🔄 Backup daemon started (every {interval}s, checking for zone changes every {poll}s)")
+        
+        try:
+            while True:
+                try:
+                    try:
+                        serial = self.zone_serial()
+                    except Exception as e:
+                        print(f"⚠️ Could not read the SOA serial: {e}")
+                        serial = None
+                    
+                    latest = self.catalog.latest("unified")
+                    reason = None
+                    if not latest or time.time() - latest["ts"] >= interval:
+                        reason = "scheduled"
+                    elif serial is not None and state.get("serial") is not None and serial != state["serial"]:
+                        reason = f"SOA serial {state['serial']} → {serial}"
+                    
+                    if reason:
+                        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 📸 Backup ({reason})")
+                        backup = self.create_unified_backup()
+                        save(backup)
+                        state["last_backup"] = backup["timestamp"]
+                        
+                        self.apply_retention()
+                        self.archive_old_backups(archive_after)
+                    
+                    if serial is not None and (reason or state.get("serial") is None):
+                        state["serial"] = serial
+                    
+                    with open(state_file, 'w') as f:
+                        json.dump(state, f, indent=2)
+                
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    print(f"❌ Error in backup daemon: {e}")
+                
+                time.sleep(poll)
+        
+        except KeyboardInterrupt:
+            print("\n👋 Backup daemon stopped")
 
 
 def main():
@@ -551,24 +1323,36 @@ def main():
 Usage: python dns-backup-restore.py [command] [options]
 
 Commands:
-    backup [provider]     - Create backup (all/cloudflare/canspace/dig)
-    list [days]          - List backups from last N days (default: 30)
+    backup [provider] [--incremental] - Create backup (all/cloudflare/canspace/dig)
+    backup dig [names] [--axfr] - Snapshot public DNS from the authoritative servers
+    list [days] [--provider P] [--limit N] [--page N] - List backups from last N days (default: 30)
     verify <file>        - Verify backup integrity
-    compare <file1> <file2> - Compare two backups
-    restore <file> [--no-dry-run] - Restore from backup
+    compare <backup1> <backup2> [--provider P] [--limit N] - Compare two backups
+                           (files, cataloged names or timestamps)
+    restore <file> [--no-dry-run] [--wait] [--prune] - Restore from backup
+                           (only missing or changed records are written;
+                           --wait blocks until authoritative nameservers serve it,
+                           --prune also deletes live records not in the backup)
     archive [days]       - Archive backups older than N days
     cleanup              - Remove duplicate backups
+    at <timestamp> [output] - Reconstruct the backup as of a point in time
+    reindex              - Rebuild the backup catalog from the backup files
+    retain [--dry-run]   - Delete backups the retention policy no longer keeps
+    daemon [--interval S] [--poll S] - Back up on a schedule and on zone changes
     
 Examples:
     python dns-backup-restore.py backup
     python dns-backup-restore.py backup cloudflare
+    python dns-backup-restore.py backup dig ftp files --axfr
     python dns-backup-restore.py list 7
     python dns-backup-restore.py verify backups/latest_unified.json
     python dns-backup-restore.py compare backup1.json backup2.json
+    python dns-backup-restore.py compare 2025-01-17T00:00 2025-01-18T00:00
     python dns-backup-restore.py restore backup.json
     python dns-backup-restore.py restore backup.json --no-dry-run
     python dns-backup-restore.py archive 30
     python dns-backup-restore.py cleanup
+    python dns-backup-restore.py daemon --interval 21600
 """)
         sys.exit(0)
     
@@ -577,29 +1361,48 @@ Examples:
     
     try:
         if command == "backup":
-            provider = sys.argv[2] if len(sys.argv) > 2 else "all"
+            provider = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith("--") else "all"
+            
+            incremental = "--incremental" in sys.argv or manager.config.get("backup", {}).get("incremental", False)
+            save = manager.save_incremental if incremental else manager.save_backup
             
             if provider in ["all", "unified"]:
                 backup = manager.create_unified_backup()
-                manager.save_backup(backup)
+                save(backup)
             elif provider == "cloudflare":
                 backup = manager.backup_cloudflare()
                 if backup:
-                    manager.save_backup(backup)
+                    save(backup)
             elif provider == "canspace":
                 backup = manager.backup_canspace()
                 if backup:
-                    manager.save_backup(backup)
+                    save(backup)
             elif provider == "dig":
-                backup = manager.backup_dig()
-                manager.save_backup(backup)
+                names = [arg for arg in sys.argv[3:] if not arg.startswith("--")]
+                backup = manager.backup_dig(names or None, axfr="--axfr" in sys.argv)
+                save(backup)
+                if backup.get("errors"):
+                    print(f"⚠️ No answer for: {', '.join(backup['errors'])}")
             else:
                 print(f"❌ Unknown provider: {provider}")
         
         elif command == "list":
-            days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+            args = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+            options = {}
+            for option in ["--provider", "--limit", "--page"]:
+                if option in sys.argv:
+                    options[option] = sys.argv[sys.argv.index(option) + 1]
+                    args.remove(options[option])
+            
+            days = int(args[0]) if args else 30
+            limit = int(options.get("--limit", 50))
+            page = int(options.get("--page", 1))
+            provider = options.get("--provider")
             
-            backups = manager.list_backups(days)
+            backups = manager.list_backups(days, provider, limit, (page - 1) * limit)
+            total = manager.catalog.count(
+                provider=provider, since=int((datetime.now() - timedelta(days=days)).timestamp())
+            )
             
             if backups:
                 print(f"\n📚 Backups from last {days} days:\n")
@@ -608,9 +1411,10 @@ Examples:
                 
                 for backup in backups:
                     size_kb = backup['size'] / 1024
-                    print(f"{backup['filename']:<40} {backup['provider']:<12} {backup['records']:<10} {size_kb:.1f}KB {backup['modified']}")
+                    partial = (" 🧩 delta" if backup["kind"] == "delta" else "") + (" ⚠️ partial" if backup["partial"] else "")
+                    print(f"{backup['filename']:<40} {backup['provider']:<12} {backup['records']:<10} {size_kb:.1f}KB {backup['modified']}{partial}")
                 
-                print(f"\nTotal: {len(backups)} backup(s)")
+                print(f"\nShowing {len(backups)} of {total} backup(s) (page {page} of {(total + limit - 1) // limit})")
             else:
                 print(f"No backups found from last {days} days")
         
@@ -623,39 +1427,38 @@ Examples:
         
         elif command == "compare":
             if len(sys.argv) < 4:
-                print("Usage: python dns-backup-restore.py compare <file1> <file2>")
+                print("Usage: python dns-backup-restore.py compare <backup1> <backup2> [--provider P] [--limit N]")
                 sys.exit(1)
             
-            comparison = manager.compare_backups(sys.argv[2], sys.argv[3])
+            provider = sys.argv[sys.argv.index("--provider") + 1] if "--provider" in sys.argv else "unified"
+            limit = int(sys.argv[sys.argv.index("--limit") + 1]) if "--limit" in sys.argv else None
+            comparison = manager.compare_backups(sys.argv[2], sys.argv[3], provider)
             
             print(f"\n📊 Backup Comparison")
             print(f"File 1: {comparison['file1']} ({comparison['date1']})")
             print(f"File 2: {comparison['file2']} ({comparison['date2']})")
             print(f"\nChanges: {comparison['total_changes']}")
             
-            if comparison['added']:
-                print(f"\n➕ Added ({len(comparison['added'])}):")
-                for record in comparison['added'][:5]:
-                    print(f"  {record}")
-                if len(comparison['added']) > 5:
-                    print(f"  ... and {len(comparison['added']) - 5} more")
+            for action, title in [("added", "➕ Added"), ("removed", "➖ Removed"), ("modified", "✏️ Modified")]:
+                changes = comparison[action]
+                if changes:
+                    print(f"\n{title} ({len(changes)}):")
+                    for change in changes[:limit]:
+                        print(f"  {describe(change)}")
+                    if limit is not None and len(changes) > limit:
+                        print(f"  ... and {len(changes) - limit} more")
             
-            if comparison['removed']:
-                print(f"\n➖ Removed ({len(comparison['removed'])}):")
-                for record in comparison['removed'][:5]:
-                    print(f"  {record}")
-                if len(comparison['removed']) > 5:
-                    print(f"  ... and {len(comparison['removed']) - 5} more")
-            
-            print(f"\n↔️ Unchanged: {len(comparison['unchanged'])} records")
+            print(f"\n↔️ Unchanged: {comparison['unchanged']} records")
         
         elif command == "restore":
             if len(sys.argv) < 3:
-                print("Usage: python dns-backup-restore.py restore <file> [--no-dry-run]")
+                print("Usage: python dns-backup-restore.py restore <file> [--no-dry-run] [--wait] [--prune]")
                 sys.exit(1)
             
             dry_run = "--no-dry-run" not in sys.argv
-            manager.restore_backup(sys.argv[2], dry_run=dry_run)
+            if not manager.restore_backup(sys.argv[2], dry_run=dry_run, wait="--wait" in sys.argv,
+                                          prune="--prune" in sys.argv):
+                sys.exit(1)
         
         elif command == "archive":
             days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
@@ -664,6 +1467,42 @@ Examples:
         elif command == "cleanup":
             manager.cleanup_duplicates()
         
+        elif command == "at":
+            if len(sys.argv) < 3:
+                print("Usage: python dns-backup-restore.py at <timestamp> [output] [--provider P]")
+                sys.exit(1)
+            
+            provider = sys.argv[sys.argv.index("--provider") + 1] if "--provider" in sys.argv else "unified"
+            args = [arg for arg in sys.argv[2:] if not arg.startswith("--") and arg != provider]
+            backup = manager.backup_at(datetime.fromisoformat(args[0]), provider)
+            
+            if not backup:
+                print(f"❌ No {provider} backup at or before {args[0]}")
+                sys.exit(1)
+            
+            print(f"🕰️ {provider} backup from {backup.get('timestamp')}: {backup.get('total_records', 0)} records")
+            if len(args) > 1:
+                with open(args[1], 'w') as f:
+                    json.dump(backup, f, indent=2)
+                print(f"💾 Written to {args[1]}")
+        
+        elif command == "reindex":
+            print(f"📇 Cataloged {manager.reindex()} backup(s)")
+        
+        elif command == "retain":
+            if "--dry-run" in sys.argv:
+                expired = manager.apply_retention(dry_run=True)
+                print(f"🔍 Retention would remove {len(expired)} backup(s)")
+                for filename in expired:
+                    print(f"  {filename}")
+            elif not manager.apply_retention():
+                print("✅ Every backup is within the retention policy")
+        
+        elif command == "daemon":
+            interval = int(sys.argv[sys.argv.index("--interval") + 1]) if "--interval" in sys.argv else None
+            poll = int(sys.argv[sys.argv.index("--poll") + 1]) if "--poll" in sys.argv else None
+            manager.run_daemon(interval, poll)
+        
         else:
             print(f"❌ Unknown command: {command}")
             sys.exit(1)
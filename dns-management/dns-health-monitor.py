@@ -8,14 +8,66 @@ import dns.resolver
 import requests
 import json
 import time
+import re
 import sys
 import os
-from datetime import datetime
+import ssl
+import gzip
+import zlib
+import socket
+import asyncio
+import http.client
+import functools
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
-import subprocess
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from backup_store import load_backup_file
+from dns_resolver import DEFAULT_CACHE_FILE, AuthoritativeChecker, CachingResolver, fqdn
+from health_alerts import EVENT_LABELS, AlertManager, create_sinks
+from health_history import HealthHistoryStore, percentile
+from health_metrics import HealthMetrics, MetricsServer
+from health_scheduler import CHECK_GROUPS, CheckScheduler, group_outcome, merge_results
+
+try:
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+except ImportError:
+    x509 = None
+
+# Default per-check deadlines in seconds (override with monitoring.check_deadlines)
+CHECK_DEADLINES = {
+    "dns": 5,
+    "propagation": 10,
+    "ssl": 15,
+    "http": 15,
+    "mail": 10,
+    "expected": 10
+}
+
+FAILED_LOOKUPS = ["NXDOMAIN", "NoAnswer"]
+
+# Record types whose names are swept as hosts
+SWEEP_RECORD_TYPES = ["A", "AAAA", "CNAME"]
+
+# DKIM selectors probed when monitoring.dkim_selectors is not set
+DKIM_SELECTORS = ["default", "google", "mail", "dkim", "selector1", "selector2"]
+
+# RFC 7208 4.6.4: terms that cost a DNS lookup, and the per-evaluation limits
+SPF_LOOKUP_TERMS = ["include", "a", "mx", "ptr", "exists", "redirect"]
+SPF_LOOKUP_LIMIT = 10
+SPF_VOID_LOOKUP_LIMIT = 2
+SPF_MAX_DEPTH = 10
+
+CERT_TIME_FORMAT = "%b %d %H:%M:%S %Y GMT"
+
+
+def txt_value(value: str) -> str:
+    """Join the quoted character-strings of a TXT record value"""
+    parts = re.findall(r'"((?:[^"\\]|\\.)*)"', value)
+    return "".join(parts) if parts else value
+
 
 class DNSHealthMonitor:
     def __init__(self, domain: str = "leo.pvthostel.com", config_file: str = "dns-config.json"):
@@ -36,6 +88,22 @@ class DNSHealthMonitor:
             "9.9.9.9",        # Quad9
             "64.6.64.6"       # Verisign
         ]
+        self.query_timeout = self.config.get("monitoring", {}).get("query_timeout", 3.0)
+        self.max_workers = self.config.get("monitoring", {}).get("max_workers", 32)
+        self.connect_timeout = self.config.get("monitoring", {}).get("connect_timeout", 5.0)
+        self.cert_warning_days = self.config.get("monitoring", {}).get("cert_warning_days", 14)
+        self.http_probe_samples = self.config.get("monitoring", {}).get("http_probe_samples", 0)
+        self.dkim_selectors = self.config.get("monitoring", {}).get("dkim_selectors", DKIM_SELECTORS)
+        self.check_deadlines = dict(CHECK_DEADLINES)
+        self.check_deadlines.update(self.config.get("monitoring", {}).get("check_deadlines", {}))
+        self.resolver = CachingResolver(
+            timeout=self.query_timeout,
+            cache_file=self.config.get("monitoring", {}).get("resolver_cache", DEFAULT_CACHE_FILE)
+        )
+        self._executor = None
+        self._history = None
+        self._alerts = None
+        self.metrics = HealthMetrics()
         self.results = {}
         self.issues = []
     
@@ -46,6 +114,38 @@ class DNSHealthMonitor:
                 return json.load(f)
         return {"monitoring": {"expected_records": []}}
     
+    def get_resolver(self, nameserver: str = None) -> dns.resolver.Resolver:
+        """
+        Get a reusable resolver for a nameserver
+        
+        Args:
+            nameserver: Specific nameserver IP (None for the system resolver)
+        """
+        return self.resolver.get_resolver(nameserver)
+    
+    def query_dns_record(self, record_type: str, name: str, nameserver: str = None) -> Tuple[List[str], float]:
+        """
+        Query a DNS record and measure the round-trip time
+        
+        Lookups through the system resolver are answered from the shared
+        TTL-aware cache when possible. Queries to a specific nameserver
+        (propagation checks) always go to that server.
+        
+        Args:
+            record_type: Type of DNS record (A, CNAME, MX, TXT)
+            name: Record name to check
+            nameserver: Specific nameserver to query
+        
+        Returns:
+            Tuple of (record values, round-trip time in milliseconds)
+        """
+        values, rtt_ms = self.resolver.query(record_type, name, nameserver, bypass=nameserver is not None)
+        
+        if record_type == "MX" and values[0] not in FAILED_LOOKUPS and not values[0].startswith("Error"):
+            values = [value.replace(" ", ":", 1) for value in values]
+        
+        return values, rtt_ms
+    
     def check_dns_record(self, record_type: str, name: str, nameserver: str = None) -> List[str]:
         """
         Check DNS record from specific nameserver
@@ -58,35 +158,15 @@ class DNSHealthMonitor:
         Returns:
             List of record values
         """
-        resolver = dns.resolver.Resolver()
-        
-        if nameserver:
-            resolver.nameservers = [nameserver]
-        
-        try:
-            answers = resolver.resolve(name, record_type)
-            
-            if record_type == "A":
-                return [str(rdata.address) for rdata in answers]
-            elif record_type == "CNAME":
-                return [str(rdata.target) for rdata in answers]
-            elif record_type == "MX":
-                return [f"{rdata.preference}:{str(rdata.exchange)}" for rdata in answers]
-            elif record_type == "TXT":
-                return [str(rdata) for rdata in answers]
-            else:
-                return [str(rdata) for rdata in answers]
-        except dns.resolver.NXDOMAIN:
-            return ["NXDOMAIN"]
-        except dns.resolver.NoAnswer:
-            return ["NoAnswer"]
-        except Exception as e:
-            return [f"Error: {str(e)}"]
+        values, _ = self.query_dns_record(record_type, name, nameserver)
+        return values
     
     def check_propagation(self, record_type: str, name: str, expected_value: str) -> Dict:
         """
         Check DNS propagation across multiple nameservers
         
+        All nameservers are queried concurrently.
+        
         Args:
             record_type: Type of DNS record
             name: Record name
@@ -95,66 +175,234 @@ class DNSHealthMonitor:
         Returns:
             Propagation status across nameservers
         """
-        propagation = {}
+        matrix = self.check_propagation_matrix([(record_type, name, expected_value)])
+        return matrix["records"][self.matrix_key(record_type, name, expected_value)]
+    
+    def check_authoritative(self, records: List[Tuple[str, str, Optional[str]]]) -> Dict:
+        """
+        Check records directly on the zone's authoritative nameservers
         
-        for ns in self.nameservers:
-            values = self.check_dns_record(record_type, name, ns)
+        Unlike the public resolver matrix, answers come straight from the
+        source (no recursion, no caches), so a mismatch means the provider
+        has not pushed the change yet rather than a stale TTL.
+        
+        Args:
+            records: (record_type, name, expected value or None) tuples
+        
+        Returns:
+            Zone, nameservers, SOA serials and per-server results
+        """
+        checker = AuthoritativeChecker(resolver=self.resolver, timeout=self.query_timeout)
+        return checker.check(records, checker.find_zone(self.domain))
+    
+    @staticmethod
+    def matrix_key(record_type: str, name: str, expected_value: str) -> str:
+        """Key of a record check in a propagation matrix (the same record may be checked for several values)"""
+        return f"{record_type} {name} {expected_value}"
+    
+    def check_propagation_matrix(self, records: List[Tuple[str, str, str]]) -> Dict:
+        """
+        Check propagation of many records across all nameservers at once
+        
+        Every nameserver x record query runs concurrently, so the whole
+        matrix completes in roughly the time of the slowest single query.
+        
+        Args:
+            records: List of (record_type, name, expected_value) tuples
+        
+        Returns:
+            Per-record propagation status (keyed by matrix_key()) and
+            per-resolver latency stats
+        """
+        queries = [
+            (record_type, name, expected_value, ns)
+            for record_type, name, expected_value in records
+            for ns in self.nameservers
+        ]
+        
+        start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(queries)))) as executor:
+            answers = list(executor.map(
+                lambda q: self.query_dns_record(q[0], q[1], q[3]),
+                queries
+            ))
+        
+        matrix = {
+            "records": {},
+            "resolvers": {},
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+        rtts = {ns: [] for ns in self.nameservers}
+        errors = {ns: 0 for ns in self.nameservers}
+        
+        for (record_type, name, expected_value, ns), (values, rtt) in zip(queries, answers):
+            match = expected_value in values
             
-            if expected_value in values:
-                propagation[ns] = {
-                    "status": "✅",
-                    "value": values[0] if values else None,
-                    "match": True
-                }
-            else:
-                propagation[ns] = {
-                    "status": "❌",
-                    "value": values[0] if values else None,
-                    "match": False
-                }
+            matrix["records"].setdefault(self.matrix_key(record_type, name, expected_value), {})[ns] = {
+                "status": "✅" if match else "❌",
+                "value": values[0] if values else None,
+                "match": match,
+                "rtt_ms": round(rtt, 2)
+            }
+            
+            rtts[ns].append(rtt)
+            if values and values[0].startswith("Error:"):
+                errors[ns] += 1
         
-        return propagation
+        for ns in self.nameservers:
+            samples = rtts[ns]
+            matrix["resolvers"][ns] = {
+                "queries": len(samples),
+                "errors": errors[ns],
+                "min_ms": round(min(samples), 2) if samples else None,
+                "avg_ms": round(sum(samples) / len(samples), 2) if samples else None,
+                "p95_ms": round(percentile(samples, 95), 2) if samples else None,
+                "max_ms": round(max(samples), 2) if samples else None
+            }
+        
+        return matrix
+    
+    def get_monitored_hostnames(self) -> List[str]:
+        """Hostnames whose certificates and HTTP endpoints are monitored"""
+        hostnames = [self.domain, f"www.{self.domain}"]
+        
+        for hostname in self.config.get("monitoring", {}).get("hostnames", []):
+            hostname = hostname.replace("@", self.domain)
+            if hostname not in hostnames:
+                hostnames.append(hostname)
+        
+        return hostnames
     
-    def check_ssl_certificate(self, hostname: str = None) -> Dict:
-        """Check SSL certificate status"""
+    @staticmethod
+    def san_covers(hostname: str, names: List[str]) -> bool:
+        """Check whether a certificate's DNS names cover a hostname (with wildcards)"""
+        hostname = hostname.lower().rstrip(".")
+        
+        for name in names:
+            name = name.lower().rstrip(".")
+            if name == hostname:
+                return True
+            if name.startswith("*.") and hostname.count(".") == name.count(".") and \
+                    hostname.split(".", 1)[1] == name[2:]:
+                return True
+        
+        return False
+    
+    def _describe_der_certificate(self, der: bytes) -> Dict:
+        """Decode a DER certificate (requires the cryptography package)"""
+        if x509 is None:
+            return {}
+        
+        cert = x509.load_der_x509_certificate(der)
+        not_before = getattr(cert, "not_valid_before_utc", None) or cert.not_valid_before.replace(tzinfo=timezone.utc)
+        not_after = getattr(cert, "not_valid_after_utc", None) or cert.not_valid_after.replace(tzinfo=timezone.utc)
+        
+        try:
+            san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value.get_values_for_type(x509.DNSName)
+        except x509.ExtensionNotFound:
+            san = []
+        
+        def common_name(name):
+            values = name.get_attributes_for_oid(NameOID.COMMON_NAME)
+            return values[0].value if values else name.rfc4514_string()
+        
+        return {
+            "subject": common_name(cert.subject),
+            "issuer": common_name(cert.issuer),
+            "not_before": not_before.strftime(CERT_TIME_FORMAT),
+            "not_after": not_after.strftime(CERT_TIME_FORMAT),
+            "days_remaining": (not_after - datetime.now(timezone.utc)).days,
+            "san": san
+        }
+    
+    def _peer_chain(self, tls: ssl.SSLSocket) -> List[Dict]:
+        """
+        Describe the verified certificate chain presented by the peer
+        
+        SSLSocket.get_verified_chain() is public from Python 3.13; on older
+        versions only the leaf certificate is reported.
+        """
+        if x509 is None:
+            return []
+        
+        if hasattr(tls, "get_verified_chain"):
+            certificates = tls.get_verified_chain()
+        else:
+            leaf = tls.getpeercert(binary_form=True)
+            certificates = [leaf] if leaf else []
+        
+        chain = []
+        for der in certificates:
+            info = self._describe_der_certificate(der)
+            chain.append({
+                "subject": info.get("subject"),
+                "issuer": info.get("issuer"),
+                "not_after": info.get("not_after")
+            })
+        
+        return chain
+    
+    def check_ssl_certificate(self, hostname: str = None, port: int = 443) -> Dict:
+        """
+        Check SSL certificate status
+        
+        Connects in-process, performs a verified TLS handshake and inspects the
+        peer certificate, its chain and SAN coverage.
+        
+        Args:
+            hostname: Hostname to check (default: monitored domain)
+            port: TLS port
+        
+        Returns:
+            Certificate status, validity dates, days to expiry and timings
+        """
         if not hostname:
             hostname = self.domain
         
+        context = ssl.create_default_context()
+        start = time.perf_counter()
+        
         try:
-            response = subprocess.run(
-                ["openssl", "s_client", "-connect", f"{hostname}:443", "-servername", hostname],
-                input=b"",
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            with socket.create_connection((hostname, port), timeout=self.connect_timeout) as sock:
+                connected = time.perf_counter()
+                
+                with context.wrap_socket(sock, server_hostname=hostname) as tls:
+                    handshake_done = time.perf_counter()
+                    cert = tls.getpeercert()
+                    chain = self._peer_chain(tls)
+                    tls_version = tls.version()
+                    cipher = tls.cipher()[0]
             
-            cert_info = response.stdout
+            not_after = cert.get("notAfter")
+            days_remaining = int((ssl.cert_time_to_seconds(not_after) - time.time()) // 86400)
+            san = [value for kind, value in cert.get("subjectAltName", ()) if kind == "DNS"]
             
-            # Extract certificate dates
-            if "notBefore" in cert_info and "notAfter" in cert_info:
-                lines = cert_info.split('\n')
-                not_before = None
-                not_after = None
-                
-                for line in lines:
-                    if "notBefore" in line:
-                        not_before = line.split("notBefore=")[1].strip()
-                    elif "notAfter" in line:
-                        not_after = line.split("notAfter=")[1].strip()
-                
-                return {
-                    "status": "✅ Valid",
-                    "not_before": not_before,
-                    "not_after": not_after,
-                    "hostname": hostname
-                }
-            else:
-                return {
-                    "status": "❌ Invalid",
-                    "error": "Could not parse certificate",
-                    "hostname": hostname
-                }
+            return {
+                "status": "✅ Valid" if days_remaining >= self.cert_warning_days else "⚠️ Expiring",
+                "not_before": cert.get("notBefore"),
+                "not_after": not_after,
+                "days_remaining": days_remaining,
+                "subject": dict(item[0] for item in cert.get("subject", ())).get("commonName"),
+                "issuer": dict(item[0] for item in cert.get("issuer", ())).get("commonName"),
+                "san": san,
+                "san_covers_hostname": self.san_covers(hostname, san),
+                "chain": chain,
+                "tls_version": tls_version,
+                "cipher": cipher,
+                "connect_ms": round((connected - start) * 1000, 2),
+                "handshake_ms": round((handshake_done - connected) * 1000, 2),
+                "hostname": hostname
+            }
+        
+        except ssl.SSLCertVerificationError as e:
+            result = {
+                "status": "❌ Invalid",
+                "error": e.verify_message or str(e),
+                "hostname": hostname
+            }
+            result.update(self._fetch_unverified_certificate(hostname, port))
+            return result
         
         except Exception as e:
             return {
@@ -163,6 +411,42 @@ class DNSHealthMonitor:
                 "hostname": hostname
             }
     
+    def _fetch_unverified_certificate(self, hostname: str, port: int = 443) -> Dict:
+        """Fetch certificate details without verification, to report why it is invalid"""
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        
+        try:
+            with socket.create_connection((hostname, port), timeout=self.connect_timeout) as sock:
+                with context.wrap_socket(sock, server_hostname=hostname) as tls:
+                    der = tls.getpeercert(binary_form=True)
+            
+            info = self._describe_der_certificate(der) if der else {}
+            if info:
+                info["san_covers_hostname"] = self.san_covers(hostname, info["san"])
+            return info
+        except Exception:
+            return {}
+    
+    def check_ssl_certificates(self, hostnames: List[str] = None) -> Dict:
+        """
+        Check certificates for many hostnames concurrently
+        
+        Args:
+            hostnames: Hostnames to check (default: all monitored hostnames)
+        
+        Returns:
+            Certificate status per hostname
+        """
+        if not hostnames:
+            hostnames = self.get_monitored_hostnames()
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(hostnames)))) as executor:
+            results = list(executor.map(self.check_ssl_certificate, hostnames))
+        
+        return dict(zip(hostnames, results))
+    
     def check_http_response(self, url: str = None) -> Dict:
         """Check HTTP response status"""
         if not url:
@@ -198,35 +482,267 @@ class DNSHealthMonitor:
                 "url": url
             }
     
+    def _open_http_connection(self, scheme: str, host: str, port: int, timings: Dict) -> http.client.HTTPConnection:
+        """Open an HTTP(S) connection, timing the DNS, TCP and TLS phases"""
+        start = time.perf_counter()
+        address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4]
+        resolved = time.perf_counter()
+        
+        sock = socket.create_connection(address[:2], timeout=self.connect_timeout)
+        connected = time.perf_counter()
+        
+        if scheme == "https":
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            conn = http.client.HTTPSConnection(host, port, timeout=10)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+        
+        sock.settimeout(10)
+        conn.sock = sock
+        
+        timings["dns_ms"] += (resolved - start) * 1000
+        timings["connect_ms"] += (connected - resolved) * 1000
+        timings["tls_ms"] += (time.perf_counter() - connected) * 1000 if scheme == "https" else 0
+        timings["new_connections"] += 1
+        
+        return conn
+    
+    def _http_request(self, url: str, pool: Dict, timings: Dict) -> Tuple[http.client.HTTPResponse, bytes]:
+        """Send one GET over a pooled connection, timing time-to-first-byte and total"""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+        
+        headers = {
+            "Accept-Encoding": "gzip, deflate",
+            "User-Agent": "dns-health-monitor/1.0",
+            "Connection": "keep-alive"
+        }
+        
+        for attempt in range(2):
+            conn = pool.pop(key, None)
+            reused = conn is not None
+            if conn is None:
+                conn = self._open_http_connection(parts.scheme, parts.hostname, port, timings)
+            
+            try:
+                sent = time.perf_counter()
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                first_byte = time.perf_counter()
+                body = response.read()
+                done = time.perf_counter()
+                break
+            except (http.client.HTTPException, ConnectionError, socket.timeout):
+                conn.close()
+                # A pooled connection may have been closed by the server while idle
+                if not reused or attempt:
+                    raise
+        
+        timings["ttfb_ms"] += (first_byte - sent) * 1000
+        timings["transfer_ms"] += (done - first_byte) * 1000
+        
+        if response.will_close:
+            conn.close()
+        else:
+            pool[key] = conn
+        
+        return response, body
+    
+    def _http_sample(self, url: str, pool: Dict, max_redirects: int = 10) -> Dict:
+        """Take one HTTP sample, following redirects"""
+        timings = {"dns_ms": 0.0, "connect_ms": 0.0, "tls_ms": 0.0, "ttfb_ms": 0.0,
+                   "transfer_ms": 0.0, "new_connections": 0}
+        chain = []
+        start = time.perf_counter()
+        
+        while True:
+            hop_start = time.perf_counter()
+            response, body = self._http_request(url, pool, timings)
+            hop_ms = (time.perf_counter() - hop_start) * 1000
+            location = response.getheader("Location")
+            
+            if response.status in (301, 302, 303, 307, 308) and location and len(chain) < max_redirects:
+                chain.append({"url": url, "status_code": response.status, "total_ms": round(hop_ms, 2)})
+                url = urljoin(url, location)
+                continue
+            break
+        
+        encoding = (response.getheader("Content-Encoding") or "identity").lower()
+        uncompressed = None
+        
+        try:
+            if encoding == "gzip":
+                uncompressed = len(gzip.decompress(body))
+            elif encoding == "deflate":
+                try:
+                    uncompressed = len(zlib.decompress(body))
+                except zlib.error:
+                    uncompressed = len(zlib.decompress(body, -zlib.MAX_WBITS))
+            elif encoding == "identity":
+                uncompressed = len(body)
+        except (OSError, zlib.error):
+            pass
+        
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        timings["redirect_ms"] = sum(hop["total_ms"] for hop in chain)
+        
+        return {
+            "timings": timings,
+            "status_code": response.status,
+            "final_url": url,
+            "redirect_chain": chain,
+            "content_encoding": encoding,
+            "compressed_bytes": len(body),
+            "uncompressed_bytes": uncompressed
+        }
+    
+    def probe_http(self, url: str = None, samples: int = 5, pooled: bool = True) -> Dict:
+        """
+        Probe an HTTP endpoint with repeated samples and phase timings
+        
+        Each sample records DNS, TCP connect, TLS, time-to-first-byte and
+        total time, plus redirect-chain cost and transfer sizes. With pooled
+        connections the first sample is cold and later ones reuse keep-alive
+        connections, like a browser; DNS/connect/TLS percentiles are taken
+        over the samples that opened a connection.
+        
+        Args:
+            url: URL to probe (default: https://<domain>)
+            samples: Number of samples to take
+            pooled: Reuse connections between samples
+        
+        Returns:
+            Phase percentiles (p50/p95/p99), transfer sizes and redirect cost
+        """
+        if not url:
+            url = f"https://{self.domain}"
+        
+        pool = {}
+        taken = []
+        errors = []
+        
+        try:
+            for _ in range(samples):
+                try:
+                    taken.append(self._http_sample(url, pool))
+                except Exception as e:
+                    errors.append(str(e))
+                
+                if not pooled:
+                    for conn in pool.values():
+                        conn.close()
+                    pool.clear()
+        finally:
+            for conn in pool.values():
+                conn.close()
+        
+        if not taken:
+            return {
+                "status": "❌",
+                "error": errors[0] if errors else "No samples taken",
+                "url": url,
+                "samples": 0,
+                "errors": len(errors)
+            }
+        
+        def stats(values: List[float]) -> Optional[Dict]:
+            if not values:
+                return None
+            return {
+                "p50": round(percentile(values, 50), 2),
+                "p95": round(percentile(values, 95), 2),
+                "p99": round(percentile(values, 99), 2),
+                "min": round(min(values), 2),
+                "max": round(max(values), 2)
+            }
+        
+        connecting = [sample for sample in taken if sample["timings"]["new_connections"]]
+        last = taken[-1]
+        phases = {}
+        
+        for phase in ["dns_ms", "connect_ms", "tls_ms"]:
+            phases[phase] = stats([sample["timings"][phase] for sample in connecting])
+        for phase in ["ttfb_ms", "transfer_ms", "total_ms", "redirect_ms"]:
+            phases[phase] = stats([sample["timings"][phase] for sample in taken])
+        
+        compressed = last["compressed_bytes"]
+        uncompressed = last["uncompressed_bytes"]
+        
+        return {
+            "status": "✅" if last["status_code"] == 200 and not errors else "⚠️",
+            "url": url,
+            "final_url": last["final_url"],
+            "status_code": last["status_code"],
+            "samples": len(taken),
+            "errors": len(errors),
+            "pooled": pooled,
+            "connections_opened": sum(sample["timings"]["new_connections"] for sample in taken),
+            "cold": {phase: round(value, 2) for phase, value in taken[0]["timings"].items()},
+            "phases": phases,
+            "transfer": {
+                "content_encoding": last["content_encoding"],
+                "compressed_bytes": compressed,
+                "uncompressed_bytes": uncompressed,
+                "compression_ratio": round(uncompressed / compressed, 2) if uncompressed and compressed else None
+            },
+            "redirects": {
+                "count": len(last["redirect_chain"]),
+                "chain": last["redirect_chain"]
+            }
+        }
+    
     def check_mail_records(self) -> Dict:
         """Check mail-related DNS records"""
+        return asyncio.run(self.check_mail_records_async())
+    
+    async def check_mail_records_async(self) -> Dict:
+        """
+        Check mail-related DNS records, running every lookup concurrently
+        
+        MX, SPF, DMARC and every DKIM selector in monitoring.dkim_selectors
+        are looked up at once, then the SPF record's include: and redirect=
+        chain is expanded to count the DNS lookups it costs receivers.
+        """
+        lookups = [
+            ("MX", self.domain),
+            ("TXT", self.domain),
+            ("TXT", f"_dmarc.{self.domain}")
+        ] + [("TXT", f"{selector}._domainkey.{self.domain}") for selector in self.dkim_selectors]
+        
+        answers = await asyncio.gather(*[
+            self._in_thread(self.check_dns_record, record_type, name)
+            for record_type, name in lookups
+        ])
+        mx_records, txt_records, dmarc_records = answers[:3]
+        
         mail_records = {
-            "mx": [],
+            "mx": mx_records,
             "spf": None,
             "dmarc": None,
             "dkim": []
         }
         
-        # Check MX records
-        mx_records = self.check_dns_record("MX", self.domain)
-        mail_records["mx"] = mx_records
-        
         # Check SPF record
-        txt_records = self.check_dns_record("TXT", self.domain)
         for record in txt_records:
             if "v=spf1" in record:
                 mail_records["spf"] = record
         
+        if mail_records["spf"]:
+            mail_records["spf_check"] = await self.expand_spf_async(self.domain, txt_value(mail_records["spf"]))
+        
         # Check DMARC record
-        dmarc_records = self.check_dns_record("TXT", f"_dmarc.{self.domain}")
-        if dmarc_records and dmarc_records[0] != "NXDOMAIN":
-            mail_records["dmarc"] = dmarc_records[0]
-        
-        # Check common DKIM selectors
-        common_selectors = ["default", "google", "mail", "dkim", "selector1", "selector2"]
-        for selector in common_selectors:
-            dkim = self.check_dns_record("TXT", f"{selector}._domainkey.{self.domain}")
-            if dkim and dkim[0] != "NXDOMAIN" and dkim[0] != "NoAnswer":
+        for record in dmarc_records:
+            if "v=DMARC1" in record:
+                mail_records["dmarc"] = record
+                break
+        
+        # Check DKIM selectors
+        for selector, dkim in zip(self.dkim_selectors, answers[3:]):
+            if dkim and dkim[0] not in FAILED_LOOKUPS and not dkim[0].startswith("Error"):
                 mail_records["dkim"].append({
                     "selector": selector,
                     "record": dkim[0]
@@ -234,60 +750,500 @@ class DNSHealthMonitor:
         
         return mail_records
     
-    def run_health_check(self) -> Dict:
-        """Run complete health check"""
-        print(f"\n🏥 DNS Health Check for {self.domain}")
-        print("=" * 60)
+    async def expand_spf_async(self, domain: str, record: str = None) -> Dict:
+        """
+        Expand an SPF record and count the DNS lookups it needs
+        
+        include: and redirect= targets at each level are fetched concurrently.
+        Lookups are counted the way receivers count them (RFC 7208 4.6.4):
+        more than 10 lookups, or more than 2 that return no data, is a
+        permanent error and the record fails for everyone.
+        
+        Args:
+            domain: Domain owning the record
+            record: SPF record text (fetched if not given)
+        
+        Returns:
+            Dictionary with the include tree, lookup counts and errors
+        """
+        counter = {"lookups": 0, "void_lookups": 0, "errors": []}
+        tree = await self._expand_spf_node(domain, record, counter, frozenset(), 0)
+        
+        return {
+            "tree": tree,
+            "lookups": counter["lookups"],
+            "void_lookups": counter["void_lookups"],
+            "limit": SPF_LOOKUP_LIMIT,
+            "within_limit": (
+                counter["lookups"] <= SPF_LOOKUP_LIMIT
+                and counter["void_lookups"] <= SPF_VOID_LOOKUP_LIMIT
+            ),
+            "errors": counter["errors"]
+        }
+    
+    async def _expand_spf_node(self, domain: str, record: Optional[str], counter: Dict,
+                               path: frozenset, depth: int) -> Dict:
+        """Expand one SPF record of the include tree"""
+        node = {"domain": domain, "record": record, "lookups": 0, "includes": []}
+        
+        if record is None:
+            values = await self._in_thread(self.check_dns_record, "TXT", domain)
+            
+            if values[0] in FAILED_LOOKUPS:
+                counter["void_lookups"] += 1
+                counter["errors"].append(f"{domain}: {values[0]}")
+                return node
+            
+            records = [txt_value(value) for value in values if txt_value(value).lower().startswith("v=spf1")]
+            if not records:
+                counter["errors"].append(f"{domain}: no SPF record")
+                return node
+            if len(records) > 1:
+                counter["errors"].append(f"{domain}: {len(records)} SPF records")
+            node["record"] = record = records[0]
+        
+        targets = []
+        for term in record.split()[1:]:
+            term = term.lstrip("+-~?")
+            mechanism = re.split(r"[:=/]", term, 1)[0].lower()
+            
+            if mechanism in SPF_LOOKUP_TERMS:
+                counter["lookups"] += 1
+                node["lookups"] += 1
+            
+            if mechanism in ["include", "redirect"] and len(term) > len(mechanism) + 1:
+                targets.append(term[len(mechanism) + 1:].rstrip("."))
+        
+        path = path | {domain.lower()}
+        for target in list(targets):
+            if target.lower() in path:
+                counter["errors"].append(f"{domain}: include loop via {target}")
+                targets.remove(target)
+        
+        if depth >= SPF_MAX_DEPTH:
+            if targets:
+                counter["errors"].append(f"{domain}: includes nested deeper than {SPF_MAX_DEPTH}")
+            return node
+        
+        node["includes"] = list(await asyncio.gather(*[
+            self._expand_spf_node(target, None, counter, path, depth + 1)
+            for target in targets
+        ]))
+        
+        return node
+    
+    async def _in_thread(self, func, *args, **kwargs):
+        """Run a blocking check on the monitor's worker pool"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="health-check")
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def _run_check(self, check: str, coro, timings: Dict, errors: Dict,
+                         group: str = None) -> Tuple[Optional[object], Optional[str]]:
+        """
+        Run one check under its deadline
+        
+        Args:
+            check: Check name
+            coro: Coroutine performing the check
+            timings: Dictionary collecting per-check durations
+            errors: Dictionary collecting per-check errors
+            group: Deadline group (defaults to the check name)
+        
+        Returns:
+            Tuple of (result, error message if the check failed or timed out)
+        """
+        deadline = self.check_deadlines.get(group or check, 10)
+        start = time.perf_counter()
+        
+        try:
+            return await asyncio.wait_for(coro, timeout=deadline), None
+        except asyncio.TimeoutError:
+            errors[check] = f"Timed out after {deadline}s"
+        except Exception as e:
+            errors[check] = str(e)
+        finally:
+            timings[check] = round((time.perf_counter() - start) * 1000, 2)
+        
+        return None, errors[check]
+    
+    async def collect_health_check_async(self, groups: List[str] = None) -> Dict:
+        """
+        Run health checks concurrently and collect the results
+        
+        Each check runs as its own task with its own deadline. Propagation
+        waits for the A record lookup it depends on; everything else starts
+        immediately, so a full check takes about as long as the slowest probe.
+        
+        Args:
+            groups: Check groups to run (default: all of CHECK_GROUPS)
+        
+        Returns:
+            Results in the same shape as run_health_check, containing only
+            the checks of the selected groups
+        """
+        groups = set(groups or CHECK_GROUPS)
+        unknown = groups - set(CHECK_GROUPS)
+        if unknown:
+            raise ValueError(f"Unknown check groups: {', '.join(sorted(unknown))}")
         
         results = {
             "timestamp": datetime.now().isoformat(),
             "domain": self.domain,
             "checks": {}
         }
+        timings = {}
+        errors = {}
+        start = time.perf_counter()
         
-        # 1. Check A records
-        print("\n📍 Checking A Records...")
-        a_records = self.check_dns_record("A", self.domain)
-        results["checks"]["a_records"] = {
-            "values": a_records,
-            "status": "✅" if a_records and a_records[0] not in ["NXDOMAIN", "NoAnswer"] else "❌"
+        def skipped():
+            return asyncio.sleep(0, (None, None))
+        
+        expected_records = [
+            (expected["type"], expected["name"].replace("@", self.domain), expected["value"])
+            for expected in self.config.get("monitoring", {}).get("expected_records", [])
+        ] if "expected" in groups else []
+        
+        a_task = asyncio.ensure_future(self._run_check(
+            "a_records", self._in_thread(self.check_dns_record, "A", self.domain), timings, errors, "dns"
+        ) if groups & {"dns", "propagation"} else skipped())
+        
+        async def propagation():
+            a_records, error = await a_task
+            if "propagation" not in groups or error or not a_records or a_records[0] in FAILED_LOOKUPS:
+                return None, None
+            return await self._run_check(
+                "propagation",
+                self._in_thread(self.check_propagation, "A", self.domain, a_records[0]),
+                timings,
+                errors
+            )
+        
+        cname_task = self._run_check(
+            "www_cname", self._in_thread(self.check_dns_record, "CNAME", f"www.{self.domain}"),
+            timings, errors, "dns"
+        ) if "dns" in groups else skipped()
+        ssl_task = self._run_check(
+            "ssl", self._in_thread(self.check_ssl_certificates), timings, errors
+        ) if "ssl" in groups else skipped()
+        http_task = self._run_check(
+            "http", self._in_thread(self.check_http_response), timings, errors
+        ) if "http" in groups else skipped()
+        probe_task = self._run_check(
+            "http_probe", self._in_thread(self.probe_http, None, self.http_probe_samples), timings, errors, "http"
+        ) if "http" in groups and self.http_probe_samples else skipped()
+        mail_task = self._run_check(
+            "mail", self.check_mail_records_async(), timings, errors
+        ) if "mail" in groups else skipped()
+        expected_task = self._run_check("expected", asyncio.gather(*[
+            self._in_thread(self.check_dns_record, record_type, name)
+            for record_type, name, _ in expected_records
+        ]), timings, errors) if expected_records else skipped()
+        
+        (a_records, a_error), (www_cname, cname_error), (propagation_result, _), \
+            (ssl_hosts, ssl_error), (http_status, http_error), (http_probe, _), \
+            (mail_records, mail_error), (expected_actual, expected_error) = await asyncio.gather(
+                a_task, cname_task, propagation(), ssl_task, http_task, probe_task, mail_task, expected_task
+            )
+        
+        # 1. A records (also looked up for propagation)
+        if "a_records" in timings:
+            if a_error:
+                a_records = [f"Error: {a_error}"]
+            results["checks"]["a_records"] = {
+                "values": a_records,
+                "status": "✅" if a_records and a_records[0] not in FAILED_LOOKUPS and not a_error else "❌"
+            }
+        
+        # 2. CNAME for www
+        if "dns" in groups:
+            if cname_error:
+                www_cname = [f"Error: {cname_error}"]
+            results["checks"]["www_cname"] = {
+                "values": www_cname,
+                "status": "✅" if www_cname and www_cname[0] not in FAILED_LOOKUPS and not cname_error else "⚠️"
+            }
+        
+        # 3. Propagation (only when an A record was found)
+        if propagation_result is not None:
+            results["checks"]["propagation"] = propagation_result
+        
+        # 4. SSL certificates (the apex result stays under "ssl")
+        if "ssl" in groups:
+            if ssl_error:
+                ssl_hosts = {
+                    hostname: {"status": "❌ Error", "error": ssl_error, "hostname": hostname}
+                    for hostname in self.get_monitored_hostnames()
+                }
+            results["checks"]["ssl"] = ssl_hosts[self.domain]
+            results["checks"]["ssl_hosts"] = ssl_hosts
+        
+        # 5. HTTP response
+        if "http" in groups:
+            results["checks"]["http"] = http_status if not http_error else {
+                "status": "❌",
+                "error": http_error,
+                "url": f"https://{self.domain}"
+            }
+            if http_probe is not None:
+                results["checks"]["http_probe"] = http_probe
+        
+        # 6. Mail records
+        if "mail" in groups:
+            results["checks"]["mail"] = mail_records if not mail_error else {
+                "mx": [],
+                "spf": None,
+                "dmarc": None,
+                "dkim": [],
+                "error": mail_error
+            }
+        
+        # 7. Expected records
+        if expected_records:
+            results["checks"]["expected_records"] = []
+            
+            for index, (record_type, name, expected_value) in enumerate(expected_records):
+                actual = expected_actual[index] if not expected_error else [f"Error: {expected_error}"]
+                
+                results["checks"]["expected_records"].append({
+                    "type": record_type,
+                    "name": name,
+                    "expected": expected_value,
+                    "actual": actual,
+                    "match": expected_value in actual
+                })
+        
+        self.issues.extend(self.find_issues(results))
+        
+        results["check_durations_ms"] = timings
+        if errors:
+            results["check_errors"] = errors
+        results["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        
+        return results
+    
+    def find_issues(self, results: Dict) -> List[str]:
+        """List the issues in a result document"""
+        checks = results.get("checks", {})
+        issues = [
+            f"{expected['type']} {expected['name']} mismatch"
+            for expected in checks.get("expected_records", [])
+            if not expected["match"]
+        ]
+        
+        spf_check = checks.get("mail", {}).get("spf_check")
+        if spf_check and not spf_check["within_limit"]:
+            issues.append(f"SPF for {self.domain} exceeds the DNS lookup limit")
+        
+        return issues
+    
+    def collect_health_check(self, groups: List[str] = None) -> Dict:
+        """Run complete health check (or the given check groups) without printing"""
+        return asyncio.run(self.collect_health_check_async(groups))
+    
+    def load_zone_hosts(self, source: str = "cloudflare") -> Dict[str, List[Dict]]:
+        """
+        Enumerate the hosts of the live zone
+        
+        Args:
+            source: "cloudflare", "canspace", or the path of a backup file
+        
+        Returns:
+            Hostname to its A/AAAA/CNAME records ({"type", "value", "proxied"})
+        """
+        if source == "cloudflare":
+            from cloudflare_dns import CloudflareDNS
+            records = CloudflareDNS(os.getenv("CLOUDFLARE_API_TOKEN")).list_dns_records()
+        elif source == "canspace":
+            from canspace_dns import CanspaceDNS
+            records = CanspaceDNS(os.getenv("CANSPACE_USERNAME"), os.getenv("CANSPACE_PASSWORD"), self.domain).list_dns_records()
+        else:
+            backup = load_backup_file(source)
+            records = backup.get("unified_records", backup.get("records", []))
+        
+        hosts = {}
+        for record in records:
+            if not isinstance(record, dict) or record.get("type") not in SWEEP_RECORD_TYPES:
+                continue
+            
+            name = record.get("name", "").rstrip(".").lower()
+            if name.startswith("*"):
+                continue  # Wildcards have no single host to probe
+            # Providers return either fully qualified names or labels relative to the domain
+            hostname = name if "." in name else fqdn(name, self.domain)
+            
+            hosts.setdefault(hostname, []).append({
+                "type": record["type"],
+                "value": record.get("value", record.get("content", record.get("data"))),
+                "proxied": record.get("proxied", False)
+            })
+        
+        return dict(sorted(hosts.items()))
+    
+    async def sweep_hosts_async(self, hosts: Dict[str, List[Dict]], concurrency: int = None) -> Dict:
+        """
+        Check resolution, TLS and HTTP for every host
+        
+        All probes share one cap on in-flight operations, so hundreds of
+        hosts are checked in a single pass without opening hundreds of
+        sockets at once. TLS and HTTP are skipped for hosts that don't resolve.
+        
+        Args:
+            hosts: Hostname to zone records, as returned by load_zone_hosts
+            concurrency: Maximum concurrent probes (default: monitoring.sweep_concurrency or max_workers)
+        
+        Returns:
+            Dictionary with per-host results and a summary
+        """
+        concurrency = concurrency or self.config.get("monitoring", {}).get("sweep_concurrency", self.max_workers)
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="health-sweep") as executor:
+            async def probe(check: str, group: str, timings: Dict, errors: Dict, func, *args):
+                async with semaphore:
+                    return await self._run_check(
+                        check, loop.run_in_executor(executor, functools.partial(func, *args)), timings, errors, group
+                    )
+            
+            async def sweep_host(hostname: str, records: List[Dict]) -> Dict:
+                timings = {}
+                errors = {}
+                
+                lookups, _ = await probe("dns", "dns", timings, errors, lambda: (
+                    self.check_dns_record("A", hostname) + self.check_dns_record("AAAA", hostname)
+                ))
+                addresses = [
+                    value for value in lookups or []
+                    if value not in FAILED_LOOKUPS and not value.startswith("Error")
+                ]
+                
+                result = {
+                    "records": records,
+                    "proxied": any(record["proxied"] for record in records),
+                    "addresses": addresses,
+                    "resolves": bool(addresses),
+                    "ssl": None,
+                    "http": None
+                }
+                
+                if addresses:
+                    (ssl_result, _), (http_result, _) = await asyncio.gather(
+                        probe("ssl", "ssl", timings, errors, self.check_ssl_certificate, hostname),
+                        probe("http", "http", timings, errors, self.check_http_response, f"https://{hostname}")
+                    )
+                    result["ssl"] = ssl_result
+                    result["http"] = http_result
+                
+                result["ok"] = (
+                    result["resolves"]
+                    and bool(result["ssl"]) and result["ssl"]["status"].startswith("✅")
+                    and bool(result["http"]) and result["http"].get("status_code", 500) < 400
+                )
+                result["durations_ms"] = timings
+                if errors:
+                    result["errors"] = errors
+                
+                return result
+            
+            swept = await asyncio.gather(*(sweep_host(hostname, records) for hostname, records in hosts.items()))
+        
+        results = dict(zip(hosts, swept))
+        
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "domain": self.domain,
+            "concurrency": concurrency,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "summary": {
+                "hosts": len(results),
+                "ok": sum(1 for result in results.values() if result["ok"]),
+                "unresolved": sum(1 for result in results.values() if not result["resolves"])
+            },
+            "hosts": results
         }
-        print(f"  A Records: {', '.join(a_records)}")
+    
+    def sweep_hosts(self, source: str = "cloudflare", concurrency: int = None) -> Dict:
+        """Enumerate the zone's hosts from a provider or backup and sweep them"""
+        hosts = self.load_zone_hosts(source)
+        results = asyncio.run(self.sweep_hosts_async(hosts, concurrency))
+        results["source"] = source
+        return results
+    
+    def print_sweep_report(self, sweep: Dict):
+        """Print one row per swept host"""
+        print(f"\n🧹 Host sweep for {self.domain}: {sweep['summary']['hosts']} hosts "
+              f"in {sweep['duration_ms'] / 1000:.1f}s (concurrency {sweep['concurrency']})")
+        print("=" * 100)
+        print(f"{'':<3}{'Host':<40} {'Addresses':<20} {'TLS':<22} {'HTTP'}")
+        print("-" * 100)
+        
+        for hostname, result in sweep["hosts"].items():
+            addresses = result["addresses"][0] if result["addresses"] else "❌ unresolved"
+            if len(result["addresses"]) > 1:
+                addresses += f" +{len(result['addresses']) - 1}"
+            
+            tls = "-"
+            if result["ssl"]:
+                tls = result["ssl"]["status"]
+                if "days_remaining" in result["ssl"]:
+                    tls += f" ({result['ssl']['days_remaining']}d)"
+            
+            http = "-"
+            if result["http"]:
+                if "status_code" in result["http"]:
+                    http = f"{result['http']['status_code']} {result['http']['response_time'] * 1000:.0f}ms"
+                else:
+                    http = f"❌ {result['http'].get('error')}"
+            
+            flags = " (proxied)" if result["proxied"] else ""
+            print(f"{'✅' if result['ok'] else '❌'} {hostname + flags:<40} {addresses:<20} {tls:<22} {http}")
+        
+        summary = sweep["summary"]
+        print(f"\n{summary['ok']}/{summary['hosts']} hosts healthy, {summary['unresolved']} unresolved")
+    
+    def print_health_report(self, results: Dict):
+        """Print a health check report"""
+        checks = results["checks"]
         
-        # 2. Check CNAME for www
+        print(f"\n🏥 DNS Health Check for {self.domain}")
+        print("=" * 60)
+        
+        # 1. A records
+        print("\n📍 Checking A Records...")
+        print(f"  A Records: {', '.join(checks['a_records']['values'])}")
+        
+        # 2. CNAME for www
         print("\n🔗 Checking CNAME Records...")
-        www_cname = self.check_dns_record("CNAME", f"www.{self.domain}")
-        results["checks"]["www_cname"] = {
-            "values": www_cname,
-            "status": "✅" if www_cname and www_cname[0] not in ["NXDOMAIN", "NoAnswer"] else "⚠️"
-        }
-        print(f"  WWW CNAME: {', '.join(www_cname)}")
+        print(f"  WWW CNAME: {', '.join(checks['www_cname']['values'])}")
         
-        # 3. Check propagation
-        if a_records and a_records[0] not in ["NXDOMAIN", "NoAnswer"]:
+        # 3. Propagation
+        if "propagation" in checks:
+            propagation = checks["propagation"]
             print("\n🌍 Checking DNS Propagation...")
-            propagation = self.check_propagation("A", self.domain, a_records[0])
-            results["checks"]["propagation"] = propagation
             
             propagated = sum(1 for p in propagation.values() if p["match"])
             total = len(propagation)
             print(f"  Propagation: {propagated}/{total} nameservers")
             
             for ns, status in propagation.items():
-                print(f"    {status['status']} {ns}: {status['value']}")
+                print(f"    {status['status']} {ns}: {status['value']} ({status['rtt_ms']:.0f}ms)")
         
-        # 4. Check SSL certificate
-        print("\n🔒 Checking SSL Certificate...")
-        ssl_status = self.check_ssl_certificate()
-        results["checks"]["ssl"] = ssl_status
-        print(f"  SSL Status: {ssl_status['status']}")
-        if ssl_status.get("not_after"):
-            print(f"  Expires: {ssl_status['not_after']}")
+        # 4. SSL certificates
+        print("\n🔒 Checking SSL Certificates...")
+        for hostname, ssl_status in checks.get("ssl_hosts", {self.domain: checks["ssl"]}).items():
+            print(f"  {hostname}: {ssl_status['status']}")
+            if ssl_status.get("not_after"):
+                print(f"    Expires: {ssl_status['not_after']} ({ssl_status.get('days_remaining')} days)")
+            if ssl_status.get("error"):
+                print(f"    Error: {ssl_status['error']}")
         
-        # 5. Check HTTP response
+        # 5. HTTP response
+        http_status = checks["http"]
         print("\n🌐 Checking HTTP Response...")
-        http_status = self.check_http_response()
-        results["checks"]["http"] = http_status
         
         if http_status.get("status_code"):
             print(f"  HTTP Status: {http_status['status_code']} {http_status['status']}")
@@ -297,10 +1253,14 @@ class DNSHealthMonitor:
         else:
             print(f"  HTTP Status: {http_status['status']} {http_status.get('error', '')}")
         
-        # 6. Check mail records
+        if checks.get("http_probe", {}).get("phases"):
+            probe = checks["http_probe"]
+            print(f"  Probe ({probe['samples']} samples): TTFB p50 {probe['phases']['ttfb_ms']['p50']:.0f}ms, "
+                  f"total p95 {probe['phases']['total_ms']['p95']:.0f}ms")
+        
+        # 6. Mail records
+        mail_records = checks["mail"]
         print("\n✉️ Checking Mail Records...")
-        mail_records = self.check_mail_records()
-        results["checks"]["mail"] = mail_records
         
         if mail_records["mx"]:
             print(f"  MX Records: {', '.join(mail_records['mx'])}")
@@ -322,22 +1282,15 @@ class DNSHealthMonitor:
         else:
             print("  DKIM: ⚠️ Not configured")
         
-        # 7. Check expected records
-        if self.config.get("monitoring", {}).get("expected_records"):
+        # 7. Expected records
+        if checks.get("expected_records"):
             print("\n✔️ Checking Expected Records...")
             
-            for expected in self.config["monitoring"]["expected_records"]:
-                record_type = expected["type"]
-                name = expected["name"].replace("@", self.domain)
-                expected_value = expected["value"]
-                
-                actual = self.check_dns_record(record_type, name)
-                
-                if expected_value in actual:
-                    print(f"  ✅ {record_type} {name} = {expected_value}")
+            for expected in checks["expected_records"]:
+                if expected["match"]:
+                    print(f"  ✅ {expected['type']} {expected['name']} = {expected['expected']}")
                 else:
-                    print(f"  ❌ {record_type} {name} expected {expected_value}, got {actual}")
-                    self.issues.append(f"{record_type} {name} mismatch")
+                    print(f"  ❌ {expected['type']} {expected['name']} expected {expected['expected']}, got {expected['actual']}")
         
         # Summary
         print("\n" + "=" * 60)
@@ -348,31 +1301,89 @@ class DNSHealthMonitor:
         else:
             print("✅ All checks passed!")
         
+        if results.get("duration_ms") is not None:
+            print(f"⏱️ Completed in {results['duration_ms'] / 1000:.2f}s")
+    
+    def run_health_check(self) -> Dict:
+        """Run complete health check"""
+        results = self.collect_health_check()
+        self.print_health_report(results)
         return results
     
-    def monitor_continuous(self, interval: int = 3600):
+    def get_history(self) -> HealthHistoryStore:
+        """Open the health history store configured under monitoring.history"""
+        if self._history is None:
+            history_config = self.config.get("monitoring", {}).get("history", {})
+            self._history = HealthHistoryStore(
+                history_config.get("path", "health_history.db"),
+                raw_retention_days=history_config.get("raw_retention_days", 7),
+                rollup_retention_days=history_config.get("rollup_retention_days", 365)
+            )
+        return self._history
+    
+    def save_results(self, results: Dict, latest_file: str = "health_check_latest.json", snapshot: Dict = None):
+        """
+        Append results to the history store and refresh the latest snapshot
+        
+        Args:
+            results: Results of the run to record
+            latest_file: File holding the most recent results
+            snapshot: Merged results to write instead of results (scheduled partial runs)
+        """
+        self.get_history().record(results)
+        
+        with open(latest_file, 'w') as f:
+            json.dump(snapshot or results, f, indent=2)
+    
+    def monitor_continuous(self, interval: int = None, metrics_port: int = None):
         """
         Run continuous monitoring
         
+        Without an interval, each check group runs on its own adaptive
+        schedule (monitoring.schedule). With one, the full suite runs every
+        interval seconds.
+        
         Args:
-            interval: Check interval in seconds (default: 1 hour)
+            interval: Fixed check interval in seconds (default: adaptive schedule)
+            metrics_port: Serve Prometheus metrics on this port
+                          (default: monitoring.metrics_port, disabled if unset)
         """
-        print(f"🔄 Starting continuous monitoring (interval: {interval}s)")
+        if metrics_port is None:
+            metrics_port = self.config.get("monitoring", {}).get("metrics_port")
+        
+        metrics_server = None
+        if metrics_port:
+            metrics_server = MetricsServer(self.metrics, int(metrics_port))
+            metrics_server.start()
         
+        try:
+            if interval:
+                print(f"🔄 Starting continuous monitoring (interval: {interval}s)")
+                self._monitor_fixed(interval)
+            else:
+                print("🔄 Starting continuous monitoring (adaptive schedule)")
+                self._monitor_scheduled()
+        except KeyboardInterrupt:
+            print("\n👋 Monitoring stopped")
+        finally:
+            if metrics_server:
+                metrics_server.stop()
+            if self._alerts:
+                self._alerts.close()
+    
+    def _monitor_fixed(self, interval: int):
+        """Run the full check suite every interval seconds"""
         while True:
             try:
                 results = self.run_health_check()
                 
                 # Save results
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                results_file = f"health_check_{timestamp}.json"
+                self.save_results(results)
+                self.get_history().maintain()
+                self.metrics.update(results, self.issues)
                 
-                with open(results_file, 'w') as f:
-                    json.dump(results, f, indent=2)
-                
-                # Alert if issues found
-                if self.issues:
-                    self.send_alert(self.issues)
+                # Alert on new, resolved and long-running issues
+                self.send_alert(self.issues)
                 
                 # Clear issues for next run
                 self.issues = []
@@ -382,39 +1393,97 @@ class DNSHealthMonitor:
                 time.sleep(interval)
                 
             except KeyboardInterrupt:
-                print("\n👋 Monitoring stopped")
-                break
+                raise
             except Exception as e:
                 print(f"❌ Error during monitoring: {e}")
                 time.sleep(60)  # Wait 1 minute on error
     
+    def _monitor_scheduled(self):
+        """Run each check group whenever the adaptive scheduler says it is due"""
+        schedule_config = self.config.get("monitoring", {}).get("schedule", {})
+        scheduler = CheckScheduler(
+            {group: schedule_config[group] for group in CHECK_GROUPS if group in schedule_config},
+            jitter=schedule_config.get("jitter", 0.1),
+            backoff=schedule_config.get("backoff", 1.5)
+        )
+        
+        for group, status in scheduler.status().items():
+            print(f"  {group:<12} every {status['interval_s']:.0f}s")
+        
+        latest = {}
+        
+        while True:
+            time.sleep(scheduler.seconds_until_due())
+            groups = scheduler.due()
+            
+            try:
+                self.issues = []
+                results = self.collect_health_check(groups)
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                print(f"❌ Error during monitoring ({', '.join(groups)}): {e}")
+                for group in groups:
+                    scheduler.record(group, False)
+                continue
+            
+            outcomes = []
+            changes = []
+            for group in groups:
+                ok, value_fingerprint = group_outcome(group, results)
+                if scheduler.record(group, ok, value_fingerprint):
+                    changes.append(group)
+                outcomes.append(f"{'✅' if ok else '❌'} {group}")
+            
+            latest = merge_results(latest, results, groups)
+            latest["schedule"] = scheduler.status()
+            self.issues = self.find_issues(latest)
+            
+            self.save_results(results, snapshot=latest)
+            self.get_history().maintain()
+            self.metrics.update(results, self.issues)
+            
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {'  '.join(outcomes)} ({results['duration_ms']:.0f}ms)")
+            if changes:
+                print(f"  🔀 DNS change detected ({', '.join(changes)}), tightening related checks")
+            
+            self.send_alert(self.issues)
+    
+    def get_alert_manager(self) -> AlertManager:
+        """Create the alert pipeline configured under monitoring.alerts"""
+        if self._alerts is None:
+            monitoring = self.config.get("monitoring", {})
+            alerts_config = monitoring.get("alerts", {})
+            
+            sink_configs = []
+            for sink_config in alerts_config.get("sinks", [{"type": "file", "path": "dns_alerts.log"}]):
+                if sink_config["type"] == "smtp" and "to" not in sink_config:
+                    sink_config = {**sink_config, "to": [monitoring.get("alert_email")]}
+                sink_configs.append(sink_config)
+            
+            self._alerts = AlertManager(
+                self.domain,
+                create_sinks(sink_configs),
+                suppress_window=alerts_config.get("suppress_window", 3600),
+                flap_window=alerts_config.get("flap_window", 1800),
+                flap_threshold=alerts_config.get("flap_threshold", 4),
+                batch_window=alerts_config.get("batch_window", 60)
+            )
+        return self._alerts
+    
     def send_alert(self, issues: List[str]):
-        """Send alert for DNS issues"""
-        alert_email = self.config.get("monitoring", {}).get("alert_email")
-        
-        if not alert_email:
-            print("⚠️ No alert email configured")
-            return
-        
-        # Log alert
-        alert_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        alert_message = f"""
-DNS Health Alert for {self.domain}
-Time: {alert_time}
-
-Issues Found:
-{chr(10).join(f'- {issue}' for issue in issues)}
-
-Please check the DNS configuration immediately.
         """
+        Feed the issues of a run into the alert pipeline
         
-        print(f"\n🚨 ALERT: {len(issues)} DNS issue(s) detected!")
-        print(alert_message)
+        Call after every run, including runs without issues, so resolutions
+        are noticed. Delivery happens on the pipeline's worker thread.
+        """
+        events = self.get_alert_manager().process(issues)
         
-        # You can implement email sending here if needed
-        # For now, just log to file
-        with open("dns_alerts.log", 'a') as f:
-            f.write(f"\n{alert_time}: {', '.join(issues)}\n")
+        if events:
+            print(f"\n🚨 ALERT: {len(events)} DNS alert event(s) queued")
+            for event in events:
+                print(f"  {EVENT_LABELS[event['state']]}: {event['issue']}")
 
 
 def main():
@@ -427,16 +1496,27 @@ Usage: python dns-health-monitor.py [command] [options]
 
 Commands:
     check              - Run single health check
-    monitor [interval] - Run continuous monitoring (default: 3600s)
+    monitor [interval] [--metrics-port N] - Run continuous monitoring (default: adaptive per-check schedule)
     propagation        - Check DNS propagation status
-    ssl               - Check SSL certificate status
+    authoritative [type name [value]] - Query the zone's authoritative nameservers directly
+    sweep [source] [--concurrency N] [--json] - Check DNS, TLS and HTTP for every host in the zone
+                       (source: cloudflare, canspace or a backup file; default: cloudflare)
+    ssl [hostnames]   - Check SSL certificates (default: all monitored hostnames)
+    http [samples] [urls] [--cold] - Probe HTTP latency phases (default: 10 samples)
+    history [check] [days] [pct] - Success rate and hourly latency percentile
     mail              - Check mail configuration
     
 Examples:
     python dns-health-monitor.py check
+    python dns-health-monitor.py monitor
     python dns-health-monitor.py monitor 1800
+    python dns-health-monitor.py monitor --metrics-port 9108
     python dns-health-monitor.py propagation
+    python dns-health-monitor.py authoritative TXT _dmarc.leo.pvthostel.com
+    python dns-health-monitor.py sweep backups/latest_unified.json --concurrency 64
     python dns-health-monitor.py ssl
+    python dns-health-monitor.py http 20 https://leo.pvthostel.com
+    python dns-health-monitor.py history http 1 95
     python dns-health-monitor.py mail
 """)
         sys.exit(0)
@@ -449,48 +1529,188 @@ Examples:
             results = monitor.run_health_check()
             
             # Save results
-            with open("health_check_latest.json", 'w') as f:
-                json.dump(results, f, indent=2)
+            monitor.save_results(results)
             
             print(f"\n💾 Results saved to health_check_latest.json")
         
         elif command == "monitor":
-            interval = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
-            monitor.monitor_continuous(interval)
+            args = sys.argv[2:]
+            metrics_port = None
+            if "--metrics-port" in args:
+                index = args.index("--metrics-port")
+                metrics_port = int(args[index + 1])
+                del args[index:index + 2]
+            
+            interval = int(args[0]) if args else None
+            monitor.monitor_continuous(interval, metrics_port)
         
         elif command == "propagation":
             print(f"\n🌍 Checking DNS Propagation for {monitor.domain}")
             print("=" * 60)
             
-            # Check A record propagation
+            # Check A record propagation along with any expected records
             a_records = monitor.check_dns_record("A", monitor.domain)
             if a_records and a_records[0] not in ["NXDOMAIN", "NoAnswer"]:
-                propagation = monitor.check_propagation("A", monitor.domain, a_records[0])
+                records = [("A", monitor.domain, a_records[0])]
+                for expected in monitor.config.get("monitoring", {}).get("expected_records", []):
+                    record = (expected["type"], expected["name"].replace("@", monitor.domain), expected["value"])
+                    if record not in records:
+                        records.append(record)
                 
-                propagated = sum(1 for p in propagation.values() if p["match"])
-                total = len(propagation)
+                matrix = monitor.check_propagation_matrix(records)
                 
-                print(f"\nExpected: {a_records[0]}")
-                print(f"Propagation: {propagated}/{total} nameservers ({propagated*100//total}%)\n")
+                for record_type, name, expected_value in records:
+                    propagation = matrix["records"][monitor.matrix_key(record_type, name, expected_value)]
+                    propagated = sum(1 for p in propagation.values() if p["match"])
+                    total = len(propagation)
+                    
+                    print(f"\n{record_type} {name}")
+                    print(f"Expected: {expected_value}")
+                    print(f"Propagation: {propagated}/{total} nameservers ({propagated*100//total}%)\n")
+                    
+                    for ns, status in propagation.items():
+                        print(f"{status['status']} {ns:<20} {str(status['value']):<30} {status['rtt_ms']:.1f}ms")
                 
-                for ns, status in propagation.items():
-                    print(f"{status['status']} {ns:<20} {status['value']}")
+                print(f"\n⏱️ Resolver latency ({matrix['duration_ms']:.0f}ms total)\n")
+                print(f"{'Resolver':<20} {'Queries':<8} {'Errors':<8} {'Min':<10} {'Avg':<10} {'P95':<10} {'Max'}")
+                print("-" * 76)
+                for ns, stats in matrix["resolvers"].items():
+                    print(f"{ns:<20} {stats['queries']:<8} {stats['errors']:<8} "
+                          f"{stats['min_ms']:<10.1f} {stats['avg_ms']:<10.1f} {stats['p95_ms']:<10.1f} {stats['max_ms']:.1f}")
             else:
                 print("❌ No A record found")
         
+        elif command == "sweep":
+            args = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+            concurrency = None
+            if "--concurrency" in sys.argv:
+                concurrency = int(sys.argv[sys.argv.index("--concurrency") + 1])
+                args.remove(str(concurrency))
+            
+            sweep = monitor.sweep_hosts(args[0] if args else "cloudflare", concurrency)
+            
+            with open("health_sweep_latest.json", 'w') as f:
+                json.dump(sweep, f, indent=2)
+            
+            if "--json" in sys.argv:
+                print(json.dumps(sweep, indent=2))
+            else:
+                monitor.print_sweep_report(sweep)
+                print(f"\n💾 Results saved to health_sweep_latest.json")
+        
+        elif command == "authoritative":
+            if len(sys.argv) > 3:
+                records = [(sys.argv[2].upper(), sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else None)]
+            else:
+                a_records = monitor.check_dns_record("A", monitor.domain)
+                records = [("A", monitor.domain, a_records[0])] + [
+                    (expected["type"], expected["name"].replace("@", monitor.domain), expected["value"])
+                    for expected in monitor.config.get("monitoring", {}).get("expected_records", [])
+                ]
+            
+            result = monitor.check_authoritative(records)
+            
+            print(f"\n🏛️ Authoritative nameservers for {result['zone']}")
+            print("=" * 60)
+            for host, serial in result["serials"].items():
+                print(f"{'✅' if serial else '❌'} {host:<30} {result['nameservers'][host]:<16} SOA {serial}")
+            print(f"\nSerials in sync: {'✅' if result['serials_in_sync'] else '❌'}")
+            
+            for key, servers in result["records"].items():
+                print(f"\n{key}")
+                for host, answer in servers.items():
+                    icon = "✅" if answer["match"] else "❌"
+                    values = ", ".join(answer["values"]) or answer["status"]
+                    print(f"{icon} {host:<30} {values:<40} {answer['rtt_ms']:.1f}ms")
+        
         elif command == "ssl":
-            print(f"\n🔒 Checking SSL Certificate for {monitor.domain}")
+            hostnames = sys.argv[2:] or monitor.get_monitored_hostnames()
+            
+            print(f"\n🔒 Checking SSL Certificates for {', '.join(hostnames)}")
             print("=" * 60)
             
-            ssl_status = monitor.check_ssl_certificate()
+            for hostname, ssl_status in monitor.check_ssl_certificates(hostnames).items():
+                print(f"\n{hostname}")
+                print(f"Status: {ssl_status['status']}")
+                if ssl_status.get("not_before"):
+                    print(f"Valid From: {ssl_status['not_before']}")
+                if ssl_status.get("not_after"):
+                    print(f"Valid Until: {ssl_status['not_after']} ({ssl_status['days_remaining']} days)")
+                if ssl_status.get("issuer"):
+                    print(f"Issuer: {ssl_status['issuer']}")
+                if "san_covers_hostname" in ssl_status:
+                    covered = "✅" if ssl_status["san_covers_hostname"] else "❌"
+                    print(f"SAN Coverage: {covered} {', '.join(ssl_status.get('san', []))}")
+                if ssl_status.get("chain"):
+                    print(f"Chain: {' → '.join(str(c['subject']) for c in ssl_status['chain'])}")
+                if ssl_status.get("handshake_ms") is not None:
+                    print(f"Handshake: {ssl_status['handshake_ms']:.0f}ms ({ssl_status['tls_version']}, connect {ssl_status['connect_ms']:.0f}ms)")
+                if ssl_status.get("error"):
+                    print(f"Error: {ssl_status['error']}")
+        
+        elif command == "http":
+            args = [arg for arg in sys.argv[2:] if arg != "--cold"]
+            samples = int(args.pop(0)) if args and args[0].isdigit() else 10
+            urls = args or [f"https://{hostname}" for hostname in monitor.get_monitored_hostnames()]
+            pooled = "--cold" not in sys.argv
             
-            print(f"\nStatus: {ssl_status['status']}")
-            if ssl_status.get("not_before"):
-                print(f"Valid From: {ssl_status['not_before']}")
-            if ssl_status.get("not_after"):
-                print(f"Valid Until: {ssl_status['not_after']}")
-            if ssl_status.get("error"):
-                print(f"Error: {ssl_status['error']}")
+            print(f"\n🌐 Probing HTTP latency ({samples} samples, {'pooled' if pooled else 'cold'} connections)")
+            print("=" * 60)
+            
+            with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+                probes = list(executor.map(lambda url: monitor.probe_http(url, samples, pooled), urls))
+            
+            for probe in probes:
+                print(f"\n{probe['url']}")
+                
+                if not probe["samples"]:
+                    print(f"  ❌ {probe['error']}")
+                    continue
+                
+                print(f"  Status: {probe['status_code']} {probe['status']}  →  {probe['final_url']}")
+                print(f"  Samples: {probe['samples']} ({probe['errors']} errors, {probe['connections_opened']} connections opened)")
+                print(f"\n  {'Phase':<14} {'p50':>10} {'p95':>10} {'p99':>10} {'cold':>10}")
+                
+                for phase, label in [("dns_ms", "DNS"), ("connect_ms", "Connect"), ("tls_ms", "TLS"),
+                                     ("ttfb_ms", "TTFB"), ("transfer_ms", "Transfer"),
+                                     ("redirect_ms", "Redirects"), ("total_ms", "Total")]:
+                    stats = probe["phases"][phase]
+                    if stats:
+                        print(f"  {label:<14} {stats['p50']:>8.1f}ms {stats['p95']:>8.1f}ms {stats['p99']:>8.1f}ms {probe['cold'][phase]:>8.1f}ms")
+                
+                transfer = probe["transfer"]
+                print(f"\n  Transfer: {transfer['compressed_bytes']} bytes ({transfer['content_encoding']})"
+                      + (f", {transfer['uncompressed_bytes']} uncompressed" if transfer["uncompressed_bytes"] is not None else ""))
+                
+                if probe["redirects"]["count"]:
+                    hops = " → ".join(f"{hop['status_code']} {hop['url']}" for hop in probe["redirects"]["chain"])
+                    print(f"  Redirects: {probe['redirects']['count']} ({hops})")
+        
+        elif command == "history":
+            check = sys.argv[2] if len(sys.argv) > 2 else "propagation"
+            days = float(sys.argv[3]) if len(sys.argv) > 3 else 7
+            pct = float(sys.argv[4]) if len(sys.argv) > 4 else 95
+            
+            history = monitor.get_history()
+            history.maintain()
+            stats = history.stats()
+            
+            print(f"\n📈 {check} history for {monitor.domain} (last {days:g} days)")
+            print("=" * 60)
+            print(f"Store: {stats['samples']} samples, {stats['rollups']} hourly rollups")
+            
+            rate = history.success_rate(check, days)
+            if rate is None:
+                print(f"\nNo {check} samples recorded")
+            else:
+                print(f"\nSuccess rate: {rate * 100:.2f}%")
+                
+                series = [row for row in history.percentile_by_hour(check, pct, days) if row[1] is not None]
+                if series:
+                    print(f"\n{'Hour':<22} {'p' + format(pct, 'g'):>10} {'Samples':>8}")
+                    print("-" * 42)
+                    for hour, value, count in series[-48:]:
+                        print(f"{hour:<22} {value:>10.1f} {count:>8}")
         
         elif command == "mail":
             print(f"\n✉️ Checking Mail Configuration for {monitor.domain}")
@@ -508,6 +1728,20 @@ Examples:
             print("\nSPF Record:")
             if mail_records["spf"]:
                 print(f"  ✅ {mail_records['spf']}")
+                
+                spf_check = mail_records["spf_check"]
+                status = "✅" if spf_check["within_limit"] else "❌"
+                print(f"  {status} {spf_check['lookups']}/{spf_check['limit']} DNS lookups, "
+                      f"{spf_check['void_lookups']}/{SPF_VOID_LOOKUP_LIMIT} void")
+                
+                def print_includes(node, indent):
+                    for include in node["includes"]:
+                        print(f"{' ' * indent}↳ {include['domain']} ({include['lookups']} lookups)")
+                        print_includes(include, indent + 2)
+                
+                print_includes(spf_check["tree"], 4)
+                for error in spf_check["errors"]:
+                    print(f"  ⚠️ {error}")
             else:
                 print("  ❌ No SPF record found")
                 print("  💡 Add TXT record: v=spf1 a mx ~all")
@@ -7,10 +7,34 @@ Manages DNS across multiple providers (Cloudflare and Canspace.ca)
 import os
 import sys
 import json
+import ipaddress
+import threading
 from typing import Dict, List, Optional
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from cloudflare_dns import CloudflareDNS
 from canspace_dns import CanspaceDNS
+from dns_resolver import AuthoritativeChecker, propagation_checks
+
+BULK_ACTIONS = ["create", "update", "delete"]
+BULK_RECORD_TYPES = ["A", "AAAA", "CNAME", "MX", "TXT", "SRV", "CAA"]
+
+# Record types each provider client can create (cPanel's zone editor has no CAA)
+PROVIDER_RECORD_TYPES = {
+    "cloudflare": BULK_RECORD_TYPES,
+    "canspace": ["A", "AAAA", "CNAME", "MX", "TXT", "SRV"]
+}
+
+# Record types each provider client can update in place, where narrower than the
+# above (cPanel's edit_zone_record has no MX fields; MX only goes through Email/add_mx)
+PROVIDER_UPDATE_TYPES = {
+    "canspace": ["A", "AAAA", "CNAME", "TXT", "SRV"]
+}
+
+
+class BulkOperationError(Exception):
+    """Raised when a single bulk operation fails on a provider"""
+
 
 class UnifiedDNSManager:
     def __init__(self, config_file: str = "dns-config.json"):
@@ -85,13 +109,14 @@ class UnifiedDNSManager:
             else:
                 print("⚠️ Canspace credentials not configured")
     
-    def sync_records(self, source: str = None, target: str = None):
+    def sync_records(self, source: str = None, target: str = None, wait: bool = False):
         """
         Sync DNS records between providers
         
         Args:
             source: Source provider (default: primary_provider)
             target: Target provider (default: all other providers)
+            wait: Block until the authoritative nameservers serve the synced records
         """
         if not source:
             source = self.config["primary_provider"]
@@ -174,6 +199,52 @@ class UnifiedDNSManager:
         
         self.save_config()
         print(f"\n✅ Sync completed. {len(formatted_records)} records processed.")
+        
+        if wait:
+            self.wait_for_propagation(formatted_records)
+    
+    def wait_for_propagation(self, records: List[Dict], timeout: float = None) -> Optional[Dict]:
+        """
+        Wait until the zone's authoritative nameservers serve the given records
+        
+        Args:
+            records: Records in provider or unified format
+            timeout: Seconds to wait (default: propagation.timeout, 300)
+        
+        Returns:
+            Final authoritative check result, or None if nothing could be checked
+        """
+        settings = self.config.get("propagation", {})
+        checks = propagation_checks(records)
+        
+        if not checks:
+            print("ℹ️ No records to verify on the authoritative nameservers")
+            return None
+        
+        checker = AuthoritativeChecker()
+        print(f"\n⏳ Waiting for {len(checks)} record(s) on the authoritative nameservers...")
+        
+        try:
+            zone = checker.find_zone(self.config.get("domain", checks[0][1]))
+            result = checker.wait_for_propagation(
+                checks,
+                timeout=timeout or settings.get("timeout", 300),
+                interval=settings.get("interval", 2),
+                zone=zone
+            )
+        except Exception as e:
+            print(f"❌ Could not check propagation: {e}")
+            return None
+        
+        if result["propagated"]:
+            print(f"✅ Served by all {len(result['nameservers'])} nameservers of {result['zone']} "
+                  f"after {result['elapsed_s']}s (serials: {sorted(set(result['serials'].values()), key=str)})")
+        else:
+            print(f"⚠️ Not yet served everywhere after {result['elapsed_s']}s:")
+            for key in result["pending"]:
+                print(f"  - {key}")
+        
+        return result
     
     def apply_template(self, template: str):
         """Apply a predefined DNS template"""
@@ -323,54 +394,387 @@ class UnifiedDNSManager:
         else:
             print(f"\n✅ All records are synchronized")
     
-    def bulk_update(self, updates_file: str):
-        """Apply bulk DNS updates from JSON file"""
+    def validate_bulk_updates(self, updates: List[Dict], providers: List[str] = None) -> List[str]:
+        """
+        Validate a whole bulk update batch before anything is applied
+        
+        Args:
+            updates: List of update entries loaded from the updates file
+            providers: Providers the batch will be applied to (default: all initialized providers)
+        
+        Returns:
+            List of validation errors (empty if the batch is valid)
+        """
+        errors = []
+        providers = list(self.providers) if providers is None else providers
+        
+        if not isinstance(updates, list):
+            return ["Updates file must contain a JSON list"]
+        
+        seen = set()
+        
+        for index, update in enumerate(updates, 1):
+            prefix = f"#{index}"
+            
+            if not isinstance(update, dict):
+                errors.append(f"{prefix}: entry must be an object")
+                continue
+            
+            action = update.get("action", "create")
+            record_type = update.get("type")
+            name = update.get("name")
+            value = update.get("value")
+            
+            if action not in BULK_ACTIONS:
+                errors.append(f"{prefix}: unknown action '{action}'")
+            if not name:
+                errors.append(f"{prefix}: missing name")
+            if action in ["create", "update"] and not record_type:
+                errors.append(f"{prefix}: {action} requires a type")
+            if record_type and record_type not in BULK_RECORD_TYPES:
+                errors.append(f"{prefix}: unsupported record type '{record_type}'")
+            elif record_type:
+                unsupported = [
+                    provider for provider in providers
+                    if record_type not in PROVIDER_RECORD_TYPES.get(provider, BULK_RECORD_TYPES)
+                ]
+                if unsupported:
+                    errors.append(f"{prefix}: {record_type} records are not supported by {', '.join(unsupported)}")
+                elif action == "update":
+                    unsupported = [
+                        provider for provider in providers
+                        if record_type not in PROVIDER_UPDATE_TYPES.get(provider, BULK_RECORD_TYPES)
+                    ]
+                    if unsupported:
+                        errors.append(f"{prefix}: {record_type} records cannot be updated on {', '.join(unsupported)}")
+            if action in ["create", "update"] and not value:
+                errors.append(f"{prefix}: {action} requires a value")
+            
+            if value and record_type in ["A", "AAAA"]:
+                try:
+                    address = ipaddress.ip_address(value)
+                    if address.version != (4 if record_type == "A" else 6):
+                        errors.append(f"{prefix}: {value} is not a valid {record_type} address")
+                except ValueError:
+                    errors.append(f"{prefix}: {value} is not a valid {record_type} address")
+            
+            ttl = update.get("ttl")
+            if ttl is not None and (not isinstance(ttl, int) or ttl < 1):
+                errors.append(f"{prefix}: ttl must be a positive integer")
+            
+            priority = update.get("priority")
+            if priority is not None and (not isinstance(priority, int) or priority < 0):
+                errors.append(f"{prefix}: priority must be a non-negative integer")
+            
+            key = (action, record_type, name, value)
+            if key in seen:
+                errors.append(f"{prefix}: duplicate of an earlier entry")
+            seen.add(key)
+        
+        return errors
+    
+    def _canspace_params(self, record_type: str, value: str, fields: Dict) -> Dict:
+        """
+        cPanel edit_zone_record parameters for a record value plus its ttl and priority
+        
+        Args:
+            record_type: Type of the record being edited
+            value: Record value
+            fields: Update entry or existing record; ttl and priority are passed when set
+        """
+        if record_type in ["A", "AAAA"]:
+            params = {"address": value}
+        elif record_type == "CNAME":
+            params = {"cname": value}
+        elif record_type == "TXT":
+            params = {"txtdata": value}
+        else:
+            params = {"target": value}
+        
+        for field in ["ttl", "priority"]:
+            if fields.get(field) is not None:
+                params[field] = fields[field]
+        
+        return params
+    
+    def _apply_bulk_operation(self, provider_name: str, provider, update: Dict) -> Optional[Dict]:
+        """
+        Apply one bulk operation to a provider
+        
+        Args:
+            provider_name: Name of the provider
+            provider: Provider client
+            update: Update entry from the batch
+        
+        Returns:
+            Inverse operation that undoes the change, or None if nothing changed
+        """
+        action = update.get("action", "create")
+        record_type = update.get("type")
+        name = update["name"]
+        
+        if action == "create":
+            if provider_name == "cloudflare":
+                created = provider.create_dns_record(
+                    record_type,
+                    name,
+                    update["value"],
+                    ttl=update.get("ttl", 1),
+                    proxied=update.get("proxied", False),
+                    priority=update.get("priority")
+                )
+                return {"action": "delete", "id": created["id"]}
+            
+            if not provider.create_dns_record(
+                record_type,
+                name,
+                update["value"],
+                ttl=update.get("ttl", 14400),
+                priority=update.get("priority")
+            ):
+                raise BulkOperationError(f"create {record_type} {name} rejected by {provider_name}")
+            return {"action": "delete", "type": record_type, "name": name, "value": update["value"]}
+        
+        existing = provider.find_record(name, record_type)
+        
+        if action == "update":
+            if not existing:
+                raise BulkOperationError(f"update target {record_type} {name} not found on {provider_name}")
+            
+            if provider_name == "cloudflare":
+                fields = {"content": update["value"]}
+                for field in ["ttl", "proxied", "priority"]:
+                    if field in update:
+                        fields[field] = update[field]
+                provider.update_dns_record(existing["id"], **fields)
+                return {
+                    "action": "update",
+                    "id": existing["id"],
+                    "fields": {field: existing.get(field) for field in fields}
+                }
+            
+            params = self._canspace_params(existing["type"], update["value"], update)
+            if not provider.update_dns_record(existing["line"], **params):
+                raise BulkOperationError(f"update {record_type} {name} rejected by {provider_name}")
+            return {
+                "action": "update",
+                "type": existing["type"],
+                "name": name,
+                "value": update["value"],
+                "params": self._canspace_params(existing["type"], existing["data"], existing)
+            }
+        
+        # delete
+        if not existing:
+            # Nothing to delete, so nothing to undo either
+            return None
+        
+        if provider_name == "cloudflare":
+            provider.delete_dns_record(existing["id"])
+            return {"action": "create", "record": existing}
+        
+        if not provider.delete_dns_record(existing["line"]):
+            raise BulkOperationError(f"delete {existing['type']} {name} rejected by {provider_name}")
+        return {"action": "create", "record": existing}
+    
+    def _apply_inverse_operation(self, provider_name: str, provider, inverse: Dict,
+                                 id_map: Dict) -> None:
+        """
+        Undo a previously applied bulk operation
+        
+        Args:
+            provider_name: Name of the provider
+            provider: Provider client
+            inverse: Inverse operation recorded when the change was applied
+            id_map: Cloudflare record IDs reassigned by earlier rollback steps
+        """
+        action = inverse["action"]
+        
+        if provider_name == "cloudflare":
+            if action == "delete":
+                provider.delete_dns_record(id_map.get(inverse["id"], inverse["id"]))
+            elif action == "update":
+                provider.update_dns_record(id_map.get(inverse["id"], inverse["id"]), **inverse["fields"])
+            else:
+                record = inverse["record"]
+                recreated = provider.create_dns_record(
+                    record["type"],
+                    record["name"],
+                    record["content"],
+                    ttl=record.get("ttl", 1),
+                    proxied=record.get("proxied", False),
+                    priority=record.get("priority")
+                )
+                # Recreated records get a new ID; earlier journal entries
+                # may still refer to the old one
+                id_map[record["id"]] = recreated["id"]
+            return
+        
+        # canspace addresses records by zone line, which shifts as the zone
+        # changes, so inverse operations are resolved against live state
+        if action == "create":
+            record = inverse["record"]
+            ok = provider.create_dns_record(
+                record["type"],
+                record["name"],
+                record["data"],
+                ttl=record.get("ttl") or 14400,
+                priority=record.get("priority")
+            )
+        else:
+            current = None
+            for record in provider.list_dns_records():
+                if (record["type"] == inverse["type"] and record["name"] == inverse["name"]
+                        and record["data"] == inverse["value"]):
+                    current = record
+                    break
+            
+            if not current:
+                raise BulkOperationError(f"{inverse['type']} {inverse['name']} not found for rollback")
+            
+            if action == "delete":
+                ok = provider.delete_dns_record(current["line"])
+            else:
+                ok = provider.update_dns_record(current["line"], **inverse["params"])
+        
+        if not ok:
+            raise BulkOperationError(f"rollback {action} {inverse.get('name', '')} rejected by {provider_name}")
+    
+    def _run_provider_batch(self, provider_name: str, updates: List[Dict],
+                            abort: threading.Event) -> Dict:
+        """Apply a batch to one provider in order, journaling inverse operations"""
+        provider = self.providers[provider_name]
+        result = {"applied": [], "journal": [], "failed": None}
+        
+        for index, update in enumerate(updates, 1):
+            if abort.is_set():
+                break
+            
+            action = update.get("action", "create")
+            label = f"{action} {update.get('type', '')} {update['name']}"
+            
+            try:
+                inverse = self._apply_bulk_operation(provider_name, provider, update)
+                if inverse:
+                    result["journal"].append(inverse)
+                result["applied"].append({"index": index, "operation": label, "changed": inverse is not None})
+                print(f"  ✅ [{provider_name}] {label}")
+            except Exception as e:
+                result["failed"] = {"index": index, "operation": label, "error": str(e)}
+                print(f"  ❌ [{provider_name}] {label}: {e}")
+                abort.set()
+                break
+        
+        return result
+    
+    def _rollback_provider(self, provider_name: str, journal: List[Dict]) -> Dict:
+        """Replay a provider's journal in reverse to restore its pre-batch state"""
+        provider = self.providers[provider_name]
+        result = {"rolled_back": 0, "errors": []}
+        id_map = {}
+        
+        for inverse in reversed(journal):
+            try:
+                self._apply_inverse_operation(provider_name, provider, inverse, id_map)
+                result["rolled_back"] += 1
+            except Exception as e:
+                result["errors"].append({"inverse": inverse, "error": str(e)})
+                print(f"  ❌ [{provider_name}] rollback failed: {e}")
+        
+        return result
+    
+    def bulk_update(self, updates_file: str, report_file: str = None) -> Dict:
+        """
+        Apply bulk DNS updates from JSON file as a single transaction
+        
+        The whole batch is validated before any change is made. Providers are
+        updated concurrently, each applying the batch in file order. Every
+        change records its inverse operation, and if any provider fails all
+        providers are rolled back to their pre-batch state.
+        
+        Args:
+            updates_file: JSON file with a list of updates
+            report_file: Where to write the machine-readable report
+                         (default: bulk_report_<timestamp>.json)
+        
+        Returns:
+            Report dictionary
+        """
         with open(updates_file, 'r') as f:
             updates = json.load(f)
         
-        print(f"📋 Applying {len(updates)} DNS updates...")
+        if not report_file:
+            report_file = f"bulk_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         
-        for provider_name, provider in self.providers.items():
-            print(f"\n🔧 Updating {provider_name}...")
+        report = {
+            "updates_file": updates_file,
+            "started_at": datetime.now().isoformat(),
+            "status": None,
+            "total_updates": len(updates) if isinstance(updates, list) else 0,
+            "validation_errors": self.validate_bulk_updates(updates),
+            "providers": {}
+        }
+        
+        if report["validation_errors"]:
+            print(f"❌ Bulk update rejected: {len(report['validation_errors'])} validation error(s)")
+            for error in report["validation_errors"]:
+                print(f"  - {error}")
+            report["status"] = "invalid"
+        elif not self.providers:
+            print("❌ No providers available")
+            report["status"] = "no_providers"
+        else:
+            print(f"📋 Applying {len(updates)} DNS updates to {', '.join(self.providers)}...")
+            
+            abort = threading.Event()
             
-            for update in updates:
-                action = update.get("action", "create")
+            with ThreadPoolExecutor(max_workers=len(self.providers)) as executor:
+                futures = {
+                    name: executor.submit(self._run_provider_batch, name, updates, abort)
+                    for name in self.providers
+                }
+                results = {name: future.result() for name, future in futures.items()}
+            
+            for name, result in results.items():
+                report["providers"][name] = {
+                    "applied": result["applied"],
+                    "failed": result["failed"],
+                    "rollback": None
+                }
+            
+            if abort.is_set():
+                print("\n⏪ Failure detected, rolling back all providers...")
                 
-                try:
-                    if action == "create":
-                        if provider_name == "cloudflare":
-                            provider.create_dns_record(
-                                update["type"],
-                                update["name"],
-                                update["value"],
-                                ttl=update.get("ttl", 1),
-                                proxied=update.get("proxied", False),
-                                priority=update.get("priority")
-                            )
-                        else:  # canspace
-                            provider.create_dns_record(
-                                update["type"],
-                                update["name"],
-                                update["value"],
-                                ttl=update.get("ttl", 14400),
-                                priority=update.get("priority")
-                            )
-                    
-                    elif action == "delete":
-                        record = provider.find_record(update["name"], update.get("type"))
-                        if record:
-                            if provider_name == "cloudflare":
-                                provider.delete_dns_record(record["id"])
-                            else:  # canspace
-                                provider.delete_dns_record(record["line"])
-                    
-                    print(f"  ✅ {action} {update.get('type', '')} {update['name']}")
-                    
-                except Exception as e:
-                    print(f"  ❌ Failed: {e}")
+                with ThreadPoolExecutor(max_workers=len(results)) as executor:
+                    futures = {
+                        name: executor.submit(self._rollback_provider, name, result["journal"])
+                        for name, result in results.items()
+                    }
+                    for name, future in futures.items():
+                        report["providers"][name]["rollback"] = future.result()
+                
+                rollback_errors = sum(
+                    len(p["rollback"]["errors"]) for p in report["providers"].values()
+                )
+                report["status"] = "rollback_failed" if rollback_errors else "rolled_back"
+            else:
+                report["status"] = "committed"
         
-        print(f"\n✅ Bulk update completed")
-
+        report["finished_at"] = datetime.now().isoformat()
+        
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        
+        if report["status"] == "committed":
+            print(f"\n✅ Bulk update committed")
+        elif report["status"] == "rolled_back":
+            print(f"\n⚠️ Bulk update rolled back, providers restored to pre-batch state")
+        elif report["status"] == "rollback_failed":
+            print(f"\n❌ Bulk update failed and rollback was incomplete, check the report")
+        
+        print(f"📄 Report saved to {report_file}")
+        
+        return report
 
 def main():
     """CLI interface for unified DNS management"""
@@ -382,10 +786,11 @@ Usage: python dns-manager.py [command] [options]
 
 Commands:
     list [provider]      - List DNS records (all providers or specific)
-    sync [source] [target] - Sync records between providers
+    sync [source] [target] [--wait] - Sync records between providers
+                           (--wait blocks until authoritative nameservers serve them)
     compare             - Compare records across providers
     template [name]     - Apply DNS template (vercel, github-pages, google-workspace, office365)
-    bulk [file]         - Apply bulk updates from JSON file
+    bulk [file] [report] - Apply bulk updates from JSON file (all-or-nothing)
     export [file]       - Export current configuration
     
 Environment Variables:
@@ -397,6 +802,7 @@ Environment Variables:
 Examples:
     python dns-manager.py list
     python dns-manager.py sync cloudflare canspace
+    python dns-manager.py sync cloudflare canspace --wait
     python dns-manager.py compare
     python dns-manager.py template vercel
     python dns-manager.py bulk updates.json
@@ -453,9 +859,10 @@ Templates:
                         print(f"  ... and {len(records) - 5} more records")
         
         elif command == "sync":
-            source = sys.argv[2] if len(sys.argv) > 2 else None
-            target = sys.argv[3] if len(sys.argv) > 3 else None
-            manager.sync_records(source, target)
+            args = [arg for arg in sys.argv[2:] if arg != "--wait"]
+            source = args[0] if len(args) > 0 else None
+            target = args[1] if len(args) > 1 else None
+            manager.sync_records(source, target, wait="--wait" in sys.argv)
         
         elif command == "compare":
             manager.compare_providers()
@@ -472,7 +879,11 @@ Templates:
                 print("Usage: python dns-manager.py bulk updates.json")
                 sys.exit(1)
             
-            manager.bulk_update(sys.argv[2])
+            report_file = sys.argv[3] if len(sys.argv) > 3 else None
+            report = manager.bulk_update(sys.argv[2], report_file)
+            
+            if report["status"] != "committed":
+                sys.exit(1)
         
         elif command == "export":
             filename = sys.argv[2] if len(sys.argv) > 2 else "dns-config.json"
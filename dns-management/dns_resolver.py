@@ -0,0 +1,698 @@
+#!/usr/bin/env python3
+"""
+Shared DNS resolver with a TTL-aware answer cache
+Used by the health monitor, backup system and FTP subdomain setup
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import dns.exception
+import dns.flags
+import dns.message
+import dns.query
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.zone
+
+# Persistence is opt-in: set DNS_RESOLVER_CACHE to a file path to share the
+# cache between processes (e.g. ~/.cache/dns-management/resolver-cache.json)
+DEFAULT_CACHE_FILE = os.environ.get("DNS_RESOLVER_CACHE") or None
+
+# Used when a negative answer carries no SOA to take the TTL from
+DEFAULT_NEGATIVE_TTL = 60
+
+
+def negative_ttl(response) -> Optional[int]:
+    """
+    Negative caching TTL of an NXDOMAIN/NODATA response (RFC 2308)
+
+    Returns:
+        The lower of the SOA record's TTL and its minimum field, or None if
+        the response carried no SOA
+    """
+    if response is None:
+        return None
+
+    for rrset in response.authority:
+        if rrset.rdtype == dns.rdatatype.SOA:
+            return min(rrset.ttl, rrset[0].minimum)
+    return None
+
+
+class CachingResolver:
+    def __init__(self, timeout: float = 3.0, cache_file: Optional[str] = DEFAULT_CACHE_FILE,
+                 bypass: bool = False, max_entries: int = 10000):
+        """
+        DNS resolver that answers repeat lookups from a TTL-respecting cache
+
+        Positive answers are kept for their TTL. NXDOMAIN is cached per name
+        and NODATA per name and type, for the negative TTL from the SOA.
+        Lookups through a specific nameserver are cached separately from the
+        system resolver. The cache is in memory unless a cache file is given
+        (or DNS_RESOLVER_CACHE is set), in which case it survives between
+        short-lived processes.
+
+        Args:
+            timeout: Per-query timeout in seconds
+            cache_file: JSON file to persist the cache in (default: DNS_RESOLVER_CACHE, or in memory only)
+            bypass: Never answer from the cache (system resolver answers are still stored)
+            max_entries: Cache size limit; soonest-expiring entries are dropped first
+        """
+        self.timeout = timeout
+        self.cache_file = cache_file or None
+        self.bypass = bypass
+        self.max_entries = max_entries
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self._resolvers = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        if self.cache_file:
+            self.load()
+            atexit.register(self.save)
+
+    def get_resolver(self, nameserver: str = None) -> dns.resolver.Resolver:
+        """
+        Get a reusable dnspython resolver for a nameserver
+
+        Args:
+            nameserver: Specific nameserver IP (None for the system resolver)
+        """
+        key = nameserver or "system"
+
+        with self._lock:
+            resolver = self._resolvers.get(key)
+
+            if resolver is None:
+                resolver = dns.resolver.Resolver()
+                if nameserver:
+                    resolver.nameservers = [nameserver]
+                resolver.timeout = self.timeout
+                resolver.lifetime = self.timeout
+                self._resolvers[key] = resolver
+
+        return resolver
+
+    @staticmethod
+    def cache_key(name: str, record_type: str, nameserver: str = None) -> str:
+        return f"{nameserver or 'system'}|{name.lower().rstrip('.')}|{record_type.upper()}"
+
+    def cached(self, name: str, record_type: str, nameserver: str = None) -> Optional[Dict]:
+        """Return an unexpired cached answer, if any"""
+        now = time.time()
+
+        with self._lock:
+            for key in [
+                self.cache_key(name, record_type, nameserver),
+                self.cache_key(name, "*", nameserver)  # NXDOMAIN covers every type
+            ]:
+                entry = self.cache.get(key)
+                if entry and entry["expires"] > now:
+                    return entry
+        return None
+
+    def store(self, name: str, record_type: str, nameserver: Optional[str], status: str,
+              values: List[str], ttl: Optional[int]):
+        """Cache an answer for ttl seconds"""
+        if not ttl or ttl <= 0:
+            return
+
+        key_type = "*" if status == "NXDOMAIN" else record_type
+        with self._lock:
+            self.cache[self.cache_key(name, key_type, nameserver)] = {
+                "status": status,
+                "values": values,
+                "ttl": ttl,
+                "expires": time.time() + ttl
+            }
+            self._dirty = True
+
+            if len(self.cache) > self.max_entries:
+                self._prune()
+
+    def _prune(self):
+        """Drop expired entries, then the soonest-expiring ones over max_entries (lock held)"""
+        now = time.time()
+        entries = {key: entry for key, entry in self.cache.items() if entry["expires"] > now}
+
+        if len(entries) > self.max_entries:
+            keep = sorted(entries, key=lambda key: entries[key]["expires"], reverse=True)[:self.max_entries]
+            entries = {key: entries[key] for key in keep}
+
+        self.cache = entries
+
+    def resolve(self, name: str, record_type: str, nameserver: str = None, bypass: bool = None) -> Dict:
+        """
+        Resolve a record, answering from the cache when possible
+
+        Args:
+            name: Record name
+            record_type: Record type (A, AAAA, CNAME, MX, TXT, ...)
+            nameserver: Query this nameserver instead of the system resolver
+            bypass: Skip the cache for this lookup (default: the resolver's setting)
+
+        Returns:
+            Dictionary with status (ok, NXDOMAIN, NoAnswer, timeout, error),
+            values (rdata text), ttl (remaining), rtt_ms and cached
+        """
+        bypass = self.bypass if bypass is None else bypass
+
+        if not bypass:
+            entry = self.cached(name, record_type, nameserver)
+            if entry:
+                self.hits += 1
+                return {
+                    "status": entry["status"],
+                    "values": list(entry["values"]),
+                    "ttl": max(0, int(entry["expires"] - time.time())),
+                    "rtt_ms": 0.0,
+                    "cached": True
+                }
+
+        self.misses += 1
+        resolver = self.get_resolver(nameserver)
+        start = time.perf_counter()
+        result = {"status": "ok", "values": [], "ttl": None, "cached": False}
+
+        try:
+            answers = resolver.resolve(name, record_type)
+            result["values"] = [rdata.to_text() for rdata in answers]
+            result["ttl"] = answers.rrset.ttl
+        except dns.resolver.NXDOMAIN as e:
+            result["status"] = "NXDOMAIN"
+            responses = list(e.responses().values())
+            ttl = negative_ttl(responses[0] if responses else None)
+            result["ttl"] = ttl if ttl is not None else DEFAULT_NEGATIVE_TTL
+        except dns.resolver.NoAnswer as e:
+            result["status"] = "NoAnswer"
+            ttl = negative_ttl(e.kwargs.get("response"))
+            result["ttl"] = ttl if ttl is not None else DEFAULT_NEGATIVE_TTL
+        except dns.exception.Timeout:
+            result["status"] = "timeout"
+            result["error"] = f"Timeout after {self.timeout}s"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+
+        result["rtt_ms"] = (time.perf_counter() - start) * 1000
+
+        # Bypassed lookups through a specific server (propagation checks) are not kept
+        if result["status"] in ["ok", "NXDOMAIN", "NoAnswer"] and not (bypass and nameserver):
+            self.store(name, record_type, nameserver, result["status"], result["values"], result["ttl"])
+
+        return result
+
+    def query(self, record_type: str, name: str, nameserver: str = None,
+              bypass: bool = None) -> Tuple[List[str], float]:
+        """
+        Resolve a record in the monitor's value format
+
+        Returns:
+            Tuple of (values, round-trip time in milliseconds). Failures are
+            reported as a single "NXDOMAIN", "NoAnswer" or "Error: ..." value.
+        """
+        result = self.resolve(name, record_type, nameserver, bypass)
+
+        if result["status"] == "ok":
+            return result["values"], result["rtt_ms"]
+        if result["status"] in ["NXDOMAIN", "NoAnswer"]:
+            return [result["status"]], result["rtt_ms"]
+        return [f"Error: {result['error']}"], result["rtt_ms"]
+
+    def load(self):
+        """Load unexpired entries from the cache file"""
+        try:
+            with open(self.cache_file, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, entry in entries.items():
+                if entry.get("expires", 0) > now:
+                    self.cache.setdefault(key, entry)
+
+    def save(self):
+        """Write unexpired entries to the cache file"""
+        if not self.cache_file or not self._dirty:
+            return
+
+        with self._lock:
+            self._prune()
+            entries = dict(self.cache)
+            self._dirty = False
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+            temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(entries, f)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            print(f"⚠️ Could not save resolver cache: {e}")
+
+    def clear(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self.cache = {}
+            self._dirty = True
+
+    def stats(self) -> Dict:
+        """Cache size and hit counts"""
+        return {
+            "entries": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "cache_file": self.cache_file
+        }
+
+
+def normalize_value(record_type: str, value: str) -> str:
+    """
+    Normalize a record value for comparison across providers and DNS answers
+
+    Lowercases names and drops trailing dots, joins quoted TXT strings and
+    reduces MX values to the exchange (providers keep the priority separately).
+    """
+    value = str(value).strip()
+
+    if record_type == "TXT":
+        parts = re.findall(r'"((?:[^"\\]|\\.)*)"', value)
+        return "".join(parts) if parts else value
+    if record_type == "MX":
+        value = value.split()[-1]
+
+    return value.lower().rstrip(".")
+
+
+def fqdn(name: str, zone: str) -> str:
+    """Expand a record name ("@", "www", "www.example.com.") to a fully qualified name"""
+    name = name.rstrip(".").lower()
+    zone = zone.rstrip(".").lower()
+
+    if name in ["@", ""]:
+        return zone
+    if name == zone or name.endswith(f".{zone}"):
+        return name
+    return f"{name}.{zone}"
+
+
+# Types whose served values can be compared with provider values
+PROPAGATION_RECORD_TYPES = ["A", "AAAA", "CNAME", "MX", "TXT"]
+
+
+def propagation_checks(records: List[Dict]) -> List[Tuple[str, str, str]]:
+    """
+    Turn provider or backup records into (record_type, name, value) checks
+
+    Proxied Cloudflare records are skipped: they are served as Cloudflare
+    addresses, not their configured value.
+    """
+    checks = []
+    for record in records:
+        value = record.get("value", record.get("content", record.get("data")))
+        if record.get("type") in PROPAGATION_RECORD_TYPES and value and not record.get("proxied"):
+            check = (record["type"], record["name"], value)
+            if check not in checks:
+                checks.append(check)
+    return checks
+
+
+class AuthoritativeChecker:
+    def __init__(self, resolver: CachingResolver = None, timeout: float = 3.0, max_workers: int = 16):
+        """
+        Query a zone's authoritative nameservers directly
+
+        Recursive resolvers only show what they have cached. Asking every
+        authoritative server (without recursion, UDP with TCP fallback)
+        shows what is actually being served, so a change can be confirmed
+        seconds after it is written.
+
+        Args:
+            resolver: Resolver used to discover zones and nameserver addresses
+            timeout: Per-query timeout in seconds
+            max_workers: Concurrent queries
+        """
+        self.resolver = resolver or CachingResolver(timeout=timeout)
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+    def find_zone(self, name: str) -> str:
+        """
+        Find the zone apex a name belongs to (the closest enclosing SOA)
+
+        Raises:
+            Exception: If no enclosing zone is found
+        """
+        labels = name.rstrip(".").lower().split(".")
+
+        for index in range(len(labels) - 1):
+            candidate = ".".join(labels[index:])
+            if self.resolver.resolve(candidate, "SOA")["status"] == "ok":
+                return candidate
+
+        raise Exception(f"No zone found for {name}")
+
+    def nameservers(self, zone: str) -> Dict[str, str]:
+        """
+        Discover a zone's authoritative nameservers
+
+        Returns:
+            Dictionary of nameserver hostname to IPv4 address
+
+        Raises:
+            Exception: If the zone has no resolvable nameservers
+        """
+        answer = self.resolver.resolve(zone, "NS")
+        if answer["status"] != "ok":
+            raise Exception(f"No NS records for {zone}: {answer.get('error', answer['status'])}")
+
+        servers = {}
+        for host in sorted(value.rstrip(".").lower() for value in answer["values"]):
+            addresses = self.resolver.resolve(host, "A")
+            if addresses["status"] == "ok" and addresses["values"]:
+                servers[host] = addresses["values"][0]
+
+        if not servers:
+            raise Exception(f"Could not resolve any nameserver for {zone}")
+
+        return servers
+
+    def query(self, name: str, record_type: str, server: str) -> Dict:
+        """
+        Ask one authoritative server for a record, without recursion
+
+        Uses UDP and retries over TCP when the answer is truncated or UDP
+        times out.
+
+        Args:
+            name: Record name
+            record_type: Record type
+            server: Nameserver IP address
+
+        Returns:
+            Dictionary with status (ok, NXDOMAIN, NoAnswer, error), values,
+            ttl, every answer RRset (including CNAME chains), authoritative
+            flag, transport and rtt_ms
+        """
+        request = dns.message.make_query(name, record_type)
+        request.flags &= ~dns.flags.RD
+
+        start = time.perf_counter()
+        transport = "udp"
+
+        try:
+            try:
+                response = dns.query.udp(request, server, timeout=self.timeout)
+                if response.flags & dns.flags.TC:
+                    transport = "tcp"
+                    response = dns.query.tcp(request, server, timeout=self.timeout)
+            except dns.exception.Timeout:
+                transport = "tcp"
+                response = dns.query.tcp(request, server, timeout=self.timeout)
+        except Exception as e:
+            return {
+                "status": "error",
+                "values": [],
+                "error": str(e) or type(e).__name__,
+                "transport": transport,
+                "rtt_ms": (time.perf_counter() - start) * 1000
+            }
+
+        rdtype = dns.rdatatype.from_text(record_type)
+        matching = [rrset for rrset in response.answer if rrset.rdtype == rdtype]
+        values = [rdata.to_text() for rrset in matching for rdata in rrset]
+
+        if response.rcode() == dns.rcode.NXDOMAIN:
+            status = "NXDOMAIN"
+        elif response.rcode() != dns.rcode.NOERROR:
+            status = "error"
+        elif not values:
+            status = "NoAnswer"
+        else:
+            status = "ok"
+
+        result = {
+            "status": status,
+            "values": values,
+            "ttl": min(rrset.ttl for rrset in matching) if matching else None,
+            "rrsets": [
+                {
+                    "name": rrset.name.to_text().rstrip("."),
+                    "type": dns.rdatatype.to_text(rrset.rdtype),
+                    "ttl": rrset.ttl,
+                    "values": [rdata.to_text() for rdata in rrset]
+                }
+                for rrset in response.answer
+            ],
+            "authoritative": bool(response.flags & dns.flags.AA),
+            "transport": transport,
+            "rtt_ms": (time.perf_counter() - start) * 1000
+        }
+        if status == "error":
+            result["error"] = dns.rcode.to_text(response.rcode())
+
+        return result
+
+    def query_all(self, queries: List[Tuple[str, str]], servers: Dict[str, str]) -> Dict[Tuple[str, str, str], Dict]:
+        """
+        Run (name, record_type) queries against every server concurrently
+
+        Returns:
+            Dictionary keyed by (nameserver, name, record_type)
+        """
+        jobs = [(host, ip, name, record_type) for host, ip in servers.items() for name, record_type in queries]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs) or 1)) as executor:
+            answers = list(executor.map(lambda job: self.query(job[2], job[3], job[1]), jobs))
+
+        return {(host, name, record_type): answer for (host, _, name, record_type), answer in zip(jobs, answers)}
+
+    def snapshot(self, names: List[str], record_types: List[str], servers: Dict[str, str]) -> Dict:
+        """
+        Capture full RRsets for names x types, with their original TTLs
+
+        Every query goes to the first server at once; queries that fail are
+        retried on the next server. Answers are deduplicated by RRset, so
+        CNAME chains inside the zone are captured once.
+
+        Args:
+            names: Fully qualified record names
+            record_types: Record types to capture for every name
+            servers: Authoritative nameserver hostname to IP
+
+        Returns:
+            Dictionary with records ({"type", "name", "value", "ttl"}) and
+            errors (queries no server answered)
+        """
+        pending = [(name, record_type) for name in names for record_type in record_types]
+        answers = {}
+
+        for host, ip in servers.items():
+            if not pending:
+                break
+
+            results = self.query_all(pending, {host: ip})
+            for name, record_type in pending:
+                answer = results[(host, name, record_type)]
+                if answer["status"] != "error":
+                    answers[(name, record_type)] = answer
+            pending = [query for query in pending if query not in answers]
+
+        records = []
+        seen = set()
+        for answer in answers.values():
+            for rrset in answer["rrsets"]:
+                for value in rrset["values"]:
+                    key = (rrset["type"], rrset["name"], value)
+                    if key not in seen:
+                        seen.add(key)
+                        records.append({"type": rrset["type"], "name": rrset["name"], "value": value, "ttl": rrset["ttl"]})
+
+        return {
+            "records": records,
+            "errors": [f"{record_type} {name}" for name, record_type in pending]
+        }
+
+    def transfer(self, zone: str, servers: Dict[str, str] = None) -> Dict:
+        """
+        Fetch the whole zone by AXFR from the first server that allows it
+
+        Args:
+            zone: Zone apex
+            servers: Nameserver hostname to IP (discovered if not given)
+
+        Returns:
+            Dictionary with server, serial and records ({"type", "name", "value", "ttl"});
+            the SOA and apex NS records are left out
+
+        Raises:
+            Exception: If every server refuses the transfer
+        """
+        servers = servers or self.nameservers(zone)
+        errors = []
+
+        for host, ip in servers.items():
+            try:
+                transferred = dns.zone.from_xfr(dns.query.xfr(ip, zone, timeout=self.timeout, lifetime=self.timeout * 10))
+            except Exception as e:
+                errors.append(f"{host}: {str(e) or type(e).__name__}")
+                continue
+
+            records = []
+            serial = None
+            for name, rdataset in transferred.iterate_rdatasets():
+                record_name = name.derelativize(transferred.origin).to_text().rstrip(".")
+                record_type = dns.rdatatype.to_text(rdataset.rdtype)
+
+                if record_type == "SOA":
+                    serial = rdataset[0].serial
+                    continue
+                if record_type == "NS" and record_name == zone:
+                    continue
+
+                for rdata in rdataset:
+                    records.append({
+                        "type": record_type,
+                        "name": record_name,
+                        "value": rdata.to_text(origin=transferred.origin, relativize=False),
+                        "ttl": rdataset.ttl
+                    })
+
+            return {"server": host, "serial": serial, "records": records}
+
+        raise Exception(f"Zone transfer refused for {zone} ({'; '.join(errors)})")
+
+    def soa_serials(self, zone: str, servers: Dict[str, str] = None) -> Dict[str, Dict]:
+        """
+        Get the SOA serial each authoritative server is serving
+
+        Returns:
+            Dictionary of nameserver to {serial, rtt_ms, transport} or {error}
+        """
+        servers = servers or self.nameservers(zone)
+        answers = self.query_all([(zone, "SOA")], servers)
+        serials = {}
+
+        for host in servers:
+            answer = answers[(host, zone, "SOA")]
+            if answer["status"] == "ok":
+                serials[host] = {
+                    "serial": int(answer["values"][0].split()[2]),
+                    "rtt_ms": round(answer["rtt_ms"], 2),
+                    "transport": answer["transport"]
+                }
+            else:
+                serials[host] = {"error": answer.get("error", answer["status"])}
+
+        return serials
+
+    def check(self, records: List[Tuple[str, str, Optional[str]]], zone: str = None,
+              servers: Dict[str, str] = None) -> Dict:
+        """
+        Check records on every authoritative server
+
+        Args:
+            records: (record_type, name, expected value) tuples; an expected
+                     value of None means the record should be absent
+            zone: Zone apex (discovered from the first record if not given)
+            servers: Nameserver hostname to IP (discovered if not given)
+
+        Returns:
+            Dictionary with zone, per-record per-server results, SOA serials,
+            serials_in_sync and propagated (every record matches everywhere)
+        """
+        zone = zone or self.find_zone(records[0][1])
+        servers = servers or self.nameservers(zone)
+
+        queries = sorted({(fqdn(name, zone), record_type) for record_type, name, _ in records} | {(zone, "SOA")})
+        answers = self.query_all(queries, servers)
+
+        results = {}
+        propagated = True
+
+        for record_type, name, expected in records:
+            name = fqdn(name, zone)
+            key = f"{record_type} {name}" + (f" {expected}" if expected is not None else " (absent)")
+            results[key] = {}
+
+            for host in servers:
+                answer = answers[(host, name, record_type)]
+                served = [normalize_value(record_type, value) for value in answer["values"]]
+
+                if answer["status"] == "error":
+                    match = False
+                elif expected is None:
+                    match = not served
+                else:
+                    match = normalize_value(record_type, expected) in served
+
+                propagated = propagated and match
+                results[key][host] = {
+                    "status": answer["status"],
+                    "values": answer["values"],
+                    "match": match,
+                    "rtt_ms": round(answer["rtt_ms"], 2)
+                }
+
+        serials = {}
+        for host in servers:
+            answer = answers[(host, zone, "SOA")]
+            serials[host] = int(answer["values"][0].split()[2]) if answer["status"] == "ok" else None
+
+        return {
+            "zone": zone,
+            "nameservers": servers,
+            "records": results,
+            "serials": serials,
+            "serials_in_sync": len(set(serials.values())) == 1 and None not in serials.values(),
+            "propagated": propagated
+        }
+
+    def wait_for_propagation(self, records: List[Tuple[str, str, Optional[str]]], timeout: float = 300,
+                             interval: float = 2.0, zone: str = None) -> Dict:
+        """
+        Block until every authoritative server serves the given records
+
+        Args:
+            records: (record_type, name, expected value) tuples; None expects absence
+            timeout: Seconds to wait before giving up
+            interval: Seconds between polls
+            zone: Zone apex (discovered if not given)
+
+        Returns:
+            The last check() result plus elapsed_s, polls and pending (records
+            not yet served everywhere)
+        """
+        start = time.monotonic()
+        zone = zone or self.find_zone(records[0][1])
+        servers = self.nameservers(zone)
+        polls = 0
+
+        while True:
+            polls += 1
+            result = self.check(records, zone, servers)
+
+            if result["propagated"] or time.monotonic() - start + interval > timeout:
+                break
+            time.sleep(interval)
+
+        result["elapsed_s"] = round(time.monotonic() - start, 2)
+        result["polls"] = polls
+        result["pending"] = [
+            key for key, per_server in result["records"].items()
+            if not all(status["match"] for status in per_server.values())
+        ]
+
+        return result
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Load test for the health API
+Drives concurrent keep-alive clients and reports throughput and tail latency
+"""
+
+import http.client
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+from health_history import percentile
+
+
+def load_health_api():
+    """Import api/health.py as a module"""
+    spec = importlib.util.spec_from_file_location(
+        "health_api",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "api", "health.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_local_server(results_file: str = "health_check_latest.json") -> str:
+    """
+    Start the health API in a background thread with a primed cache
+
+    Args:
+        results_file: Saved health check results used to prime the cache
+
+    Returns:
+        Base URL of the server
+    """
+    health_api = load_health_api()
+
+    if os.path.exists(results_file):
+        with open(results_file, "r") as f:
+            health_api.cache.store(json.load(f), [])
+    else:
+        print(f"⚠️  {results_file} not found, the cache will run a live check")
+
+    server = health_api.create_server(0, "127.0.0.1")
+    threading.Thread(target=health_api.serve, kwargs={"server": server}, name="health-api", daemon=True).start()
+
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def run_client(url: str, deadline: float, latencies: List[float], errors: Dict, keep_alive: bool):
+    """Send requests until the deadline, recording latencies in milliseconds"""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    connection = None
+
+    while time.perf_counter() < deadline:
+        if connection is None:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path, headers={} if keep_alive else {"Connection": "close"})
+            response = connection.getresponse()
+            response.read()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            if response.status >= 400:
+                errors[f"HTTP {response.status}"] = errors.get(f"HTTP {response.status}", 0) + 1
+            if not keep_alive or response.will_close:
+                connection.close()
+                connection = None
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            connection.close()
+            connection = None
+
+    if connection:
+        connection.close()
+
+
+def benchmark(url: str, concurrency: int = 50, duration: float = 10.0, keep_alive: bool = True) -> Dict:
+    """
+    Run the load test
+
+    Args:
+        url: URL to request
+        concurrency: Number of concurrent clients
+        duration: Seconds to run
+        keep_alive: Reuse connections between requests
+
+    Returns:
+        Throughput and latency summary
+    """
+    per_client = [[] for _ in range(concurrency)]
+    errors = {}
+    deadline = time.perf_counter() + duration
+
+    threads = [
+        threading.Thread(target=run_client, args=(url, deadline, per_client[i], errors, keep_alive))
+        for i in range(concurrency)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for client in per_client for latency in client)
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "keep_alive": keep_alive,
+        "duration_s": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2)
+        } if latencies else {}
+    }
+
+
+def main():
+    """CLI entry point"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+
+    if "--help" in flags:
+        print("Usage: health-api-bench.py [concurrency] [duration] [url] [--no-keepalive] [--json]")
+        print("\nWithout a URL, starts the health API locally with a cache primed")
+        print("from health_check_latest.json and benchmarks /health, /health/dns and /metrics")
+        sys.exit(0)
+
+    concurrency = int(args[0]) if len(args) > 0 else 50
+    duration = float(args[1]) if len(args) > 1 else 10.0
+    keep_alive = "--no-keepalive" not in flags
+
+    if len(args) > 2:
+        urls = [args[2]]
+    else:
+        base = start_local_server()
+        urls = [f"{base}/health", f"{base}/health/dns", f"{base}/metrics"]
+
+    reports = []
+    for url in urls:
+        report = benchmark(url, concurrency, duration, keep_alive)
+        reports.append(report)
+
+        if "--json" in flags:
+            continue
+
+        print(f"\n🚀 {url}")
+        print(f"   Clients: {concurrency}  Keep-alive: {'yes' if keep_alive else 'no'}  Duration: {report['duration_s']}s")
+        print(f"   Requests: {report['requests']}  Throughput: {report['requests_per_second']} req/s")
+        if report["latency_ms"]:
+            latency = report["latency_ms"]
+            print(f"   Latency: p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  max {latency['max']}ms")
+        if report["errors"]:
+            print(f"   ❌ Errors: {report['errors']}")
+
+    if "--json" in flags:
+        print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
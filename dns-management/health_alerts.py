@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Alert pipeline for the DNS health monitor
+Deduplicates, suppresses and batches issues, then delivers digests to
+pluggable sinks (file, SMTP, webhook) from a background worker thread
+"""
+
+import hashlib
+import queue
+import smtplib
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List
+
+import requests
+
+EVENT_LABELS = {
+    "firing": "🔥 Firing",
+    "repeat": "⏰ Still firing",
+    "flapping": "🔁 Flapping (notifications paused)",
+    "resolved": "✅ Resolved"
+}
+
+
+def alert_fingerprint(domain: str, issue: str) -> str:
+    """Stable identifier for an issue on a domain"""
+    return hashlib.sha1(f"{domain}|{issue}".encode()).hexdigest()[:16]
+
+
+def format_digest(digest: Dict) -> str:
+    """Render a digest as plain text"""
+    lines = [
+        f"DNS Health Alert for {digest['domain']}",
+        f"Time: {digest['generated_at']}",
+        ""
+    ]
+
+    for state, label in EVENT_LABELS.items():
+        events = [event for event in digest["events"] if event["state"] == state]
+        if not events:
+            continue
+
+        lines.append(f"{label}:")
+        for event in events:
+            changes = f", {event['count']} events" if event.get("count", 1) > 1 else ""
+            lines.append(f"- {event['issue']} (since {event['since']}{changes})")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def digest_subject(digest: Dict) -> str:
+    """One-line summary of a digest"""
+    counts = {}
+    for event in digest["events"]:
+        counts[event["state"]] = counts.get(event["state"], 0) + 1
+
+    summary = ", ".join(f"{count} {state}" for state, count in counts.items())
+    return f"[DNS] {digest['domain']}: {summary}"
+
+
+class FileSink:
+    name = "file"
+
+    def __init__(self, path: str = "dns_alerts.log"):
+        """
+        Append digests to a log file
+
+        Args:
+            path: Log file path
+        """
+        self.path = path
+
+    def send(self, digest: Dict):
+        with open(self.path, 'a') as f:
+            f.write(f"\n{digest['generated_at']}: {digest_subject(digest)}\n")
+            for event in digest["events"]:
+                f.write(f"  [{event['state']}] {event['issue']}\n")
+
+
+class SMTPSink:
+    name = "smtp"
+
+    def __init__(self, to: List[str], host: str = "localhost", port: int = 25, sender: str = None,
+                 username: str = None, password: str = None, starttls: bool = False, timeout: float = 10.0):
+        """
+        Email digests over SMTP
+
+        Args:
+            to: Recipient addresses
+            host: SMTP server
+            port: SMTP port
+            sender: From address (default: dns-monitor@<host>)
+            username: Login user, if the server requires authentication
+            password: Login password
+            starttls: Upgrade the connection with STARTTLS
+            timeout: Connection timeout in seconds
+        """
+        self.to = to
+        self.host = host
+        self.port = port
+        self.sender = sender or f"dns-monitor@{host}"
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, digest: Dict):
+        message = MIMEMultipart()
+        message["Subject"] = digest_subject(digest)
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.to)
+        message.attach(MIMEText(format_digest(digest), "plain"))
+
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.sendmail(self.sender, self.to, message.as_string())
+
+
+class WebhookSink:
+    name = "webhook"
+
+    def __init__(self, url: str, format: str = "json", timeout: float = 10.0):
+        """
+        POST digests to a webhook
+
+        Args:
+            url: Webhook URL
+            format: "json" posts the digest, "text" posts {"text": ...} (Slack-compatible)
+            timeout: Request timeout in seconds
+        """
+        self.url = url
+        self.format = format
+        self.timeout = timeout
+
+    def send(self, digest: Dict):
+        payload = digest if self.format == "json" else {"text": format_digest(digest)}
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+SINKS = {
+    "file": FileSink,
+    "smtp": SMTPSink,
+    "webhook": WebhookSink
+}
+
+
+def create_sinks(configs: List[Dict]) -> List:
+    """
+    Build sinks from configuration entries like {"type": "webhook", "url": ...}
+
+    Raises:
+        ValueError: If a sink type is unknown
+    """
+    sinks = []
+    for config in configs:
+        options = dict(config)
+        sink_type = options.pop("type")
+        if sink_type not in SINKS:
+            raise ValueError(f"Unknown alert sink: {sink_type}")
+        sinks.append(SINKS[sink_type](**options))
+    return sinks
+
+
+class AlertManager:
+    def __init__(self, domain: str, sinks: List, suppress_window: float = 3600, flap_window: float = 1800,
+                 flap_threshold: int = 4, batch_window: float = 60, retries: int = 2):
+        """
+        Turn per-run issue lists into deduplicated alert digests
+
+        Each issue is fingerprinted. A new issue fires once and is repeated
+        only after suppress_window while it persists; its disappearance sends
+        a resolved notice. An issue that changes state flap_threshold times
+        within flap_window is reported once as flapping and then stays quiet
+        until it has been stable for a full flap_window. Events are collected
+        for batch_window seconds and delivered as one digest per batch on a
+        worker thread, so sinks never block the checks.
+
+        Args:
+            domain: Domain the issues belong to
+            sinks: Objects with a send(digest) method
+            suppress_window: Seconds between repeats of a persisting issue
+            flap_window: Seconds over which state changes are counted
+            flap_threshold: State changes within flap_window that mark an issue as flapping
+            batch_window: Seconds to collect events into one digest
+            retries: Delivery retries per sink
+        """
+        self.domain = domain
+        self.sinks = sinks
+        self.suppress_window = suppress_window
+        self.flap_window = flap_window
+        self.flap_threshold = flap_threshold
+        self.batch_window = batch_window
+        self.retries = retries
+        self.states = {}
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._deliver_loop, name="alert-worker", daemon=True)
+        self.worker.start()
+
+    def process(self, issues: List[str], now: float = None) -> List[Dict]:
+        """
+        Feed the issues of one check run into the pipeline
+
+        Call this after every run, including runs without issues, so that
+        resolutions are noticed.
+
+        Args:
+            issues: Issues found by the run
+            now: Monotonic time of the run
+
+        Returns:
+            Events queued for delivery
+        """
+        now = time.monotonic() if now is None else now
+        current = {alert_fingerprint(self.domain, issue): issue for issue in issues}
+        events = []
+
+        for fingerprint in set(current) | set(self.states):
+            active = fingerprint in current
+            state = self.states.get(fingerprint)
+
+            if state is None:
+                state = self.states[fingerprint] = {
+                    "issue": current[fingerprint],
+                    "active": False,
+                    "since": datetime.now().isoformat(timespec="seconds"),
+                    "last_notified": None,
+                    "transitions": deque(),
+                    "flapping": False
+                }
+
+            changed = active != state["active"]
+            if changed:
+                state["active"] = active
+                state["since"] = datetime.now().isoformat(timespec="seconds")
+                state["transitions"].append(now)
+
+            while state["transitions"] and now - state["transitions"][0] > self.flap_window:
+                state["transitions"].popleft()
+
+            event_state = None
+            if state["flapping"]:
+                if not state["transitions"]:
+                    # Stable for a full window: report where it settled
+                    state["flapping"] = False
+                    event_state = "firing" if active else "resolved"
+            elif len(state["transitions"]) >= self.flap_threshold:
+                state["flapping"] = True
+                event_state = "flapping"
+            elif changed:
+                event_state = "firing" if active else "resolved"
+            elif active and now - state["last_notified"] >= self.suppress_window:
+                event_state = "repeat"
+
+            if event_state:
+                state["last_notified"] = now
+                events.append({
+                    "fingerprint": fingerprint,
+                    "issue": state["issue"],
+                    "state": event_state,
+                    "since": state["since"]
+                })
+
+            if not state["active"] and not state["flapping"] and not state["transitions"]:
+                del self.states[fingerprint]
+
+        for event in events:
+            self.queue.put(event)
+
+        return events
+
+    def _deliver_loop(self):
+        """Collect queued events into digests and deliver them"""
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+
+            batch = [event]
+            deadline = time.monotonic() + self.batch_window
+            stopping = False
+
+            while not stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is None:
+                    stopping = True
+                else:
+                    batch.append(event)
+
+            # One entry per issue, in its latest state
+            coalesced = {}
+            for event in batch:
+                count = coalesced[event["fingerprint"]]["count"] + 1 if event["fingerprint"] in coalesced else 1
+                coalesced.pop(event["fingerprint"], None)
+                coalesced[event["fingerprint"]] = {**event, "count": count}
+
+            self.deliver({
+                "domain": self.domain,
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "events": list(coalesced.values())
+            })
+
+            if stopping:
+                return
+
+    def deliver(self, digest: Dict):
+        """Send a digest to every sink, retrying failed sinks"""
+        for sink in self.sinks:
+            for attempt in range(self.retries + 1):
+                try:
+                    sink.send(digest)
+                    break
+                except Exception as e:
+                    if attempt == self.retries:
+                        print(f"❌ Alert delivery via {sink.name} failed: {e}")
+                    else:
+                        time.sleep(2 ** attempt)
+
+    def close(self, timeout: float = 30):
+        """Flush pending events and stop the worker"""
+        self.queue.put(None)
+        self.worker.join(timeout)
+
+    def status(self) -> Dict[str, Dict]:
+        """Tracked issues and their alert state"""
+        return {
+            fingerprint: {
+                "issue": state["issue"],
+                "active": state["active"],
+                "since": state["since"],
+                "flapping": state["flapping"],
+                "transitions": len(state["transitions"])
+            }
+            for fingerprint, state in self.states.items()
+        }
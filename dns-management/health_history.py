@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Health check history store for leo.pvthostel.com
+Append-only SQLite time series with hourly downsampling and retention
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds (ms or days) of the histogram buckets kept in hourly rollups
+HISTOGRAM_BOUNDS = [1, 2, 3, 5, 7, 10, 15, 20, 30, 50, 70, 100, 150, 200, 300, 500, 700,
+                    1000, 1500, 2000, 3000, 5000, 7000, 10000, 30000]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ts INTEGER NOT NULL,
+    check_name TEXT NOT NULL,
+    target TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS idx_samples_check_ts ON samples (check_name, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    bucket INTEGER NOT NULL,
+    check_name TEXT NOT NULL,
+    target TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    ok_count INTEGER NOT NULL,
+    value_count INTEGER NOT NULL,
+    value_sum REAL,
+    value_min REAL,
+    value_max REAL,
+    histogram TEXT,
+    PRIMARY KEY (check_name, bucket, target)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def histogram_bucket(value: float) -> int:
+    """Index of the histogram bucket a value falls into"""
+    for index, bound in enumerate(HISTOGRAM_BOUNDS):
+        if value <= bound:
+            return index
+    return len(HISTOGRAM_BOUNDS)
+
+
+def histogram_percentile(histogram: List[int], pct: float) -> Optional[float]:
+    """Approximate a percentile from bucket counts (upper bound of the bucket)"""
+    total = sum(histogram)
+    if not total:
+        return None
+
+    threshold = total * pct / 100
+    cumulative = 0
+
+    for index, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= threshold:
+            return float(HISTOGRAM_BOUNDS[min(index, len(HISTOGRAM_BOUNDS) - 1)])
+
+    return float(HISTOGRAM_BOUNDS[-1])
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Percentile of raw values using linear interpolation"""
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def flatten_results(results: Dict) -> List[Tuple[str, str, bool, Optional[float]]]:
+    """
+    Flatten a health check result document into (check, target, ok, value) rows
+
+    Values are latencies in milliseconds, except cert_days (days to expiry).
+    """
+    checks = results.get("checks", {})
+    rows = []
+
+    if "a_records" in checks:
+        rows.append(("dns", "A", checks["a_records"]["status"] == "✅", None))
+    if "www_cname" in checks:
+        rows.append(("dns", "CNAME www", checks["www_cname"]["status"] == "✅", None))
+
+    for ns, status in checks.get("propagation", {}).items():
+        rows.append(("propagation", ns, status["match"], status.get("rtt_ms")))
+
+    ssl_hosts = checks.get("ssl_hosts") or ({checks["ssl"]["hostname"]: checks["ssl"]} if "ssl" in checks else {})
+    for hostname, status in ssl_hosts.items():
+        ok = status["status"].startswith("✅")
+        rows.append(("ssl", hostname, ok, status.get("handshake_ms")))
+        if status.get("days_remaining") is not None:
+            rows.append(("cert_days", hostname, ok, float(status["days_remaining"])))
+
+    if "http" in checks:
+        http = checks["http"]
+        response_time = http.get("response_time")
+        rows.append((
+            "http",
+            http.get("final_url") or http.get("url") or results.get("domain", ""),
+            http.get("status_code") == 200,
+            response_time * 1000 if response_time is not None else None
+        ))
+
+    probe = checks.get("http_probe")
+    if probe and probe.get("phases"):
+        for phase in ["ttfb_ms", "total_ms"]:
+            if probe["phases"].get(phase):
+                rows.append((f"http_{phase[:-3]}", probe["url"], probe["status"] == "✅", probe["phases"][phase]["p50"]))
+
+    mail = checks.get("mail")
+    if mail:
+        rows.append(("mail", "mx", bool(mail.get("mx")) and mail["mx"][0] not in ["NXDOMAIN", "NoAnswer"], None))
+        rows.append(("mail", "spf", bool(mail.get("spf")), None))
+        rows.append(("mail", "dmarc", bool(mail.get("dmarc")), None))
+        rows.append(("mail", "dkim", bool(mail.get("dkim")), None))
+
+    for expected in checks.get("expected_records", []):
+        rows.append(("expected", f"{expected['type']} {expected['name']}", expected["match"], None))
+
+    errors = results.get("check_errors", {})
+    for check, duration in results.get("check_durations_ms", {}).items():
+        rows.append(("check_duration", check, check not in errors, duration))
+
+    return rows
+
+
+class HealthHistoryStore:
+    def __init__(self, path: str = "health_history.db", raw_retention_days: int = 7,
+                 rollup_retention_days: int = 365):
+        """
+        Initialize the health history store
+
+        Raw samples are kept for raw_retention_days, then folded into hourly
+        rollups (count, success count, min/max/sum and a latency histogram)
+        that are kept for rollup_retention_days.
+
+        Args:
+            path: SQLite database file
+            raw_retention_days: Days of raw samples to keep
+            rollup_retention_days: Days of hourly rollups to keep
+        """
+        self.path = path
+        self.raw_retention = raw_retention_days * 86400
+        self.rollup_retention = rollup_retention_days * 86400
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self.conn.close()
+
+    def _get_meta(self, key: str, default: int = 0) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value: int):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def record(self, results: Dict) -> int:
+        """
+        Append one health check result
+
+        Args:
+            results: Result document from DNSHealthMonitor
+
+        Returns:
+            Number of rows written
+        """
+        try:
+            ts = int(datetime.fromisoformat(results["timestamp"]).timestamp())
+        except (KeyError, ValueError):
+            ts = int(time.time())
+
+        rows = [
+            (ts, check, target, 1 if ok else 0, value)
+            for check, target, ok, value in flatten_results(results)
+        ]
+
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO samples (ts, check_name, target, ok, value) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+        return len(rows)
+
+    def maintain(self, now: float = None) -> Dict:
+        """
+        Downsample completed hours and apply retention
+
+        Returns:
+            Counts of rolled-up buckets and deleted rows
+        """
+        now = int(now or time.time())
+        current_hour = now - now % 3600
+        raw_cutoff = (now - self.raw_retention) - (now - self.raw_retention) % 3600
+
+        with self._lock, self.conn:
+            rolled_until = self._get_meta("rolled_up_until")
+
+            rows = self.conn.execute(
+                "SELECT ts - ts % 3600, check_name, target, ok, value FROM samples "
+                "WHERE ts >= ? AND ts < ?",
+                (rolled_until, current_hour)
+            ).fetchall()
+
+            buckets = {}
+            for bucket, check, target, ok, value in rows:
+                entry = buckets.setdefault((bucket, check, target), {
+                    "count": 0, "ok": 0, "values": 0, "sum": 0.0, "min": None, "max": None,
+                    "histogram": [0] * (len(HISTOGRAM_BOUNDS) + 1)
+                })
+                entry["count"] += 1
+                entry["ok"] += ok
+                if value is not None:
+                    entry["values"] += 1
+                    entry["sum"] += value
+                    entry["min"] = value if entry["min"] is None else min(entry["min"], value)
+                    entry["max"] = value if entry["max"] is None else max(entry["max"], value)
+                    entry["histogram"][histogram_bucket(value)] += 1
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rollups (bucket, check_name, target, count, ok_count, value_count, "
+                "value_sum, value_min, value_max, histogram) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (bucket, check, target, e["count"], e["ok"], e["values"], e["sum"], e["min"], e["max"],
+                     json.dumps(e["histogram"]))
+                    for (bucket, check, target), e in buckets.items()
+                ]
+            )
+            self._set_meta("rolled_up_until", max(rolled_until, current_hour))
+
+            deleted_raw = self.conn.execute(
+                "DELETE FROM samples WHERE ts < ?", (min(raw_cutoff, current_hour),)
+            ).rowcount
+            self._set_meta("raw_pruned_before", max(self._get_meta("raw_pruned_before"), min(raw_cutoff, current_hour)))
+
+            deleted_rollups = self.conn.execute(
+                "DELETE FROM rollups WHERE bucket < ?", (now - self.rollup_retention,)
+            ).rowcount
+
+        return {
+            "rolled_up_buckets": len(buckets),
+            "deleted_samples": deleted_raw,
+            "deleted_rollups": deleted_rollups
+        }
+
+    def _hourly(self, check: str, since: int, target: str = None) -> Dict[int, Dict]:
+        """
+        Collect per-hour data for a check, from raw samples where they still
+        exist and from rollups for older hours
+        """
+        boundary = self._get_meta("raw_pruned_before")
+        hours = {}
+        target_clause = " AND target = ?" if target else ""
+        params = (check, max(since, boundary)) + ((target,) if target else ())
+
+        for bucket, ok, value in self.conn.execute(
+            "SELECT ts - ts % 3600, ok, value FROM samples WHERE check_name = ? AND ts >= ?" + target_clause,
+            params
+        ):
+            hour = hours.setdefault(bucket, {"count": 0, "ok": 0, "values": [], "histogram": None})
+            hour["count"] += 1
+            hour["ok"] += ok
+            if value is not None:
+                hour["values"].append(value)
+
+        if since < boundary:
+            params = (check, since - since % 3600, boundary) + ((target,) if target else ())
+
+            for bucket, count, ok_count, histogram in self.conn.execute(
+                "SELECT bucket, count, ok_count, histogram FROM rollups "
+                "WHERE check_name = ? AND bucket >= ? AND bucket < ?" + target_clause,
+                params
+            ):
+                hour = hours.setdefault(bucket, {"count": 0, "ok": 0, "values": [],
+                                                 "histogram": [0] * (len(HISTOGRAM_BOUNDS) + 1)})
+                hour["count"] += count
+                hour["ok"] += ok_count
+                if hour["histogram"] is None:
+                    hour["histogram"] = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+                for index, bucket_count in enumerate(json.loads(histogram)):
+                    hour["histogram"][index] += bucket_count
+
+        return hours
+
+    def success_rate(self, check: str, days: float = 7, target: str = None) -> Optional[float]:
+        """
+        Fraction of successful samples for a check
+
+        Args:
+            check: Check name (e.g. propagation, http, ssl)
+            days: Look-back window in days
+            target: Restrict to one target (resolver, hostname, ...)
+
+        Returns:
+            Success rate between 0 and 1, or None without data
+        """
+        since = int(time.time() - days * 86400)
+
+        with self._lock:
+            hours = self._hourly(check, since, target)
+
+        total = sum(hour["count"] for hour in hours.values())
+        return sum(hour["ok"] for hour in hours.values()) / total if total else None
+
+    def percentile_by_hour(self, check: str, pct: float = 95, days: float = 1,
+                           target: str = None) -> List[Tuple[str, Optional[float], int]]:
+        """
+        Latency percentile per hour for a check
+
+        Hours still covered by raw samples are exact; older hours are
+        approximated from the rollup histograms.
+
+        Args:
+            check: Check name (e.g. http, propagation, check_duration)
+            pct: Percentile to compute
+            days: Look-back window in days
+            target: Restrict to one target
+
+        Returns:
+            List of (hour ISO timestamp, percentile value, sample count)
+        """
+        since = int(time.time() - days * 86400)
+
+        with self._lock:
+            hours = self._hourly(check, since, target)
+
+        series = []
+        for bucket in sorted(hours):
+            hour = hours[bucket]
+            if hour["histogram"] is not None:
+                histogram = list(hour["histogram"])
+                for value in hour["values"]:
+                    histogram[histogram_bucket(value)] += 1
+                value = histogram_percentile(histogram, pct)
+            else:
+                value = percentile(hour["values"], pct)
+
+            series.append((datetime.fromtimestamp(bucket).isoformat(), value, hour["count"]))
+
+        return series
+
+    def stats(self) -> Dict:
+        """Row counts and time range of the store"""
+        with self._lock:
+            samples, first, last = self.conn.execute("SELECT COUNT(*), MIN(ts), MAX(ts) FROM samples").fetchone()
+            rollups = self.conn.execute("SELECT COUNT(*) FROM rollups").fetchone()[0]
+
+        return {
+            "samples": samples,
+            "rollups": rollups,
+            "first_sample": datetime.fromtimestamp(first).isoformat() if first else None,
+            "last_sample": datetime.fromtimestamp(last).isoformat() if last else None
+        }
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for the DNS health monitor
+Gauges and histograms rendered in the Prometheus text exposition format
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+def escape_label(value) -> str:
+    """Escape a label value for the text exposition format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def set(self, value: float, **labels):
+        self.values[tuple(sorted(labels.items()))] = value
+
+    def clear(self):
+        self.values = {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(labels)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: List[float] = None):
+        self.name = name
+        self.help = help_text
+        self.buckets = sorted(buckets or DEFAULT_BUCKETS)
+        self.series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][index] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+        for labels, series in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, series["counts"]):
+                bucket_labels = labels + (("le", format_value(bound)),)
+                lines.append(f"{self.name}_bucket{format_labels(bucket_labels)} {count}")
+            lines.append(f"{self.name}_bucket{format_labels(labels + (('le', '+Inf'),))} {series['count']}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {series['count']}")
+
+        return lines
+
+
+class HealthMetrics:
+    def __init__(self, prefix: str = "dns_health"):
+        """
+        Metrics registry for DNS health check results
+
+        Args:
+            prefix: Prefix for every metric name
+        """
+        self._lock = threading.Lock()
+        p = prefix
+
+        self.resolver_rtt = Histogram(f"{p}_resolver_rtt_seconds", "DNS query round-trip time per resolver")
+        self.propagation_ratio = Gauge(f"{p}_propagation_ratio", "Fraction of resolvers returning the expected value")
+        self.cert_days = Gauge(f"{p}_cert_days_remaining", "Days until the TLS certificate expires")
+        self.cert_valid = Gauge(f"{p}_cert_valid", "Whether the TLS certificate verified (1) or not (0)")
+        self.tls_handshake = Gauge(f"{p}_tls_handshake_seconds", "TLS handshake duration of the last check")
+        self.http_response = Histogram(f"{p}_http_response_seconds", "HTTP response time of the single-shot check")
+        self.http_up = Gauge(f"{p}_http_up", "Whether the HTTP check returned 200 (1) or not (0)")
+        self.http_phase = Gauge(f"{p}_http_phase_seconds", "HTTP probe timing phase quantiles")
+        self.check_duration = Histogram(f"{p}_check_duration_seconds", "Duration of each health check",
+                                        DEFAULT_BUCKETS + [15.0, 30.0])
+        self.check_success = Gauge(f"{p}_check_success", "Whether each check completed without error (1) or not (0)")
+        self.run_duration = Gauge(f"{p}_run_duration_seconds", "Duration of the last full health check run")
+        self.last_run = Gauge(f"{p}_last_run_timestamp_seconds", "Unix time of the last health check run")
+        self.issues = Gauge(f"{p}_issues", "Number of issues found by the last health check run")
+
+        self.metrics = [
+            self.resolver_rtt, self.propagation_ratio, self.cert_days, self.cert_valid, self.tls_handshake,
+            self.http_response, self.http_up, self.http_phase, self.check_duration, self.check_success,
+            self.run_duration, self.last_run, self.issues
+        ]
+
+    def update(self, results: Dict, issues: List[str] = None):
+        """
+        Update metrics from a health check result document
+
+        Args:
+            results: Result document from DNSHealthMonitor
+            issues: Issues found by the run
+        """
+        checks = results.get("checks", {})
+        domain = results.get("domain", "")
+
+        with self._lock:
+            propagation = checks.get("propagation")
+            if propagation:
+                for ns, status in propagation.items():
+                    if status.get("rtt_ms") is not None:
+                        self.resolver_rtt.observe(status["rtt_ms"] / 1000, resolver=ns)
+                matched = sum(1 for status in propagation.values() if status["match"])
+                self.propagation_ratio.set(matched / len(propagation), record=f"A {domain}")
+
+            ssl_hosts = checks.get("ssl_hosts") or ({domain: checks["ssl"]} if "ssl" in checks else {})
+            for hostname, status in ssl_hosts.items():
+                self.cert_valid.set(0 if status["status"].startswith("❌") else 1, hostname=hostname)
+                if status.get("days_remaining") is not None:
+                    self.cert_days.set(status["days_remaining"], hostname=hostname)
+                if status.get("handshake_ms") is not None:
+                    self.tls_handshake.set(status["handshake_ms"] / 1000, hostname=hostname)
+
+            http = checks.get("http")
+            if http:
+                url = http.get("url") or f"https://{domain}"
+                self.http_up.set(1 if http.get("status_code") == 200 else 0, url=url)
+                if http.get("response_time") is not None:
+                    self.http_response.observe(http["response_time"], url=url)
+
+            probe = checks.get("http_probe")
+            if probe and probe.get("phases"):
+                for phase, stats in probe["phases"].items():
+                    if not stats:
+                        continue
+                    for quantile in ["p50", "p95", "p99"]:
+                        self.http_phase.set(
+                            stats[quantile] / 1000,
+                            url=probe["url"],
+                            phase=phase[:-3],
+                            quantile=f"0.{quantile[1:]}"
+                        )
+
+            errors = results.get("check_errors", {})
+            for check, duration in results.get("check_durations_ms", {}).items():
+                self.check_duration.observe(duration / 1000, check=check)
+                self.check_success.set(0 if check in errors else 1, check=check)
+
+            if results.get("duration_ms") is not None:
+                self.run_duration.set(results["duration_ms"] / 1000)
+            self.last_run.set(time.time())
+            self.issues.set(len(issues or []))
+
+    def render(self) -> str:
+        """Render all metrics in the text exposition format"""
+        with self._lock:
+            lines = []
+            for metric in self.metrics:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    def __init__(self, metrics: HealthMetrics, port: int = 9108, host: str = "0.0.0.0"):
+        """
+        Background HTTP server exposing /metrics
+
+        Args:
+            metrics: Registry to expose
+            port: Port to listen on
+            host: Interface to bind
+        """
+        self.metrics = metrics
+        self.address = (host, port)
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Start serving in a daemon thread"""
+        metrics = self.metrics
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ["/metrics", "/"]:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(self.address, MetricsHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+
+        print(f"📊 Metrics available at http://{self.address[0]}:{self.server.server_port}/metrics")
+
+    def stop(self):
+        """Stop the server"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Adaptive scheduler for DNS health checks
+Each check group runs on its own cadence, tightening after failures or DNS
+changes and backing off while results stay stable
+"""
+
+import hashlib
+import json
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+CHECK_GROUPS = ["dns", "propagation", "ssl", "http", "mail", "expected"]
+
+# Intervals in seconds: start at "interval", never below "min" or above "max"
+DEFAULT_SCHEDULE = {
+    "dns": {"interval": 300, "min": 60, "max": 900},
+    "propagation": {"interval": 300, "min": 60, "max": 1800},
+    "ssl": {"interval": 86400, "min": 3600, "max": 86400},
+    "http": {"interval": 60, "min": 30, "max": 300},
+    "mail": {"interval": 3600, "min": 600, "max": 21600},
+    "expected": {"interval": 300, "min": 60, "max": 1800}
+}
+
+# A record change in one group makes these groups due immediately
+CHANGE_TIGHTENS = {
+    "dns": ["dns", "propagation", "expected"],
+    "expected": ["dns", "propagation", "expected"],
+    "mail": ["mail"]
+}
+
+FAILED_LOOKUPS = ["NXDOMAIN", "NoAnswer"]
+
+
+def fingerprint(value) -> str:
+    """Stable hash of a JSON-serializable value"""
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def group_outcome(group: str, results: Dict) -> Tuple[bool, Optional[str]]:
+    """
+    Decide whether a check group passed and fingerprint the DNS data it saw
+
+    Args:
+        group: Check group name
+        results: Result document containing the group's checks
+
+    Returns:
+        Tuple of (ok, fingerprint of record values or None if the group has none)
+    """
+    checks = results.get("checks", {})
+    errors = results.get("check_errors", {})
+
+    if group == "dns":
+        a_records = checks.get("a_records", {})
+        www_cname = checks.get("www_cname", {})
+        ok = a_records.get("status") == "✅" and "a_records" not in errors and "www_cname" not in errors
+        values = [sorted(a_records.get("values", [])), sorted(www_cname.get("values", []))]
+        return ok, fingerprint(values) if ok else None
+
+    if group == "propagation":
+        propagation = checks.get("propagation")
+        if not propagation:
+            return False, None
+        return all(status["match"] for status in propagation.values()), None
+
+    if group == "ssl":
+        hosts = checks.get("ssl_hosts", {})
+        return bool(hosts) and all(host["status"].startswith("✅") for host in hosts.values()), None
+
+    if group == "http":
+        http = checks.get("http", {})
+        return http.get("status_code") == 200 and "http" not in errors, None
+
+    if group == "mail":
+        mail = checks.get("mail", {})
+        mx = mail.get("mx", [])
+        ok = "mail" not in errors and bool(mx) and mx[0] not in FAILED_LOOKUPS
+        values = [sorted(mx), mail.get("spf"), mail.get("dmarc")]
+        return ok, fingerprint(values) if ok else None
+
+    if group == "expected":
+        expected = checks.get("expected_records", [])
+        ok = "expected" not in errors and all(record["match"] for record in expected)
+        values = [[record["type"], record["name"], sorted(record["actual"])] for record in expected]
+        return ok, fingerprint(values) if "expected" not in errors else None
+
+    raise ValueError(f"Unknown check group: {group}")
+
+
+class CheckScheduler:
+    def __init__(self, schedule: Dict = None, jitter: float = 0.1, backoff: float = 1.5,
+                 groups: List[str] = None):
+        """
+        Per-group check scheduler
+
+        After a failure a group drops to its minimum interval; a change in the
+        DNS data it observed also pulls related groups forward. Each stable
+        pass multiplies the interval by the backoff factor up to the maximum.
+        Every interval is jittered so groups don't stay aligned.
+
+        Args:
+            schedule: Per-group overrides of DEFAULT_SCHEDULE
+            jitter: Fraction of the interval to randomize (+/-)
+            backoff: Interval growth factor after a stable pass
+            groups: Groups to schedule (default: all)
+        """
+        self.jitter = jitter
+        self.backoff = backoff
+        self.groups = {}
+
+        now = time.monotonic()
+        for group in groups or CHECK_GROUPS:
+            config = dict(DEFAULT_SCHEDULE[group])
+            config.update((schedule or {}).get(group, {}))
+
+            self.groups[group] = {
+                "min": config["min"],
+                "max": config["max"],
+                "interval": min(max(config["interval"], config["min"]), config["max"]),
+                "next_due": now,
+                "last_ok": None,
+                "fingerprint": None,
+                "runs": 0,
+                "failures": 0,
+                "changes": 0
+            }
+
+    def jittered(self, interval: float) -> float:
+        """Apply +/- jitter to an interval"""
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def due(self, now: float = None) -> List[str]:
+        """Groups due to run at the given monotonic time"""
+        now = time.monotonic() if now is None else now
+        return [group for group, state in self.groups.items() if state["next_due"] <= now]
+
+    def seconds_until_due(self, now: float = None) -> float:
+        """Seconds until the next group becomes due"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(state["next_due"] for state in self.groups.values()) - now)
+
+    def tighten(self, group: str, now: float = None):
+        """Drop a group to its minimum interval and make it due now"""
+        now = time.monotonic() if now is None else now
+        state = self.groups[group]
+        state["interval"] = state["min"]
+        state["next_due"] = now
+
+    def record(self, group: str, ok: bool, value_fingerprint: str = None, now: float = None) -> bool:
+        """
+        Record a run and schedule the group's next one
+
+        Args:
+            group: Check group that ran
+            ok: Whether the group passed
+            value_fingerprint: Fingerprint of the DNS data observed, if any
+            now: Monotonic time of the run
+
+        Returns:
+            True if the observed DNS data changed since the previous run
+        """
+        now = time.monotonic() if now is None else now
+        state = self.groups[group]
+        state["runs"] += 1
+
+        changed = (
+            value_fingerprint is not None
+            and state["fingerprint"] is not None
+            and value_fingerprint != state["fingerprint"]
+        )
+        if value_fingerprint is not None:
+            state["fingerprint"] = value_fingerprint
+
+        if not ok:
+            state["failures"] += 1
+            state["interval"] = state["min"]
+        elif changed:
+            state["changes"] += 1
+            state["interval"] = state["min"]
+        elif state["last_ok"]:
+            state["interval"] = min(state["interval"] * self.backoff, state["max"])
+
+        state["last_ok"] = ok
+        state["next_due"] = now + self.jittered(state["interval"])
+
+        if changed:
+            for related in CHANGE_TIGHTENS.get(group, []):
+                if related != group and related in self.groups:
+                    self.tighten(related, now)
+
+        return changed
+
+    def status(self, now: float = None) -> Dict[str, Dict]:
+        """Current interval, time to next run and counters for each group"""
+        now = time.monotonic() if now is None else now
+        return {
+            group: {
+                "interval_s": round(state["interval"], 1),
+                "next_in_s": round(max(0.0, state["next_due"] - now), 1),
+                "last_ok": state["last_ok"],
+                "runs": state["runs"],
+                "failures": state["failures"],
+                "changes": state["changes"]
+            }
+            for group, state in self.groups.items()
+        }
+
+
+def merge_results(latest: Dict, partial: Dict, groups: List[str]) -> Dict:
+    """
+    Merge a partial check run into the latest complete snapshot
+
+    Args:
+        latest: Snapshot from earlier runs (may be empty)
+        partial: Results of the run that just finished
+        groups: Groups the partial run covered
+
+    Returns:
+        New snapshot with the partial run's checks replacing older ones
+    """
+    ran = set(partial.get("check_durations_ms", {}))
+    errors = {check: error for check, error in latest.get("check_errors", {}).items() if check not in ran}
+    errors.update(partial.get("check_errors", {}))
+
+    merged = dict(latest)
+    merged.update({
+        "timestamp": partial["timestamp"],
+        "domain": partial["domain"],
+        "checks": {**latest.get("checks", {}), **partial["checks"]},
+        "check_durations_ms": {**latest.get("check_durations_ms", {}), **partial.get("check_durations_ms", {})},
+        "check_timestamps": {
+            **latest.get("check_timestamps", {}),
+            **{group: partial["timestamp"] for group in groups}
+        },
+        "duration_ms": partial.get("duration_ms")
+    })
+
+    if errors:
+        merged["check_errors"] = errors
+    else:
+        merged.pop("check_errors", None)
+
+    return merged
@@ -0,0 +1,79 @@
+"""
+Shared fixtures for the dns-management tests
+The tools live in dns-management/ as hyphenated scripts, so they are loaded
+by path; helper modules are imported from the same directory
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+DNS_MANAGEMENT = os.path.join(os.path.dirname(__file__), "..", "..", "dns-management")
+sys.path.insert(0, os.path.abspath(DNS_MANAGEMENT))
+
+
+def load_script(filename: str):
+    """Import a hyphenated dns-management script as a module"""
+    name = filename[:-3].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(DNS_MANAGEMENT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_backup(manager, records, timestamp="2025-01-18T12:00:00"):
+    """Unified backup of the given records, with its checksum"""
+    backup = {
+        "provider": "unified",
+        "domain": manager.domain,
+        "timestamp": timestamp,
+        "unified_records": records,
+        "total_records": len(records)
+    }
+    backup["checksum"] = manager.calculate_checksum(backup)
+    return backup
+
+
+@pytest.fixture(scope="session")
+def backup_restore():
+    """The dns-backup-restore.py module"""
+    return load_script("dns-backup-restore.py")
+
+
+@pytest.fixture
+def manager(backup_restore, tmp_path, monkeypatch):
+    """DNSBackupRestore working in a temporary directory with a relative backup_dir"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("DNS_BACKUP_DIR", raising=False)
+    return backup_restore.DNSBackupRestore()
+
+
+@pytest.fixture(scope="session")
+def health_monitor():
+    """The dns-health-monitor.py module"""
+    return load_script("dns-health-monitor.py")
+
+
+@pytest.fixture
+def monitor(health_monitor, tmp_path):
+    """DNSHealthMonitor with the default configuration"""
+    return health_monitor.DNSHealthMonitor(config_file=str(tmp_path / "dns-config.json"))
+
+
+@pytest.fixture(scope="session")
+def dns_manager_module():
+    """The dns-manager.py module (its provider clients are imported as cloudflare_dns/canspace_dns)"""
+    for filename in ["cloudflare-dns.py", "canspace-dns.py"]:
+        module = load_script(filename)
+        sys.modules.setdefault(module.__name__, module)
+    return load_script("dns-manager.py")
+
+
+@pytest.fixture
+def dns_manager(dns_manager_module, tmp_path, monkeypatch):
+    """UnifiedDNSManager with the default configuration and no provider credentials"""
+    for variable in ["CLOUDFLARE_API_TOKEN", "CANSPACE_USERNAME", "CANSPACE_PASSWORD"]:
+        monkeypatch.delenv(variable, raising=False)
+    return dns_manager_module.UnifiedDNSManager(config_file=str(tmp_path / "dns-config.json"))
@@ -0,0 +1,71 @@
+"""Tests for incremental backups (backup_delta and DNSBackupRestore.save_incremental)"""
+
+import json
+import os
+
+from backup_delta import apply_delta, canonicalize, count_changes, create_delta
+
+from conftest import make_backup
+
+A = {"type": "A", "name": "leo.pvthostel.com", "value": "76.76.21.21", "ttl": 300}
+WWW = {"type": "CNAME", "name": "www.leo.pvthostel.com", "value": "cname.vercel-dns.com", "ttl": 300}
+MX = {"type": "MX", "name": "leo.pvthostel.com", "value": "mail.leo.pvthostel.com", "priority": 10}
+
+
+def checksum(data):
+    return json.dumps(data, sort_keys=True)
+
+
+def use_timestamps(manager, backups):
+    """Name saved backups after their own timestamps (the default name has one-second resolution)"""
+    names = iter(backup["timestamp"].replace("-", "").replace(":", "").replace("T", "_") for backup in backups)
+    manager.get_backup_filename = lambda provider="unified", suffix=".json": (
+        f"{manager.backup_dir}/dns_backup_{provider}_{next(names)}{suffix}"
+    )
+
+
+def test_delta_round_trip_reproduces_the_backup():
+    parent = canonicalize({"sources": {"cloudflare": {"records": [A, WWW]}}, "unified_records": [WWW, A]}, checksum)
+    backup = canonicalize({
+        "sources": {"cloudflare": {"records": [dict(A, ttl=60), MX]}, "dig": {"records": [A]}},
+        "unified_records": [MX, dict(A, ttl=60)]
+    }, checksum)
+
+    delta = create_delta(parent, backup)
+
+    assert apply_delta(parent, delta) == backup
+    changes = delta["changes"]["sources.cloudflare.records"]
+    assert changes["added"] == [MX]
+    assert changes["changed"] == [dict(A, ttl=60)]
+    assert [key.split("|")[0] for key in changes["removed"]] == ["CNAME"]
+    assert count_changes(delta) == 3 + 3 + 1
+
+
+def test_incremental_chain_reconstructs_every_backup(manager):
+    backups = [
+        make_backup(manager, [A, WWW], "2025-01-18T10:00:00"),
+        make_backup(manager, [dict(A, value="76.76.21.22"), WWW], "2025-01-18T11:00:00"),
+        make_backup(manager, [dict(A, value="76.76.21.22"), WWW, MX], "2025-01-18T12:00:00")
+    ]
+
+    use_timestamps(manager, backups)
+    files = [manager.save_incremental(backup, full_every=10) for backup in backups]
+
+    entries = {entry["filename"]: entry for entry in manager.catalog.query()}
+    kinds = [entries[os.path.basename(path)]["kind"] for path in files]
+    assert kinds == ["full", "delta", "delta"]
+
+    for path, backup in zip(files, backups):
+        assert manager.load_backup(path) == canonicalize(backup, manager.calculate_checksum)
+        assert manager.verify_backup(path)
+
+
+def test_full_snapshot_starts_a_new_chain(manager):
+    backups = [make_backup(manager, [dict(A, ttl=60 * (hour + 1))], f"2025-01-18T1{hour}:00:00") for hour in range(4)]
+
+    use_timestamps(manager, backups)
+    for backup in backups:
+        manager.save_incremental(backup, full_every=2)
+
+    entries = manager.catalog.query(newest_first=False)
+    assert [(entry["kind"], entry["chain"]) for entry in entries] == [("full", 0), ("delta", 1), ("full", 0), ("delta", 1)]
@@ -0,0 +1,15 @@
+"""Tests for saving, loading and verifying backups in dns-backup-restore.py"""
+
+import os
+
+from conftest import make_backup
+
+
+def test_latest_link_resolves_with_relative_backup_dir(manager):
+    assert not os.path.isabs(manager.backup_dir)
+
+    filename = manager.save_backup(make_backup(manager, [{"type": "A", "name": "leo.pvthostel.com", "value": "1.2.3.4"}]))
+    latest = os.path.join(manager.backup_dir, "latest_unified.json")
+
+    assert os.path.realpath(latest) == os.path.realpath(filename)
+    assert manager.verify_backup(latest)
@@ -0,0 +1,85 @@
+"""Tests for grandfather-father-son retention (backup_retention and DNSBackupRestore.apply_retention)"""
+
+import os
+from datetime import datetime, timedelta
+
+from backup_retention import retained
+
+from conftest import make_backup
+
+NOW = datetime(2025, 1, 18, 12, 0)
+
+
+def entry(filename, when, provider="unified", partial=False, parent=None):
+    return {"filename": filename, "ts": int(when.timestamp()), "provider": provider, "partial": partial,
+            "parent": parent}
+
+
+def test_each_tier_keeps_the_newest_backup_per_period():
+    entries = [entry(f"h{hours}", NOW - timedelta(hours=hours)) for hours in range(72)]
+
+    keep = retained(entries, {"hourly": 3, "daily": 2, "weekly": 0, "monthly": 0, "yearly": 0})
+
+    # Last three hours, plus the newest backup of today and of yesterday
+    assert keep == {"h0", "h1", "h2", "h13"}
+
+
+def test_complete_backup_is_preferred_within_a_period():
+    entries = [
+        entry("partial", NOW, partial=True),
+        entry("complete", NOW - timedelta(minutes=10)),
+        entry("older", NOW - timedelta(days=1))
+    ]
+
+    keep = retained(entries, {"hourly": 0, "daily": 1, "weekly": 0, "monthly": 0, "yearly": 0})
+
+    # The newest backup is always kept; the daily tier picks the complete one
+    assert keep == {"partial", "complete"}
+
+
+def test_delta_chains_are_kept_whole():
+    entries = [
+        entry("full", NOW - timedelta(days=40)),
+        entry("delta1", NOW - timedelta(days=39), parent="full"),
+        entry("delta2", NOW, parent="delta1"),
+        entry("other", NOW, provider="cloudflare")
+    ]
+
+    keep = retained(entries, {"hourly": 1, "daily": 0, "weekly": 0, "monthly": 0, "yearly": 0})
+
+    assert keep == {"full", "delta1", "delta2", "other"}
+
+
+def test_apply_retention_deletes_expired_backups(manager):
+    files = []
+    for days in [3, 2, 1, 0]:
+        stamp = (NOW - timedelta(days=days)).strftime("%Y%m%d_%H%M%S")
+        backup = make_backup(manager, [{"type": "A", "name": "leo.pvthostel.com", "value": f"10.0.0.{days}"}],
+                             (NOW - timedelta(days=days)).isoformat())
+        files.append(manager.save_backup(backup, f"{manager.backup_dir}/dns_backup_unified_{stamp}.json"))
+
+    policy = {"hourly": 0, "daily": 2, "weekly": 0, "monthly": 0, "yearly": 0}
+    expired = {os.path.basename(path) for path in files[:2]}
+
+    assert set(manager.apply_retention(policy, dry_run=True)) == expired
+    assert all(os.path.exists(path) for path in files)
+
+    assert set(manager.apply_retention(policy)) == expired
+    assert [os.path.exists(path) for path in files] == [False, False, True, True]
+    assert {entry["filename"] for entry in manager.catalog.query(archived=None)} == \
+        {os.path.basename(path) for path in files[2:]}
+    assert manager.verify_backup(files[-1])
+
+
+def test_archived_backups_are_compressed_and_still_load(manager):
+    old = make_backup(manager, [{"type": "A", "name": "leo.pvthostel.com", "value": "10.0.0.1"}], "2024-01-01T00:00:00")
+    path = manager.save_backup(old, f"{manager.backup_dir}/dns_backup_unified_20240101_000000.json")
+
+    manager.archive_old_backups(days=30)
+
+    entry = manager.catalog.get(os.path.basename(path))
+    assert entry["archived"] and entry["path"].endswith(".json.gz")
+    assert not os.path.exists(path)
+    assert manager.find_backup(os.path.basename(path)) == entry["path"]
+    assert manager.load_backup(entry["path"])["unified_records"] == old["unified_records"]
+    assert manager.verify_backup(entry["path"])
@@ -0,0 +1,60 @@
+"""Tests for bulk update validation in dns-manager.py"""
+
+CAA = {"action": "create", "type": "CAA", "name": "leo.pvthostel.com", "value": '0 issue "letsencrypt.org"'}
+
+
+def test_caa_is_rejected_when_canspace_is_a_target(dns_manager):
+    errors = dns_manager.validate_bulk_updates([CAA], providers=["cloudflare", "canspace"])
+
+    assert errors == ["#1: CAA records are not supported by canspace"]
+
+
+def test_caa_is_accepted_for_cloudflare_only(dns_manager):
+    assert dns_manager.validate_bulk_updates([CAA], providers=["cloudflare"]) == []
+
+
+def test_validation_defaults_to_initialized_providers(dns_manager):
+    dns_manager.providers = {"canspace": object()}
+
+    assert dns_manager.validate_bulk_updates([CAA]) == ["#1: CAA records are not supported by canspace"]
+    assert dns_manager.validate_bulk_updates([dict(CAA, type="TXT", value="v=spf1 -all")]) == []
+
+
+class FakeCanspace:
+    def __init__(self, records):
+        self.records = records
+        self.updates = []
+
+    def find_record(self, name, record_type=None):
+        return next(r for r in self.records if r["name"] == name and r["type"] == record_type)
+
+    def list_dns_records(self):
+        return self.records
+
+    def update_dns_record(self, line, **params):
+        self.updates.append((line, params))
+        return True
+
+
+def test_canspace_update_sends_ttl_and_priority_and_rolls_them_back(dns_manager):
+    existing = {"line": 12, "type": "SRV", "name": "_sip._tcp.leo.pvthostel.com.", "ttl": 14400,
+                "data": "10 5060 sip.leo.pvthostel.com", "priority": 10}
+    canspace = FakeCanspace([existing])
+    update = {"action": "update", "type": "SRV", "name": existing["name"], "value": "10 5061 sip.leo.pvthostel.com",
+              "ttl": 300, "priority": 20}
+
+    inverse = dns_manager._apply_bulk_operation("canspace", canspace, update)
+    assert canspace.updates == [(12, {"target": update["value"], "ttl": 300, "priority": 20})]
+
+    existing["data"] = update["value"]
+    dns_manager._apply_inverse_operation("canspace", canspace, inverse, {})
+    assert canspace.updates[-1] == (12, {"target": "10 5060 sip.leo.pvthostel.com", "ttl": 14400, "priority": 10})
+
+
+def test_mx_updates_are_rejected_for_canspace(dns_manager):
+    mx = {"action": "update", "type": "MX", "name": "leo.pvthostel.com", "value": "mail.leo.pvthostel.com"}
+
+    assert dns_manager.validate_bulk_updates([mx], providers=["cloudflare", "canspace"]) == \
+        ["#1: MX records cannot be updated on canspace"]
+    assert dns_manager.validate_bulk_updates([mx], providers=["cloudflare"]) == []
+    assert dns_manager.validate_bulk_updates([dict(mx, action="create")], providers=["canspace"]) == []
@@ -0,0 +1,68 @@
+"""Tests for alert deduplication, flap detection and digest delivery"""
+
+import pytest
+
+from health_alerts import AlertManager
+
+SSL = "SSL certificate expires in 5 days"
+MX = "No MX records"
+
+
+class ListSink:
+    name = "list"
+
+    def __init__(self):
+        self.digests = []
+
+    def send(self, digest):
+        self.digests.append(digest)
+
+
+@pytest.fixture
+def alerts():
+    manager = AlertManager("leo.pvthostel.com", [ListSink()], suppress_window=100, flap_window=50,
+                           flap_threshold=4, batch_window=0)
+    yield manager
+    manager.close()
+
+
+def states(events):
+    return [(event["issue"], event["state"]) for event in events]
+
+
+def test_issue_fires_once_repeats_after_window_and_resolves(alerts):
+    assert states(alerts.process([SSL], now=0)) == [(SSL, "firing")]
+    assert alerts.process([SSL], now=60) == []
+    assert states(alerts.process([SSL], now=100)) == [(SSL, "repeat")]
+    assert states(alerts.process([], now=110)) == [(SSL, "resolved")]
+    assert alerts.process([], now=120) == []
+
+
+def test_issues_are_tracked_independently(alerts):
+    alerts.process([SSL], now=0)
+
+    assert states(alerts.process([SSL, MX], now=10)) == [(MX, "firing")]
+    assert states(alerts.process([MX], now=20)) == [(SSL, "resolved")]
+
+
+def test_flapping_issue_is_reported_once_until_stable(alerts):
+    events = []
+    for now, issues in enumerate([[SSL], [], [SSL], [], [SSL], [], [SSL]]):
+        events += alerts.process(issues, now=now)
+
+    # The fourth state change within the window marks it as flapping
+    assert [event["state"] for event in events] == ["firing", "resolved", "firing", "flapping"]
+
+    # Quiet while it keeps flapping, then one event where it settled
+    assert alerts.process([SSL], now=30) == []
+    assert states(alerts.process([SSL], now=60)) == [(SSL, "firing")]
+
+
+def test_events_are_delivered_as_digests(alerts):
+    alerts.process([SSL, MX], now=0)
+    alerts.close()
+
+    digests = alerts.sinks[0].digests
+    delivered = [event for digest in digests for event in digest["events"]]
+    assert sorted(event["issue"] for event in delivered) == [MX, SSL]
+    assert all(digest["domain"] == "leo.pvthostel.com" for digest in digests)
@@ -0,0 +1,67 @@
+"""Tests for the health API result cache (dns-management/api/health.py)"""
+
+import threading
+import time
+
+import pytest
+
+from conftest import load_script
+
+
+class FakeMonitor:
+    def __init__(self, delay=0.0, release=None):
+        self.delay = delay
+        self.release = release
+        self.issues = []
+        self.runs = 0
+
+    def collect_health_check(self):
+        if self.release is not None:
+            self.release.wait(5)
+        time.sleep(self.delay)
+        self.runs += 1
+        return {"timestamp": "2026-10-19T00:00:00", "checks": {"a_records": {"status": "✅"}}}
+
+
+@pytest.fixture(scope="module")
+def health_api():
+    return load_script("api/health.py")
+
+
+def test_first_request_waits_for_the_first_check(health_api):
+    cache = health_api.HealthCache(first_fill_timeout=5)
+    cache.monitor = FakeMonitor(delay=0.05)
+
+    results, issues, error, state, age, generation = cache.get()
+
+    assert state == "fresh"
+    assert results["checks"]["a_records"]["status"] == "✅"
+    assert cache.monitor.runs == 1
+
+
+def test_first_fill_wait_is_bounded(health_api):
+    release = threading.Event()
+    cache = health_api.HealthCache(first_fill_timeout=0.05)
+    cache.monitor = FakeMonitor(release=release)
+
+    start = time.monotonic()
+    state = cache.get()[3]
+    release.set()
+
+    assert state == "empty"
+    assert time.monotonic() - start < 1
+
+
+def test_standalone_requests_never_wait(health_api):
+    release = threading.Event()
+    cache = health_api.HealthCache(first_fill_timeout=5, standalone=True)
+    cache.monitor = FakeMonitor(release=release)
+
+    start = time.monotonic()
+    state = cache.get()[3]
+    release.set()
+
+    assert state == "empty"
+    assert time.monotonic() - start < 1
+    assert cache.filled.wait(5)
+    assert cache.get()[3] == "fresh"
@@ -0,0 +1,86 @@
+"""Tests for dns-health-monitor.py checks that need no network"""
+
+import pytest
+
+
+def test_propagation_matrix_keeps_checks_of_the_same_record_apart(monitor):
+    served = {"8.8.8.8": "v=spf1 -all", "1.1.1.1": "google-site-verification=abc"}
+    monitor.nameservers = list(served)
+    monitor.query_dns_record = lambda record_type, name, ns: ([served[ns]], 1.0)
+
+    records = [
+        ("TXT", "leo.pvthostel.com", "v=spf1 -all"),
+        ("TXT", "leo.pvthostel.com", "google-site-verification=abc")
+    ]
+    matrix = monitor.check_propagation_matrix(records)
+
+    assert len(matrix["records"]) == 2
+    spf = matrix["records"][monitor.matrix_key(*records[0])]
+    verification = matrix["records"][monitor.matrix_key(*records[1])]
+    assert [spf[ns]["match"] for ns in served] == [True, False]
+    assert [verification[ns]["match"] for ns in served] == [False, True]
+    assert matrix["resolvers"]["8.8.8.8"]["queries"] == 2
+
+
+def make_certificate(common_name, issuer_name):
+    """DER certificate with the given subject and issuer common names"""
+    from datetime import datetime, timedelta, timezone
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    now = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)]))
+        .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, issuer_name)]))
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + timedelta(days=90))
+        .sign(key, hashes.SHA256())
+    )
+    return certificate.public_bytes(serialization.Encoding.DER)
+
+
+class LeafOnlySocket:
+    """SSLSocket before Python 3.13: only the peer certificate is exposed"""
+
+    def __init__(self, leaf):
+        self.leaf = leaf
+
+    def getpeercert(self, binary_form=False):
+        return self.leaf
+
+
+class ChainSocket(LeafOnlySocket):
+    def __init__(self, chain):
+        super().__init__(chain[0])
+        self.chain = chain
+
+    def get_verified_chain(self):
+        return self.chain
+
+
+def test_peer_chain_uses_the_verified_chain_when_available(monitor, health_monitor):
+    if health_monitor.x509 is None:
+        pytest.skip("cryptography not installed")
+    leaf = make_certificate("leo.pvthostel.com", "R11")
+    intermediate = make_certificate("R11", "ISRG Root X1")
+
+    chain = monitor._peer_chain(ChainSocket([leaf, intermediate]))
+
+    assert [(c["subject"], c["issuer"]) for c in chain] == [("leo.pvthostel.com", "R11"), ("R11", "ISRG Root X1")]
+
+
+def test_peer_chain_falls_back_to_the_leaf(monitor, health_monitor):
+    if health_monitor.x509 is None:
+        pytest.skip("cryptography not installed")
+
+    chain = monitor._peer_chain(LeafOnlySocket(make_certificate("leo.pvthostel.com", "R11")))
+
+    assert [c["subject"] for c in chain] == ["leo.pvthostel.com"]
+    assert monitor._peer_chain(LeafOnlySocket(None)) == []
@@ -0,0 +1,50 @@
+"""Tests for the adaptive health check scheduler"""
+
+from health_scheduler import CheckScheduler
+
+SCHEDULE = {"dns": {"interval": 100, "min": 10, "max": 300}}
+
+
+def scheduler(groups=None):
+    return CheckScheduler(SCHEDULE, jitter=0, backoff=2, groups=groups or ["dns"])
+
+
+def test_stable_passes_back_off_up_to_the_maximum():
+    checks = scheduler()
+    intervals = []
+
+    for now in range(5):
+        checks.record("dns", ok=True, value_fingerprint="same", now=now)
+        intervals.append(checks.status(now)["dns"]["interval_s"])
+
+    # The first pass has nothing to compare with, later ones double until the cap
+    assert intervals == [100, 200, 300, 300, 300]
+    assert checks.status(4)["dns"]["next_in_s"] == 300
+
+
+def test_failure_drops_to_the_minimum_interval():
+    checks = scheduler()
+    checks.record("dns", ok=True, now=0)
+    checks.record("dns", ok=True, now=100)
+
+    checks.record("dns", ok=False, now=300)
+
+    status = checks.status(300)["dns"]
+    assert (status["interval_s"], status["next_in_s"], status["failures"]) == (10, 10, 1)
+    assert checks.due(309) == [] and checks.due(310) == ["dns"]
+
+    # Recovery does not back off on the first good pass
+    checks.record("dns", ok=True, now=310)
+    assert checks.status(310)["dns"]["interval_s"] == 10
+
+
+def test_dns_change_pulls_related_groups_forward():
+    checks = CheckScheduler(jitter=0, groups=["dns", "propagation", "ssl"])
+    for group in checks.groups:
+        checks.record(group, ok=True, value_fingerprint="v1", now=0)
+
+    assert checks.record("dns", ok=True, value_fingerprint="v2", now=50) is True
+
+    assert sorted(checks.due(50)) == ["propagation"]
+    assert checks.status(50)["dns"]["interval_s"] == 60
+    assert checks.status(50)["ssl"]["next_in_s"] > 3600
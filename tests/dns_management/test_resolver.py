@@ -0,0 +1,29 @@
+"""Tests for the caching resolver that need no network"""
+
+import dns_resolver
+from dns_resolver import CachingResolver
+
+
+def test_cache_is_in_memory_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    resolver = CachingResolver()
+    resolver.store("leo.pvthostel.com", "A", None, "ok", ["76.76.21.21"], 300)
+    resolver.save()
+
+    assert dns_resolver.DEFAULT_CACHE_FILE is None
+    assert resolver.cache_file is None
+    assert resolver.cached("LEO.pvthostel.com.", "A")["values"] == ["76.76.21.21"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_file_persists_between_resolvers(tmp_path):
+    cache_file = str(tmp_path / "resolver-cache.json")
+    first = CachingResolver(cache_file=cache_file)
+    first.store("leo.pvthostel.com", "A", None, "ok", ["76.76.21.21"], 300)
+    first.store("gone.leo.pvthostel.com", "A", None, "NXDOMAIN", [], 60)
+    first.save()
+
+    second = CachingResolver(cache_file=cache_file)
+    assert second.cached("leo.pvthostel.com", "A")["values"] == ["76.76.21.21"]
+    assert second.cached("leo.pvthostel.com", "A", "8.8.8.8") is None
+    assert second.cached("gone.leo.pvthostel.com", "TXT")["status"] == "NXDOMAIN"
@@ -0,0 +1,145 @@
+"""Tests for diff-first restore planning and application in dns-backup-restore.py"""
+
+import pytest
+
+LIVE = [
+    {"id": "a1", "type": "A", "name": "leo.pvthostel.com", "content": "76.76.21.21", "ttl": 1, "proxied": False},
+    {"id": "c1", "type": "CNAME", "name": "www.leo.pvthostel.com", "content": "cname.vercel-dns.com", "ttl": 1,
+     "proxied": False},
+    {"id": "t1", "type": "TXT", "name": "leo.pvthostel.com", "content": '"v=spf1 -all"', "ttl": 300,
+     "proxied": False, "created_on": "2025-01-01T00:00:00Z"}
+]
+
+
+class FakeCloudflare:
+    def __init__(self):
+        self.calls = []
+
+    def create_dns_record(self, record_type, name, content, **kwargs):
+        self.calls.append(("create", record_type, name, content))
+        return {"id": "new"}
+
+    def update_dns_record(self, record_id, **fields):
+        self.calls.append(("update", record_id, fields))
+        return {}
+
+    def delete_dns_record(self, record_id):
+        self.calls.append(("delete", record_id))
+        return True
+
+
+class FakeCanspace(FakeCloudflare):
+    def create_dns_record(self, record_type, name, value, **kwargs):
+        self.calls.append(("create", record_type, name, value))
+        return True
+
+    def update_dns_record(self, line, **params):
+        self.calls.append(("update", line, params))
+        return True
+
+    def delete_dns_record(self, line):
+        self.calls.append(("delete", line))
+        return True
+
+
+def test_identical_zone_plans_nothing(manager):
+    plan = manager.plan_restore([dict(record) for record in LIVE], LIVE, "cloudflare")
+
+    assert plan == {"create": [], "update": [], "delete": [], "unchanged": 3}
+
+
+def test_other_spellings_are_not_changes(manager):
+    records = [
+        {"type": "A", "name": "leo.pvthostel.com.", "value": "76.76.21.21"},
+        {"type": "CNAME", "name": "WWW", "value": "CNAME.vercel-dns.com."},
+        {"type": "TXT", "name": "@", "data": "v=spf1 -all"}
+    ]
+
+    plan = manager.plan_restore(records, LIVE, "cloudflare")
+
+    assert not plan["create"] and not plan["update"]
+    assert plan["unchanged"] == 3
+
+
+def test_plan_creates_updates_and_prunes(manager):
+    records = [
+        {"type": "A", "name": "leo.pvthostel.com", "content": "76.76.21.22", "ttl": 1},
+        {"type": "CNAME", "name": "www.leo.pvthostel.com", "content": "cname.vercel-dns.com", "ttl": 3600},
+        {"type": "MX", "name": "leo.pvthostel.com", "content": "mail.leo.pvthostel.com", "priority": 10}
+    ]
+
+    plan = manager.plan_restore(records, LIVE, "cloudflare", prune=True)
+
+    assert [change["new"]["type"] for change in plan["create"]] == ["MX"]
+    updates = {change["old"]["id"]: change["fields"] for change in plan["update"]}
+    assert updates["a1"]["value"]["new"] == "76.76.21.22"
+    assert set(updates["c1"]) == {"ttl"}
+    assert [change["old"]["id"] for change in plan["delete"]] == ["t1"]
+
+    # Without prune, extra live records are left alone
+    assert not manager.plan_restore(records, LIVE, "cloudflare")["delete"]
+
+
+def test_unified_backup_restores_only_the_target_source(manager):
+    backup = {
+        "sources": {
+            "cloudflare": {"records": [dict(record) for record in LIVE]},
+            "canspace": {"records": [
+                {"line": 7, "type": "CNAME", "name": "www.leo.pvthostel.com.", "data": "other.example.com."}
+            ]}
+        },
+        "unified_records": [
+            {"type": "CNAME", "name": "www.leo.pvthostel.com.", "value": "other.example.com."}
+        ]
+    }
+
+    records = manager.restore_records(backup, "cloudflare")
+    plan = manager.plan_restore(records, LIVE, "cloudflare")
+
+    assert records == backup["sources"]["cloudflare"]["records"]
+    assert not plan["create"] and not plan["update"]
+
+
+def test_unified_backup_without_the_provider_is_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.restore_records({"sources": {"dig": {"records": []}}}, "cloudflare")
+
+
+def test_cloudflare_restore_is_idempotent(manager):
+    records = [dict(record) for record in LIVE] + [
+        {"type": "AAAA", "name": "ipv6.leo.pvthostel.com", "content": "2001:db8::1", "ttl": 1}
+    ]
+    cloudflare = FakeCloudflare()
+    manager.get_client = lambda provider: cloudflare
+
+    result = manager.restore_to_cloudflare(manager.plan_restore(records, LIVE, "cloudflare"))
+    assert result == {"applied": 1, "failed": []}
+    assert cloudflare.calls == [("create", "AAAA", "ipv6.leo.pvthostel.com", "2001:db8::1")]
+
+    restored = LIVE + [dict(records[-1], id="new")]
+    again = manager.plan_restore(records, restored, "cloudflare")
+    assert not again["create"] and not again["update"] and not again["delete"]
+
+
+def test_canspace_deletes_run_bottom_up_after_updates(manager):
+    live = [
+        {"line": 10, "type": "A", "name": "leo.pvthostel.com.", "data": "1.1.1.1", "ttl": 14400},
+        {"line": 20, "type": "TXT", "name": "a.leo.pvthostel.com.", "data": "x", "ttl": 14400},
+        {"line": 30, "type": "TXT", "name": "b.leo.pvthostel.com.", "data": "y", "ttl": 14400}
+    ]
+    records = [
+        {"type": "A", "name": "leo.pvthostel.com.", "data": "2.2.2.2", "ttl": 14400},
+        {"type": "CNAME", "name": "www.leo.pvthostel.com.", "data": "leo.pvthostel.com.", "ttl": 14400}
+    ]
+    canspace = FakeCanspace()
+    manager.get_client = lambda provider: canspace
+
+    result = manager.restore_to_canspace(manager.plan_restore(records, live, "canspace", prune=True))
+
+    assert result == {"applied": 4, "failed": []}
+    assert canspace.calls == [
+        ("update", 10, {"address": "2.2.2.2"}),
+        ("delete", 30),
+        ("delete", 20),
+        ("create", "CNAME", "www.leo.pvthostel.com.", "leo.pvthostel.com.")
+    ]